@@ -0,0 +1,141 @@
+"""
+Cost center, project and accounting dimension defaults for expense postings.
+
+Split lines can carry their own cost center, project and ERPNext accounting
+dimensions. Lines that don't fall back to defaults resolved per dimension from
+the expense's employee, then their department, then the company: the
+company's default cost center, or the dimension's default for the company set
+on the Accounting Dimension. The employee and department values are read from
+the field of the same name (payroll_cost_center for the cost center), where
+those doctypes have one. Project has no company default.
+
+Employee defaults are kept in a Redis hash and missing ones are loaded for all
+employees of a report at once, so posting a large report does not look
+anything up per line.
+"""
+
+import frappe
+
+CACHE_KEY = "erpnext_expenses:employee_dimension_defaults"
+COMPANY_CACHE_KEY = "erpnext_expenses:company_dimension_defaults"
+
+# Dimensions every split line has, in addition to ERPNext accounting dimensions
+STANDARD_DIMENSIONS = ["cost_center", "project"]
+
+# Employee and Department columns holding a dimension's default, where not named after it
+SOURCE_FIELDS = {"cost_center": "payroll_cost_center"}
+
+
+def get_dimension_fields():
+	"""Return the dimension fieldnames present on Expense Splitting Detail."""
+	from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
+		get_accounting_dimensions,
+	)
+
+	meta = frappe.get_meta("Expense Splitting Detail")
+	fields = STANDARD_DIMENSIONS + [
+		fieldname for fieldname in get_accounting_dimensions() if fieldname not in STANDARD_DIMENSIONS
+	]
+
+	return [fieldname for fieldname in fields if meta.has_field(fieldname)]
+
+
+def get_default_dimensions(employees, company):
+	"""Resolve default dimensions for several employees of one company.
+
+	Args:
+		employees: Iterable of Employee names (may contain None)
+		company: Company whose defaults are the fallback
+
+	Returns:
+		Dict of {employee: {dimension field: value}}, with a None key for
+		expenses without an employee
+	"""
+	fields = get_dimension_fields()
+	company_defaults = _get_company_defaults(company, fields)
+	employees = {employee for employee in employees if employee}
+
+	employee_defaults = {}
+	missing = []
+	for employee in employees:
+		cached = frappe.cache.hget(CACHE_KEY, employee)
+		# Entries cached before a dimension was added are loaded again
+		if cached is None or any(field not in cached for field in fields):
+			missing.append(employee)
+		else:
+			employee_defaults[employee] = cached
+
+	if missing:
+		for employee, defaults in _load_employee_defaults(missing, fields).items():
+			frappe.cache.hset(CACHE_KEY, employee, defaults)
+			employee_defaults[employee] = defaults
+
+	defaults = {None: company_defaults}
+	for employee, values in employee_defaults.items():
+		defaults[employee] = {field: values.get(field) or company_defaults.get(field) for field in fields}
+
+	return defaults
+
+
+def _get_company_defaults(company, fields):
+	"""Return the company's default cost center and accounting dimension defaults."""
+	from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_dimensions
+
+	defaults = frappe.cache.hget(COMPANY_CACHE_KEY, company)
+	if defaults is None:
+		defaults = dict(get_dimensions()[1].get(company) or {})
+		frappe.cache.hset(COMPANY_CACHE_KEY, company, defaults)
+
+	defaults = dict(defaults, cost_center=frappe.get_cached_value("Company", company, "cost_center"))
+
+	return {field: defaults.get(field) for field in fields}
+
+
+def _get_source_fields(doctype, fields):
+	"""Map dimension fields to the columns of a doctype holding their defaults."""
+	meta = frappe.get_meta(doctype)
+	columns = {field: SOURCE_FIELDS.get(field, field) for field in fields}
+
+	return {field: column for field, column in columns.items() if meta.has_field(column)}
+
+
+def _load_employee_defaults(employees, fields):
+	"""Load dimension defaults for employees and their departments in two queries."""
+	employee_columns = _get_source_fields("Employee", fields)
+	department_columns = _get_source_fields("Department", fields)
+
+	rows = frappe.get_all(
+		"Employee",
+		filters={"name": ("in", employees)},
+		fields=["name", "department"] + list(set(employee_columns.values())),
+	)
+
+	departments = {}
+	department_names = list({row.department for row in rows if row.department})
+	if department_names and department_columns:
+		departments = {
+			row.name: row
+			for row in frappe.get_all(
+				"Department",
+				filters={"name": ("in", department_names)},
+				fields=["name"] + list(set(department_columns.values())),
+			)
+		}
+
+	defaults = {employee: dict.fromkeys(fields) for employee in employees}
+	for row in rows:
+		department = departments.get(row.department) or {}
+		defaults[row.name] = {
+			field: (
+				(row.get(employee_columns[field]) if field in employee_columns else None)
+				or (department.get(department_columns[field]) if field in department_columns else None)
+			)
+			for field in fields
+		}
+
+	return defaults
+
+
+def clear_employee_dimension_cache(doc=None, method=None):
+	"""Drop cached dimension defaults when an Employee, Department or Accounting Dimension changes."""
+	frappe.cache.delete_value([CACHE_KEY, COMPANY_CACHE_KEY])
@@ -0,0 +1,290 @@
+"""
+Duplicate and anomaly detection for expenses.
+
+Exact duplicates are found through a hashed composite key stored on each
+Expense (employee, category, date, currency and amount) and on each of its
+split lines (the same, with the line's amount), so finding the duplicates of
+a batch is a single indexed lookup. An expense is flagged when an earlier one
+claims its amount or the amount of one of its split lines, either as a whole
+or as a split line, and when the same split line (amount, VAT, cost center
+and project) appears twice within it.
+
+Outliers are scored on expense totals only: a split line is a share of its
+expense's total and has no category of its own to be compared with. Totals
+are scored against a running per-category baseline (count, mean and sum of
+squared deviations, updated with Welford's method) kept on Expense Category.
+Each expense is marked when it joins its baseline, in the same transaction,
+so it is never counted twice.
+
+Findings go to the Expense Anomaly review queue. The hourly job only looks at
+expenses modified since its watermark, and create_expense_report() checks the
+expenses it adds to a report straight away.
+"""
+
+import hashlib
+import math
+
+import frappe
+from frappe import _
+from frappe.utils import create_batch, flt
+
+from erpnext_expenses import money
+
+# Expenses scanned per query and per commit by the background job
+SCAN_CHUNK_SIZE = 500
+
+
+def get_duplicate_key(expense, amount=None):
+	"""Hash the fields that make two expenses the same claim.
+
+	Args:
+		expense: The expense
+		amount: Amount of one of its split lines, instead of its total
+	"""
+	parts = [
+		expense.employee or expense.company,
+		expense.category,
+		str(expense.expense_date),
+		expense.currency or "",
+		str(money.to_minor(expense.total if amount is None else amount)),
+	]
+
+	return hashlib.sha256("|".join(str(part or "") for part in parts).encode()).hexdigest()
+
+
+def scan_expenses():
+	"""Scheduled job: check expenses modified since the last scan for anomalies."""
+	settings = frappe.get_single("Expense Settings")
+	if not settings.anomaly_detection_enabled:
+		return
+
+	watermark = settings.anomaly_scan_watermark or "1900-01-01 00:00:00"
+
+	# Expenses modified exactly at the watermark are checked again, as a chunk may have ended among them
+	expenses = frappe.get_all(
+		"Expense",
+		filters={"modified": (">=", watermark), "docstatus": ("!=", 2)},
+		fields=["name", "modified"],
+		order_by="modified asc, name asc",
+	)
+
+	for chunk in create_batch(expenses, SCAN_CHUNK_SIZE):
+		try:
+			detect_anomalies([expense.name for expense in chunk], settings, update_baselines=True)
+
+			# Move past each committed chunk, so a later failure does not scan it again
+			frappe.db.set_single_value("Expense Settings", "anomaly_scan_watermark", chunk[-1].modified)
+			frappe.db.commit()
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error(f"Error scanning expenses for anomalies: {str(e)}")
+			return
+
+
+def check_expenses(expense_names):
+	"""Check expenses being added to a report, without changing the baselines.
+
+	Returns:
+		Number of new findings added to the review queue
+	"""
+	settings = frappe.get_single("Expense Settings")
+	if not settings.anomaly_detection_enabled:
+		return 0
+
+	return detect_anomalies(expense_names, settings)
+
+
+def detect_anomalies(expense_names, settings, update_baselines=False):
+	"""Find duplicates and outliers among expenses and queue new findings.
+
+	Args:
+		expense_names: Expenses to check
+		settings: Expense Settings with the outlier threshold and minimum samples
+		update_baselines: Add expenses not counted yet to the category baselines
+
+	Returns:
+		Number of new findings
+	"""
+	if not expense_names:
+		return 0
+
+	expenses = frappe.get_all(
+		"Expense",
+		filters={"name": ("in", expense_names)},
+		fields=["name", "creation", "category", "base_total", "duplicate_key", "anomaly_baseline_counted"],
+	)
+
+	findings = _find_duplicates(expenses) + _find_outliers(expenses, settings, update_baselines)
+
+	return _record_findings(findings)
+
+
+def _find_duplicates(expenses):
+	"""Find other live expenses claiming each expense's amount or split line amounts, in two queries."""
+	lines = {}
+	for line in frappe.get_all(
+		"Expense Splitting Detail",
+		filters={"parenttype": "Expense", "parent": ("in", [expense.name for expense in expenses])},
+		fields=["parent", "amount", "vat", "cost_center", "project", "duplicate_key"],
+		order_by="idx asc",
+	):
+		lines.setdefault(line.parent, []).append(line)
+
+	keys = {expense.duplicate_key for expense in expenses if expense.duplicate_key}
+	keys.update(line.duplicate_key for rows in lines.values() for line in rows if line.duplicate_key)
+	if not keys:
+		return []
+
+	# Expenses claiming each key with their total or with a split line, earliest first
+	matches = {}
+	for row in frappe.db.sql("""
+		SELECT duplicate_key, name, creation FROM `tabExpense`
+		WHERE duplicate_key IN %(keys)s AND docstatus != 2
+		UNION
+		SELECT sd.duplicate_key, e.name, e.creation
+		FROM `tabExpense Splitting Detail` sd
+		INNER JOIN `tabExpense` e ON e.name = sd.parent
+		WHERE sd.parenttype = 'Expense' AND sd.duplicate_key IN %(keys)s AND e.docstatus != 2
+		ORDER BY creation, name
+	""", {"keys": tuple(keys)}, as_dict=True):
+		same = matches.setdefault(row.duplicate_key, [])
+		if row.name not in same:
+			same.append(row.name)
+
+	findings = []
+	for expense in expenses:
+		expense_lines = lines.get(expense.name, [])
+
+		for key in [expense.duplicate_key] + [line.duplicate_key for line in expense_lines]:
+			same = matches.get(key, [])
+			# The earliest expense with a key is the original, later ones are flagged
+			if len(same) > 1 and same[0] != expense.name:
+				findings.append({
+					"expense": expense.name,
+					"anomaly_type": "Duplicate",
+					"duplicate_of": same[0],
+					"details": _(
+						"Same employee, category, date and amount, as a whole or as a split line, as {0}."
+					).format(", ".join(name for name in same if name != expense.name)),
+				})
+				break
+
+		repeated = _get_repeated_lines(expense_lines)
+		if repeated:
+			findings.append({
+				"expense": expense.name,
+				"anomaly_type": "Duplicate Split Line",
+				"details": _("Split lines entered more than once: {0}.").format(
+					", ".join(_("{0} ({1} times)").format(amount, count) for amount, count in repeated)
+				),
+			})
+
+	return findings
+
+
+def _get_repeated_lines(lines):
+	"""Return (amount, count) of split lines with the same amount, VAT, cost center and project."""
+	counts = {}
+	for line in lines:
+		key = (money.to_minor(line.amount), line.vat, line.cost_center, line.project)
+		counts[key] = counts.get(key, 0) + 1
+
+	return [(money.to_float(key[0]), count) for key, count in counts.items() if count > 1]
+
+
+def _find_outliers(expenses, settings, update_baselines):
+	"""Score expense amounts against their category baselines."""
+	categories = list({expense.category for expense in expenses if expense.category})
+	if not categories:
+		return []
+
+	baselines = {
+		row.name: row
+		for row in frappe.get_all(
+			"Expense Category",
+			filters={"name": ("in", categories)},
+			fields=["name", "baseline_count", "baseline_mean", "baseline_m2"],
+		)
+	}
+
+	threshold = flt(settings.anomaly_outlier_threshold) or 3
+	min_samples = settings.anomaly_min_samples or 30
+
+	findings = []
+	changed = set()
+	counted = []
+	for expense in sorted(expenses, key=lambda expense: expense.creation):
+		baseline = baselines.get(expense.category)
+		if not baseline:
+			continue
+
+		amount = flt(expense.base_total)
+		count = baseline.baseline_count or 0
+
+		# Score against the baseline before this expense is part of it
+		if count >= min_samples and count > 1:
+			std = math.sqrt(flt(baseline.baseline_m2) / (count - 1))
+			score = (amount - flt(baseline.baseline_mean)) / std if std else 0
+
+			if score > threshold:
+				findings.append({
+					"expense": expense.name,
+					"anomaly_type": "Outlier",
+					"score": score,
+					"details": _("Amount {0} is {1} standard deviations above the {2} average of {3}.").format(
+						amount, round(score, 1), expense.category, round(flt(baseline.baseline_mean), 2)
+					),
+				})
+
+		# Each expense joins the baseline once, so edits and rescans are not counted twice
+		if update_baselines and not expense.anomaly_baseline_counted:
+			count += 1
+			delta = amount - flt(baseline.baseline_mean)
+			baseline.baseline_mean = flt(baseline.baseline_mean) + delta / count
+			baseline.baseline_m2 = flt(baseline.baseline_m2) + delta * (amount - baseline.baseline_mean)
+			baseline.baseline_count = count
+			changed.add(baseline.name)
+			counted.append(expense.name)
+
+	for name in changed:
+		baseline = baselines[name]
+		frappe.db.set_value("Expense Category", name, {
+			"baseline_count": baseline.baseline_count,
+			"baseline_mean": baseline.baseline_mean,
+			"baseline_m2": baseline.baseline_m2,
+			"baseline_std": math.sqrt(baseline.baseline_m2 / (baseline.baseline_count - 1))
+			if baseline.baseline_count > 1 else 0,
+		}, update_modified=False)
+
+	if counted:
+		frappe.db.set_value(
+			"Expense", {"name": ("in", counted)}, "anomaly_baseline_counted", 1, update_modified=False
+		)
+
+	return findings
+
+
+def _record_findings(findings):
+	"""Insert findings that are not already in the review queue."""
+	if not findings:
+		return 0
+
+	existing = {
+		(row.expense, row.anomaly_type)
+		for row in frappe.get_all(
+			"Expense Anomaly",
+			filters={"expense": ("in", list({finding["expense"] for finding in findings}))},
+			fields=["expense", "anomaly_type"],
+		)
+	}
+
+	added = 0
+	for finding in findings:
+		if (finding["expense"], finding["anomaly_type"]) in existing:
+			continue
+
+		frappe.get_doc({"doctype": "Expense Anomaly", **finding}).insert(ignore_permissions=True)
+		existing.add((finding["expense"], finding["anomaly_type"]))
+		added += 1
+
+	return added
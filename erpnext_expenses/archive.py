@@ -0,0 +1,372 @@
+"""
+Archiving of fully posted expenses.
+
+Expense Reports whose journals are created (and, when paid by the employee,
+whose reimbursement batch is completed) never change again. Once every
+expense in such a report is older than the retention window set in Expense
+Settings, archive_expenses() moves the report, its lines, its expenses and
+their attachment and split rows into archive tables with the same columns,
+so the live tables only hold the data hot queries actually look at.
+
+Rows are moved in chunks of reports, each chunk copied and deleted in one
+transaction with the reports locked, by a daily job that stops after
+MAX_RUNTIME and carries on the next day.
+
+Range partitioning by expense_date is not an option: MariaDB requires the
+partitioning column in every unique key, and Frappe tables are keyed on
+`name` alone.
+
+Reporting reads reach archived rows through history views, which union each
+live table with its archive: get_table() returns the view instead of the live
+table for queries reaching back to archived dates. get_expense() and
+get_report() load an expense or a report from wherever it is.
+
+Desk forms only read the live tables, so links to archived documents (from
+Expense Anomaly, Card Statement Line or Expense Event) open nothing, and
+get_expense() or get_report() must be used instead. The detail view of an
+archived report falls back to get_report(); its print view is not available.
+The journal of an archived report cannot be cancelled, as the report could
+no longer move back to Approved. benchmark() times the hot-path queries.
+"""
+
+import statistics
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, get_first_day, getdate, nowdate
+
+# Live table: archive table
+ARCHIVE_TABLES = {
+	"tabExpense": "__ExpenseArchive",
+	"tabExpense Attachment": "__ExpenseAttachmentArchive",
+	"tabExpense Splitting Detail": "__ExpenseSplittingDetailArchive",
+	"tabExpense Report": "__ExpenseReportArchive",
+	"tabExpense Detail": "__ExpenseDetailArchive",
+}
+
+# Live table: view of its live and archived rows
+HISTORY_VIEWS = {
+	"tabExpense": "__ExpenseHistory",
+	"tabExpense Attachment": "__ExpenseAttachmentHistory",
+	"tabExpense Splitting Detail": "__ExpenseSplittingDetailHistory",
+	"tabExpense Report": "__ExpenseReportHistory",
+	"tabExpense Detail": "__ExpenseDetailHistory",
+}
+
+# Reports moved per transaction
+CHUNK_SIZE = 200
+
+# Seconds one run may take; the rest is archived by the next run
+MAX_RUNTIME = 30 * 60
+
+EMPLOYEE_PAID = "Employee (to reimburse)"
+
+REPORT_REMARK = "Expense Report: "
+
+
+def archive_expenses():
+	"""Scheduled job: move fully posted reports and expenses past the retention window."""
+	days = cint(frappe.db.get_single_value("Expense Settings", "archive_after_days"))
+	if days <= 0 or frappe.db.db_type != "mariadb":
+		return 0
+
+	ensure_archive_tables()
+
+	cutoff = add_days(nowdate(), -days)
+	deadline = time.monotonic() + MAX_RUNTIME
+	archived = 0
+
+	while time.monotonic() < deadline:
+		reports = get_archivable_reports(cutoff, CHUNK_SIZE)
+		if not reports:
+			break
+
+		try:
+			latest = _archive_reports(reports)
+			if latest:
+				_set_archived_until(latest)
+			frappe.db.commit()
+			archived += len(reports)
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(title="Error archiving expense reports")
+			break
+
+	return archived
+
+
+def get_archivable_reports(cutoff, limit):
+	"""Return fully posted reports whose expenses are all dated before the cutoff."""
+	return frappe.db.sql_list("""
+		SELECT er.name
+		FROM `tabExpense Report` er
+		LEFT JOIN `tabReimbursement Batch` rb ON rb.name = er.reimbursement_batch
+		WHERE er.docstatus = 1
+		AND er.workflow_state = 'Journals Created'
+		AND (er.paid_by != %(employee_paid)s OR rb.status = 'Completed')
+		AND NOT EXISTS (
+			SELECT 1 FROM `tabExpense Detail` ed
+			WHERE ed.parenttype = 'Expense Report' AND ed.parent = er.name
+			AND ed.expense_date >= %(cutoff)s
+		)
+		ORDER BY er.name
+		LIMIT %(limit)s
+	""", {"employee_paid": EMPLOYEE_PAID, "cutoff": cutoff, "limit": limit})
+
+
+def _archive_reports(reports):
+	"""Move reports, their lines and their expenses into the archive tables.
+
+	Returns:
+		The latest expense date moved
+	"""
+	# Lock the reports, and skip any that changed since they were selected
+	reports = frappe.db.sql_list("""
+		SELECT name FROM `tabExpense Report`
+		WHERE name IN %s AND docstatus = 1 AND workflow_state = 'Journals Created'
+		FOR UPDATE
+	""", (tuple(reports),))
+	if not reports:
+		return None
+
+	expenses = frappe.db.sql_list("""
+		SELECT DISTINCT expense_id FROM `tabExpense Detail`
+		WHERE parenttype = 'Expense Report' AND parent IN %s AND IFNULL(expense_id, '') != ''
+	""", (tuple(reports),))
+
+	latest = frappe.db.sql("""
+		SELECT MAX(expense_date) FROM `tabExpense Detail`
+		WHERE parenttype = 'Expense Report' AND parent IN %s
+	""", (tuple(reports),))[0][0]
+
+	if expenses:
+		_move("tabExpense Attachment", expenses, parenttype="Expense")
+		_move("tabExpense Splitting Detail", expenses, parenttype="Expense")
+		_move("tabExpense", expenses)
+
+	_move("tabExpense Detail", reports, parenttype="Expense Report")
+	_move("tabExpense Report", reports)
+
+	return latest
+
+
+def _move(table, names, parenttype=None):
+	"""Copy rows into the table's archive and delete them from the live table."""
+	if parenttype:
+		condition = "parenttype = %(parenttype)s AND parent IN %(names)s"
+	else:
+		condition = "name IN %(names)s"
+
+	values = {"names": tuple(names), "parenttype": parenttype}
+	columns = ", ".join(f"`{column}`" for column in _get_columns(table))
+
+	frappe.db.sql(
+		f"REPLACE INTO `{ARCHIVE_TABLES[table]}` ({columns}) SELECT {columns} FROM `{table}` WHERE {condition}",
+		values,
+	)
+	frappe.db.sql(f"DELETE FROM `{table}` WHERE {condition}", values)
+
+
+def _set_archived_until(latest):
+	archived_until = frappe.db.get_single_value("Expense Settings", "archived_until")
+	if not archived_until or getdate(latest) > getdate(archived_until):
+		frappe.db.set_single_value("Expense Settings", "archived_until", latest)
+
+
+def ensure_archive_tables():
+	"""Create the archive tables and history views, adding columns added to the live tables since."""
+	for table, archive in ARCHIVE_TABLES.items():
+		if not frappe.db.sql("SHOW TABLES LIKE %s", archive):
+			frappe.db.sql_ddl(f"CREATE TABLE `{archive}` LIKE `{table}`")
+		else:
+			archived = set(_get_column_types(archive))
+			for column, column_type in _get_column_types(table).items():
+				if column not in archived:
+					frappe.db.sql_ddl(f"ALTER TABLE `{archive}` ADD COLUMN `{column}` {column_type} NULL")
+
+		columns = ", ".join(f"`{column}`" for column in _get_columns(table))
+		frappe.db.sql_ddl(
+			f"CREATE OR REPLACE VIEW `{HISTORY_VIEWS[table]}` AS "
+			f"SELECT {columns} FROM `{table}` UNION ALL SELECT {columns} FROM `{archive}`"
+		)
+
+
+def _get_columns(table):
+	return list(_get_column_types(table))
+
+
+def _get_column_types(table):
+	return dict(frappe.db.sql("""
+		SELECT column_name, column_type FROM information_schema.columns
+		WHERE table_schema = DATABASE() AND table_name = %s
+		ORDER BY ordinal_position
+	""", (table,)))
+
+
+def get_table(doctype, from_date=None):
+	"""Return the quoted table to read a doctype's rows from.
+
+	That is the history view if rows have been archived and the query reaches
+	back to the latest archived expense date, and the live table otherwise.
+	"""
+	table = f"tab{doctype}"
+	if table not in HISTORY_VIEWS:
+		return f"`{table}`"
+
+	archived_until = frappe.db.get_single_value("Expense Settings", "archived_until")
+	if archived_until and (not from_date or getdate(from_date) <= getdate(archived_until)):
+		return f"`{HISTORY_VIEWS[table]}`"
+
+	return f"`{table}`"
+
+
+@frappe.whitelist()
+def get_expense(name):
+	"""Return an expense with its attachments and split lines, live or archived."""
+	if frappe.db.exists("Expense", name):
+		doc = frappe.get_doc("Expense", name)
+		doc.check_permission("read")
+		return doc.as_dict()
+
+	return _get_archived("Expense", name, (
+		("attachments", "tabExpense Attachment"),
+		("table_jkwj", "tabExpense Splitting Detail"),
+	))
+
+
+@frappe.whitelist()
+def get_report(name):
+	"""Return an expense report with its lines, live or archived."""
+	if frappe.db.exists("Expense Report", name):
+		doc = frappe.get_doc("Expense Report", name)
+		doc.check_permission("read")
+		return doc.as_dict()
+
+	return _get_archived("Expense Report", name, (("expense", "tabExpense Detail"),))
+
+
+def _get_archived(doctype, name, child_tables):
+	"""Load an archived document and its child rows, for its owner or a manager."""
+	row = None
+	if frappe.db.get_single_value("Expense Settings", "archived_until"):
+		row = frappe.db.sql(
+			f"SELECT * FROM `{ARCHIVE_TABLES[f'tab{doctype}']}` WHERE name = %s", (name,), as_dict=True
+		)
+	if not row:
+		frappe.throw(_("{0} {1} not found").format(_(doctype), name), frappe.DoesNotExistError)
+
+	doc = row[0]
+	if doc.owner != frappe.session.user:
+		frappe.only_for(["System Manager", "Accounts Manager"])
+
+	for fieldname, table in child_tables:
+		doc[fieldname] = frappe.db.sql(
+			f"SELECT * FROM `{ARCHIVE_TABLES[table]}` WHERE parenttype = %s AND parent = %s ORDER BY idx",
+			(doctype, name),
+			as_dict=True,
+		)
+
+	doc["archived"] = 1
+
+	return doc
+
+
+def is_archived(doctype, name):
+	"""Return whether a document has been moved out of its live table."""
+	archive = ARCHIVE_TABLES.get(f"tab{doctype}")
+	if not archive or not frappe.db.get_single_value("Expense Settings", "archived_until"):
+		return False
+
+	return bool(frappe.db.sql(f"SELECT 1 FROM `{archive}` WHERE name = %s", (name,)))
+
+
+def validate_journal_entry_cancel(doc, method=None):
+	"""Block cancelling the journal of an archived report.
+
+	Hooked on Journal Entry before_cancel: the report's workflow state lives
+	in the archive and can no longer move back to Approved.
+	"""
+	remark = doc.remark or ""
+	if not remark.startswith(REPORT_REMARK):
+		return
+
+	report = remark[len(REPORT_REMARK):].strip()
+	if not frappe.db.exists("Expense Report", report) and is_archived("Expense Report", report):
+		frappe.throw(
+			_("Journal Entry {0} posts Expense Report {1}, which is archived, so it cannot be cancelled.").format(
+				doc.name, report
+			),
+			title=_("Archived Expense Report"),
+		)
+
+
+# Queries on the hot path of day-to-day use, timed by benchmark()
+HOT_QUERIES = {
+	"employee_drafts": """
+		SELECT name, expense_date, total FROM `tabExpense`
+		WHERE employee = %(employee)s AND docstatus = 0
+		ORDER BY expense_date DESC LIMIT 20
+	""",
+	"auto_batch_scan": """
+		SELECT name, employee, company, paid_by, expense_date FROM `tabExpense`
+		WHERE docstatus = 0 AND expense_date <= %(today)s
+		ORDER BY expense_date, name
+	""",
+	"company_month_totals": """
+		SELECT COUNT(*), SUM(base_total) FROM `tabExpense`
+		WHERE company = %(company)s AND docstatus < 2 AND expense_date >= %(month_start)s
+	""",
+	"pending_reports": """
+		SELECT name, employee, workflow_state FROM `tabExpense Report`
+		WHERE docstatus < 2 AND workflow_state IN ('Pending Manager', 'Pending Finance', 'Approved')
+		ORDER BY modified DESC LIMIT 20
+	""",
+	"active_report_links": """
+		SELECT ed.expense_id, ed.parent FROM `tabExpense Detail` ed
+		INNER JOIN `tabExpense Report` er ON er.name = ed.parent
+		WHERE ed.parenttype = 'Expense Report' AND er.docstatus < 2
+		AND ed.expense_id IN (
+			SELECT name FROM (
+				SELECT name FROM `tabExpense` WHERE company = %(company)s ORDER BY modified DESC LIMIT 50
+			) recent
+		)
+	""",
+}
+
+
+def benchmark(runs=20):
+	"""Time the hot-path queries, without changing any data.
+
+	Run it before enabling archiving and again after the daily job has run to
+	compare; `bench execute` prints the returned timings:
+
+		bench --site <site> execute erpnext_expenses.archive.benchmark
+
+	Returns:
+		Dict with the median milliseconds of each query
+	"""
+	return _time_queries(cint(runs))
+
+
+def _time_queries(runs):
+	latest = frappe.db.sql("""
+		SELECT employee, company FROM `tabExpense` ORDER BY modified DESC LIMIT 1
+	""", as_dict=True)
+	values = {
+		"employee": latest[0].employee if latest else None,
+		"company": latest[0].company if latest else None,
+		"today": nowdate(),
+		"month_start": get_first_day(nowdate()),
+	}
+
+	timings = {}
+	for name, query in HOT_QUERIES.items():
+		samples = []
+		for run in range(runs):
+			start = time.perf_counter()
+			frappe.db.sql(query, values)
+			samples.append((time.perf_counter() - start) * 1000)
+		timings[name] = statistics.median(samples)
+
+	return timings
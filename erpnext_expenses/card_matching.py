@@ -0,0 +1,360 @@
+"""
+Corporate card statement import and matching.
+
+A Card Statement holds the CSV a card issuer sends each month. Processing it
+(in a background job routed through job_router) imports every line as a Card
+Statement Line, then pairs each line with an existing company-paid Expense of
+the same employee, currency and amount, dated within the statement's date
+window. Lines left over become draft Expenses for their employees to complete.
+
+Matching reads all candidate expenses with one query and indexes them by
+(employee, currency, amount in minor units), each bucket sorted by date. A
+line finds its bucket with a dict lookup and its date window with bisect, so
+a statement of 50,000 lines matches in well under a second of Python instead
+of comparing every line with every expense. Lines are matched oldest first,
+each taking the expense closest to its date, and an expense is used once.
+"""
+
+import bisect
+import csv
+import io
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, create_batch, flt, getdate, now
+
+from erpnext_expenses import money
+from erpnext_expenses.job_router import enqueue_for_company
+
+COMPANY_PAID = "Company"
+
+# Statement lines inserted per query
+INSERT_CHUNK_SIZE = 5000
+
+# Draft expenses created per transaction
+EXPENSE_CHUNK_SIZE = 200
+
+# Line field: accepted CSV headers, compared lowercased and stripped
+COLUMNS = {
+	"transaction_date": ("date", "transaction date", "transaction_date", "posting date"),
+	"amount": ("amount", "transaction amount"),
+	"employee": ("employee", "employee id"),
+	"currency": ("currency",),
+	"card_number": ("card", "card number", "card_number"),
+	"description": ("description", "merchant", "details"),
+	"reference": ("reference", "transaction id", "reference number"),
+}
+
+REQUIRED_COLUMNS = ("transaction_date", "amount", "employee")
+
+LINE_FIELDS = ["transaction_date", "amount", "currency", "employee", "card_number", "description", "reference"]
+
+
+@frappe.whitelist()
+def process_statement(statement):
+	"""Queue the import and matching of a Card Statement."""
+	doc = frappe.get_doc("Card Statement", statement)
+	doc.check_permission("write")
+
+	if doc.status not in ("Draft", "Failed"):
+		frappe.throw(_("Card Statement {0} is already {1}.").format(doc.name, _(doc.status)))
+
+	doc.db_set("status", "Queued")
+	enqueue_for_company(doc.company, "erpnext_expenses.card_matching.run_statement", statement=doc.name)
+
+	return {"response": "Success"}
+
+
+def run_statement(statement):
+	"""Background job: import a statement's lines if needed, match them and create missing expenses.
+
+	Lines already imported are kept, and only unmatched lines are matched
+	again, so a failed run can simply be queued again.
+	"""
+	doc = frappe.get_doc("Card Statement", statement)
+	status = "Processed"
+
+	try:
+		if not frappe.db.exists("Card Statement Line", {"card_statement": statement}):
+			import_lines(doc)
+			frappe.db.commit()
+
+		match_statement(doc)
+		frappe.db.commit()
+
+		if doc.create_missing_expenses:
+			create_missing_expenses(doc)
+
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(title=f"Error processing card statement {statement}")
+		status = "Failed"
+
+	counts = _get_counts(statement)
+	frappe.db.set_value("Card Statement", statement, {
+		"status": status,
+		"line_count": sum(counts.values()),
+		"matched_count": counts.get("Matched", 0),
+		"created_count": counts.get("Created", 0),
+		"unmatched_count": counts.get("Unmatched", 0),
+	})
+	frappe.db.commit()
+
+	frappe.publish_realtime(
+		"card_statement_processed",
+		{"statement": statement, "status": status},
+		user=frappe.session.user
+	)
+
+
+def _get_counts(statement):
+	return dict(frappe.db.sql("""
+		SELECT status, COUNT(*) FROM `tabCard Statement Line`
+		WHERE card_statement = %s
+		GROUP BY status
+	""", (statement,)))
+
+
+def import_lines(doc):
+	"""Read the statement file and insert its lines.
+
+	Returns:
+		The number of lines imported
+	"""
+	file = frappe.get_doc("File", {"file_url": doc.statement_file})
+	content = file.get_content()
+	if isinstance(content, bytes):
+		content = content.decode("utf-8-sig")
+
+	currency = doc.currency or frappe.get_cached_value("Company", doc.company, "default_currency")
+	lines = parse_statement(content, currency)
+
+	timestamp = now()
+	user = frappe.session.user
+	for chunk in create_batch(lines, INSERT_CHUNK_SIZE):
+		frappe.db.bulk_insert(
+			"Card Statement Line",
+			fields=["name", "creation", "modified", "owner", "modified_by", "card_statement", "status"] + LINE_FIELDS,
+			values=[
+				(frappe.generate_hash(length=12), timestamp, timestamp, user, user, doc.name, "Unmatched",
+					*(line[fieldname] for fieldname in LINE_FIELDS))
+				for line in chunk
+			],
+		)
+
+	return len(lines)
+
+
+def parse_statement(content, currency):
+	"""Parse statement CSV text into line dicts.
+
+	Blank rows are skipped. Amounts may use thousands separators; negative
+	amounts (refunds) are kept but never matched.
+	"""
+	reader = csv.reader(io.StringIO(content))
+	header = [column.strip().lower() for column in next(reader, [])]
+
+	positions = {}
+	for fieldname, aliases in COLUMNS.items():
+		for alias in aliases:
+			if alias in header:
+				positions[fieldname] = header.index(alias)
+				break
+
+	missing = [fieldname for fieldname in REQUIRED_COLUMNS if fieldname not in positions]
+	if missing:
+		frappe.throw(
+			_("The statement file has no {0} column.").format(
+				", ".join(COLUMNS[fieldname][0].title() for fieldname in missing)
+			),
+			title=_("Invalid Statement File"),
+		)
+
+	lines = []
+	for row_number, row in enumerate(reader, 2):
+		if not any(value.strip() for value in row):
+			continue
+
+		values = {
+			fieldname: row[position].strip() if position < len(row) else ""
+			for fieldname, position in positions.items()
+		}
+
+		try:
+			transaction_date = getdate(values["transaction_date"])
+		except Exception:
+			frappe.throw(
+				_("Row {0}: {1} is not a valid date.").format(row_number, values["transaction_date"]),
+				title=_("Invalid Statement File"),
+			)
+
+		lines.append({
+			"transaction_date": transaction_date,
+			"amount": flt(values["amount"].replace(",", "")),
+			"currency": values.get("currency") or currency,
+			"employee": values["employee"] or None,
+			"card_number": values.get("card_number") or None,
+			"description": values.get("description") or None,
+			"reference": values.get("reference") or None,
+		})
+
+	return lines
+
+
+def match_statement(doc):
+	"""Link the unmatched lines of a statement to existing company-paid expenses.
+
+	Returns:
+		The number of lines matched
+	"""
+	lines = frappe.get_all(
+		"Card Statement Line",
+		filters={"card_statement": doc.name, "status": "Unmatched", "amount": (">", 0), "employee": ("is", "set")},
+		fields=["name", "transaction_date", "amount", "currency", "employee"],
+		order_by="transaction_date, name",
+		limit_page_length=0,
+	)
+	if not lines:
+		return 0
+
+	window = cint(doc.date_window)
+	precision = money.get_company_precision(doc.company)
+
+	# Company-paid expenses in the statement's date range, not yet linked to a card line
+	candidates = frappe.db.sql("""
+		SELECT e.name, e.employee, e.currency, e.total, e.expense_date
+		FROM `tabExpense` e
+		WHERE e.company = %(company)s
+		AND e.paid_by = %(paid_by)s
+		AND e.docstatus < 2
+		AND e.expense_date BETWEEN %(from_date)s AND %(to_date)s
+		AND NOT EXISTS (SELECT 1 FROM `tabCard Statement Line` csl WHERE csl.expense = e.name)
+	""", {
+		"company": doc.company,
+		"paid_by": COMPANY_PAID,
+		"from_date": add_days(lines[0].transaction_date, -window),
+		"to_date": add_days(lines[-1].transaction_date, window),
+	}, as_dict=True)
+
+	matches = match_lines(lines, build_index(candidates, precision), window, precision)
+
+	for chunk in create_batch(list(matches.items()), INSERT_CHUNK_SIZE):
+		frappe.db.bulk_update(
+			"Card Statement Line",
+			{line: {"expense": expense, "status": "Matched"} for line, expense in chunk},
+		)
+
+	return len(matches)
+
+
+def build_index(expenses, precision):
+	"""Index expenses by (employee, currency, amount in minor units).
+
+	Returns:
+		Dict of key: list of (date ordinal, expense name), sorted
+	"""
+	index = {}
+	for expense in expenses:
+		key = (expense.employee, expense.currency, money.to_minor(expense.total, precision))
+		index.setdefault(key, []).append((getdate(expense.expense_date).toordinal(), expense.name))
+
+	for bucket in index.values():
+		bucket.sort()
+
+	return index
+
+
+def match_lines(lines, index, window, precision):
+	"""Pair lines with indexed expenses, taking matched expenses out of the index.
+
+	Lines should come oldest first. Each takes the expense of its bucket
+	closest to its date within the window; on a tie, the earlier one.
+
+	Returns:
+		Dict of line name: expense name
+	"""
+	matches = {}
+	for line in lines:
+		bucket = index.get((line.employee, line.currency, money.to_minor(line.amount, precision)))
+		if not bucket:
+			continue
+
+		day = getdate(line.transaction_date).toordinal()
+		start = bisect.bisect_left(bucket, (day - window,))
+		end = bisect.bisect_left(bucket, (day + window + 1,))
+		if start == end:
+			continue
+
+		best = min(range(start, end), key=lambda position: abs(bucket[position][0] - day))
+		matches[line.name] = bucket.pop(best)[1]
+
+	return matches
+
+
+def create_missing_expenses(doc):
+	"""Create a draft company-paid expense for each unmatched line of a statement.
+
+	Each expense is owned by its employee's user, so it shows up in their
+	drafts. A line whose expense fails validation is logged and left
+	unmatched.
+
+	Returns:
+		The number of expenses created
+	"""
+	lines = frappe.get_all(
+		"Card Statement Line",
+		filters={"card_statement": doc.name, "status": "Unmatched", "amount": (">", 0), "employee": ("is", "set")},
+		fields=["name", "transaction_date", "amount", "currency", "employee", "description", "reference"],
+		order_by="transaction_date, name",
+		limit_page_length=0,
+	)
+	if not lines:
+		return 0
+
+	users = dict(frappe.get_all(
+		"Employee",
+		filters={"name": ("in", list({line.employee for line in lines}))},
+		fields=["name", "user_id"],
+		as_list=True,
+	))
+
+	created = 0
+	for chunk in create_batch(lines, EXPENSE_CHUNK_SIZE):
+		updates = {}
+		for line in chunk:
+			frappe.db.savepoint("card_statement_line")
+			try:
+				expense = _make_expense(doc, line, users.get(line.employee))
+			except Exception:
+				frappe.db.rollback(save_point="card_statement_line")
+				frappe.log_error(title=f"Error creating an expense for card statement line {line.name}")
+				continue
+
+			updates[line.name] = {"expense": expense, "status": "Created"}
+
+		if updates:
+			frappe.db.bulk_update("Card Statement Line", updates)
+		frappe.db.commit()
+		created += len(updates)
+
+	return created
+
+
+def _make_expense(statement, line, owner):
+	expense = frappe.get_doc({
+		"doctype": "Expense",
+		"expense_description": line.description or _("Card transaction {0}").format(line.reference or line.name),
+		"expense_date": line.transaction_date,
+		"category": statement.default_category,
+		"total": line.amount,
+		"currency": line.currency,
+		"paid_by": COMPANY_PAID,
+		"company": statement.company,
+		"employee": line.employee,
+		"notes": _("Created from Card Statement {0}").format(statement.name),
+	})
+	if owner:
+		expense.owner = owner
+
+	expense.insert(ignore_permissions=True)
+	return expense.name
@@ -0,0 +1,42 @@
+// Copyright (c) 2026, Karani Geoffrey and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("Card Statement", {
+	setup(frm) {
+		frappe.realtime.on('card_statement_processed', function(data) {
+			if (data.statement === frm.doc.name) {
+				frm.reload_doc();
+			}
+		});
+	},
+
+	refresh(frm) {
+		if (frm.is_new()) {
+			return;
+		}
+
+		if (['Draft', 'Failed'].includes(frm.doc.status)) {
+			frm.add_custom_button(__('Process Statement'), function() {
+				frappe.call({
+					method: 'erpnext_expenses.card_matching.process_statement',
+					args: { statement: frm.doc.name },
+					callback: function(r) {
+						if (r.message && r.message.response === 'Success') {
+							frappe.show_alert({
+								message: __('Statement queued. This page will refresh when it is processed.'),
+								indicator: 'blue'
+							});
+							frm.reload_doc();
+						}
+					}
+				});
+			});
+		}
+
+		if (frm.doc.line_count) {
+			frm.add_custom_button(__('View Lines'), function() {
+				frappe.set_route('List', 'Card Statement Line', { card_statement: frm.doc.name });
+			});
+		}
+	},
+});
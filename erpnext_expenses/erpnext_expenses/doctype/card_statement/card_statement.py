@@ -0,0 +1,25 @@
+# Copyright (c) 2026, Karani Geoffrey and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+
+class CardStatement(Document):
+	def validate(self):
+		if self.create_missing_expenses and not self.default_category:
+			frappe.throw(_("Set a Category for New Expenses, or turn off creating draft expenses."))
+
+		before = self.get_doc_before_save()
+		if before and before.statement_file != self.statement_file and self.line_count:
+			frappe.throw(_("The statement file cannot be changed after its lines are imported."))
+
+	def on_trash(self):
+		if self.status == "Queued":
+			frappe.throw(_("Card Statement {0} is being processed.").format(self.name))
+
+		if frappe.db.exists("Card Statement Line", {"card_statement": self.name, "status": "Created"}):
+			frappe.throw(_("Draft expenses were created from this statement. Delete them first."))
+
+		frappe.db.delete("Card Statement Line", {"card_statement": self.name})
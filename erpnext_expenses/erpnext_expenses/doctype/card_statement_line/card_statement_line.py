@@ -0,0 +1,23 @@
+# Copyright (c) 2026, Karani Geoffrey and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+
+class CardStatementLine(Document):
+	def validate(self):
+		# Lines are linked by hand when the matching engine could not find the expense
+		if not self.expense:
+			self.status = "Unmatched"
+			return
+
+		other = frappe.db.get_value(
+			"Card Statement Line", {"expense": self.expense, "name": ("!=", self.name)}, "name"
+		)
+		if other:
+			frappe.throw(_("Expense {0} is already linked to card statement line {1}.").format(self.expense, other))
+
+		if self.status == "Unmatched":
+			self.status = "Matched"
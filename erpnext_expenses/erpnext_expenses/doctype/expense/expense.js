@@ -40,9 +40,26 @@ frappe.ui.form.on("Expense", {
             });
         }
 
-        // Show attachment limits info and view button
-        updateAttachmentInfo(frm);
-        setupAttachmentViewing(frm);
+        // Split lines can only post to cost centers and projects of the expense company
+        frm.set_query('cost_center', 'table_jkwj', function() {
+            return {
+                filters: {
+                    company: frm.doc.company,
+                    is_group: 0
+                }
+            };
+        });
+        frm.set_query('project', 'table_jkwj', function() {
+            return {
+                filters: {
+                    company: frm.doc.company
+                }
+            };
+        });
+
+        // Show attachment limits info, the view button and the split summary
+        applyExpenseSummary(frm);
+        setupAttachmentMetadata(frm);
     },
 
     onload: function(frm) {
@@ -98,10 +115,61 @@ frappe.ui.form.on("Expense", {
             frm.set_value('expense_date', '');
             frappe.throw(__('The expense date cannot be in the future.'));
         }
+        setExchangeRate(frm);
+    },
+
+    company: function(frm) {
+        // Expenses default to the company currency
+        if (frm.doc.company && !frm.doc.currency) {
+            frappe.db.get_value('Company', frm.doc.company, 'default_currency', function(r) {
+                if (r && r.default_currency) {
+                    frm.set_value('currency', r.default_currency);
+                }
+            });
+        }
+    },
+
+    currency: function(frm) {
+        setExchangeRate(frm);
+    },
+
+    total: function(frm) {
+        setBaseTotal(frm);
+    },
+
+    exchange_rate: function(frm) {
+        setBaseTotal(frm);
     }
 });
 
 
+// Fetch the rate from the expense currency to the company currency
+function setExchangeRate(frm) {
+    if (!frm.doc.currency || !frm.doc.company || !frm.doc.expense_date) return;
+
+    frappe.call({
+        method: 'erpnext_expenses.erpnext_expenses.doctype.expense.expense.get_exchange_rate',
+        args: {
+            'currency': frm.doc.currency,
+            'company': frm.doc.company,
+            'date': frm.doc.expense_date
+        },
+        callback: function(r) {
+            if (r.message) {
+                frm.set_value('exchange_rate', r.message);
+            }
+        }
+    });
+}
+
+
+// Show the total in company currency (recomputed exactly on the server)
+function setBaseTotal(frm) {
+    frm.set_value('base_total', flt((frm.doc.total || 0) * (frm.doc.exchange_rate || 1),
+        precision('base_total')));
+}
+
+
 // Attachment child table events
 frappe.ui.form.on("Expense Attachment", {
     attachments_add: function(frm, cdt, cdn) {
@@ -227,7 +295,9 @@ function calculateTotalAmount(frm, total_expense_amount) {
         }
     });
 
-    if (hasValue && total_expense_amount !== total_amount) {
+    // Compare at currency precision to avoid floating point noise
+    const currency_precision = precision('total');
+    if (hasValue && flt(total_expense_amount, currency_precision) !== flt(total_amount, currency_precision)) {
         frappe.throw(__("The split amount ({0}) does not match the expense total ({1}).",
             [total_amount, total_expense_amount]));
     }
@@ -265,10 +335,91 @@ function validateAttachments(frm) {
 }
 
 
+// Show attachment and split line counts and totals from the server summary,
+// fetched once per saved version of the expense instead of walking its rows
+function applyExpenseSummary(frm) {
+    if (frm.is_new()) return;
+
+    const version = frm.doc.name + ':' + frm.doc.modified;
+    if (frm.expense_summary && frm.expense_summary.version === version) {
+        renderExpenseSummary(frm, frm.expense_summary);
+        return;
+    }
+
+    frappe.call({
+        method: 'erpnext_expenses.erpnext_expenses.doctype.expense.expense.get_expense_summary',
+        args: {
+            'expense': frm.doc.name
+        },
+        callback: function(r) {
+            if (!r.message) return;
+
+            frm.expense_summary = Object.assign({version: version}, r.message);
+            renderExpenseSummary(frm, frm.expense_summary);
+        }
+    });
+}
+
+
+function renderExpenseSummary(frm, summary) {
+    updateAttachmentInfo(frm, summary.attachment_count);
+    setupAttachmentViewing(frm, summary.attachment_count);
+
+    const section = frm.get_field('expense_splitting_section');
+    if (section && summary.split_count) {
+        section.df.label = __('Expense Splitting ({0} lines, {1})', [
+            summary.split_count,
+            format_currency(summary.split_total, frm.doc.currency)
+        ]);
+        section.refresh();
+    }
+}
+
+
+// Fetch attachment metadata (file sizes) only when the attachments section is expanded
+function setupAttachmentMetadata(frm) {
+    const section = frm.get_field('attachments_section');
+    if (!section || !section.head || section.metadata_handler_added) return;
+
+    section.metadata_handler_added = true;
+    section.head.on('click', function() {
+        if (frm.is_new() || section.is_collapsed()) return;
+
+        loadAttachmentMetadata(frm, function(attachments) {
+            const totalSize = attachments.reduce((total, att) => total + (att.file_size || 0), 0);
+            section.df.description = attachments.length
+                ? __('{0} files, {1} MB in total', [attachments.length, (totalSize / (1024 * 1024)).toFixed(2)])
+                : '';
+            section.refresh();
+        });
+    });
+}
+
+
+// Attachment rows with file sizes, cached per saved version of the expense
+function loadAttachmentMetadata(frm, callback) {
+    const version = frm.doc.name + ':' + frm.doc.modified;
+    if (frm.attachment_metadata && frm.attachment_metadata.version === version) {
+        callback(frm.attachment_metadata.attachments);
+        return;
+    }
+
+    frappe.call({
+        method: 'erpnext_expenses.erpnext_expenses.doctype.expense.expense.get_expense_attachments',
+        args: {
+            'expense': frm.doc.name
+        },
+        callback: function(r) {
+            frm.attachment_metadata = {version: version, attachments: r.message || []};
+            callback(frm.attachment_metadata.attachments);
+        }
+    });
+}
+
+
 // Setup attachment viewing: add "View Attachments" button on form
-function setupAttachmentViewing(frm) {
-    const attachments = (frm.doc.attachments || []).filter(function(a) { return a.attachment; });
-    if (!attachments.length || frm.is_new()) return;
+function setupAttachmentViewing(frm, count) {
+    if (!count || frm.is_new()) return;
 
     frm.add_custom_button(__('View Attachments'), function() {
         showAttachmentsGallery(frm);
@@ -305,9 +456,18 @@ function openAttachment(url, fileName) {
 }
 
 
-// Show gallery dialog with all attachments
+// Show gallery dialog with all attachments, fetched when it is opened
 function showAttachmentsGallery(frm) {
-    const attachments = (frm.doc.attachments || []).filter(function(a) { return a.attachment; });
+    if (frm.is_dirty()) {
+        renderAttachmentsGallery((frm.doc.attachments || []).filter(function(a) { return a.attachment; }));
+        return;
+    }
+
+    loadAttachmentMetadata(frm, renderAttachmentsGallery);
+}
+
+
+function renderAttachmentsGallery(attachments) {
     if (!attachments.length) {
         frappe.msgprint(__('No attachments found.'));
         return;
@@ -336,7 +496,11 @@ function showAttachmentsGallery(frm) {
             + '<i class="fa ' + iconClass + '"></i> '
             + '<a href="' + url + '" target="_blank" style="font-weight: 500;">'
             + frappe.utils.escape_html(fileName)
-            + '</a></div>';
+            + '</a>'
+            + (att.file_size
+                ? '<span style="color: var(--text-muted); font-size: 12px;">' + __('{0} MB', [(att.file_size / (1024 * 1024)).toFixed(2)]) + '</span>'
+                : '')
+            + '</div>';
 
         if (att.description) {
             html += '<div style="color: var(--text-muted); font-size: 12px; margin-top: 4px;">'
@@ -360,9 +524,11 @@ function showAttachmentsGallery(frm) {
 }
 
 
-// Update attachment info display
-function updateAttachmentInfo(frm) {
-    const count = (frm.doc.attachments || []).filter(a => a.attachment).length;
+// Update attachment info display; count the rows only when no count is given
+function updateAttachmentInfo(frm, count) {
+    if (count === undefined) {
+        count = (frm.doc.attachments || []).filter(a => a.attachment).length;
+    }
     const remaining = ATTACHMENT_CONFIG.maxFiles - count;
 
     // Update section label with count
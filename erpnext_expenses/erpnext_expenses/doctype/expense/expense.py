@@ -4,9 +4,13 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from frappe.utils import add_days, flt, get_first_day, getdate, now_datetime
 import json
 import os
 
+from erpnext_expenses import anomalies, locks, money, policy
+from erpnext_expenses.exchange_rates import ExchangeRateTable, get_company_currency
+
 # Attachment configuration
 MAX_ATTACHMENTS = 5
 MAX_FILE_SIZE_MB = 5
@@ -32,6 +36,34 @@ class Expense(Document):
 		"""Validate expense document before saving."""
 		self.validate_employee()
 		self.validate_attachments()
+		self.validate_split_amounts()
+		self.set_exchange_rate()
+		self.validate_policy()
+		self.duplicate_key = anomalies.get_duplicate_key(self)
+		for row in self.get('table_jkwj') or []:
+			row.duplicate_key = anomalies.get_duplicate_key(self, row.amount)
+
+	def on_update(self):
+		"""Keep the policy period counters in step with this expense."""
+		policy.update_counters(self)
+
+	def on_cancel(self):
+		policy.update_counters(self, removed=True)
+
+	def on_trash(self):
+		if self.docstatus != 2:
+			policy.update_counters(self, removed=True)
+
+	def validate_policy(self):
+		"""Block or warn on expenses that break the company's expense policy."""
+		violations = policy.evaluate_expense(self)
+
+		blocking = [violation['message'] for violation in violations if violation['action'] == 'Block']
+		if blocking:
+			frappe.throw('<br>'.join(blocking), title=_('Expense Policy Violation'))
+
+		for violation in violations:
+			frappe.msgprint(violation['message'], title=_('Expense Policy Warning'), indicator='orange')
 
 	def validate_employee(self):
 		"""Ensure non-managers can only create expenses for themselves."""
@@ -114,6 +146,115 @@ class Expense(Document):
 			)
 
 
+	def set_exchange_rate(self):
+		"""Default the currency and convert the total into company currency."""
+		company_currency = get_company_currency(self.company)
+		self.currency = self.currency or company_currency
+
+		rate_source_changed = self.has_value_changed('currency') or self.has_value_changed('expense_date')
+
+		if self.currency == company_currency:
+			self.exchange_rate = 1
+		elif rate_source_changed or flt(self.exchange_rate) in (0, 1):
+			table = ExchangeRateTable.preload(company_currency, [self.currency])
+			self.exchange_rate = float(table.get_rate(self.currency, self.expense_date))
+
+		precision = self.precision('base_total')
+		self.base_total = money.to_float(money.convert(self.total, self.exchange_rate, precision), precision)
+
+	def validate_split_amounts(self):
+		"""Recalculate split VAT and check the split lines add up to the total exactly."""
+		if not self.table_jkwj:
+			self.split_total = 0
+			return
+
+		precision = self.precision('total')
+		percentages = {
+			row.name: row.tax_percentage
+			for row in frappe.get_all(
+				'Expense Taxes',
+				filters={'name': ('in', list({row.vat for row in self.table_jkwj if row.vat}) or [''])},
+				fields=['name', 'tax_percentage']
+			)
+		}
+
+		split_total = 0
+		for row in self.table_jkwj:
+			vat_amount = money.percentage_of(row.amount, percentages.get(row.vat, 0), precision)
+			row.vat_amount = money.to_float(vat_amount, precision)
+			split_total += money.to_minor(row.amount, precision)
+
+		self.split_total = money.to_float(split_total, precision)
+
+		if split_total and split_total != money.to_minor(self.total, precision):
+			frappe.throw(
+				_('The split amount ({0}) does not match the expense total ({1}).').format(
+					self.split_total, self.total
+				)
+			)
+
+
+def on_doctype_update():
+	"""Index descriptions and notes for erpnext_expenses.search."""
+	from erpnext_expenses.search import EXPENSE_INDEX, add_fulltext_index
+
+	add_fulltext_index('tabExpense', EXPENSE_INDEX, ['expense_description', 'notes'])
+
+
+@frappe.whitelist()
+def get_expense_summary(expense):
+	"""Return the attachment and split line counts and totals of an expense, without its rows."""
+	if not frappe.has_permission('Expense', 'read', expense):
+		frappe.throw(_('You do not have permission to access this expense'), frappe.PermissionError)
+
+	attachment_count = frappe.db.sql("""
+		SELECT COUNT(*) FROM `tabExpense Attachment`
+		WHERE parenttype = 'Expense' AND parent = %s AND IFNULL(attachment, '') != ''
+	""", (expense,))[0][0]
+
+	split_count, split_total, vat_total = frappe.db.sql("""
+		SELECT COUNT(*), IFNULL(SUM(amount), 0), IFNULL(SUM(vat_amount), 0)
+		FROM `tabExpense Splitting Detail`
+		WHERE parenttype = 'Expense' AND parent = %s
+	""", (expense,))[0]
+
+	return {
+		'attachment_count': attachment_count,
+		'max_attachments': MAX_ATTACHMENTS,
+		'split_count': split_count,
+		'split_total': flt(split_total),
+		'vat_total': flt(vat_total),
+	}
+
+
+@frappe.whitelist()
+def get_expense_attachments(expense):
+	"""Return the attachments of an expense with their file sizes, for the gallery."""
+	if not frappe.has_permission('Expense', 'read', expense):
+		frappe.throw(_('You do not have permission to access this expense'), frappe.PermissionError)
+
+	return frappe.db.sql("""
+		SELECT ea.attachment, ea.file_name, ea.description, f.file_size
+		FROM `tabExpense Attachment` ea
+		LEFT JOIN `tabFile` f ON f.file_url = ea.attachment
+			AND f.attached_to_doctype = 'Expense' AND f.attached_to_name = ea.parent
+		WHERE ea.parenttype = 'Expense' AND ea.parent = %s AND IFNULL(ea.attachment, '') != ''
+		ORDER BY ea.idx
+	""", (expense,), as_dict=True)
+
+
+@frappe.whitelist()
+def get_exchange_rate(currency, company, date):
+	"""Get the rate from an expense currency to the company currency on a date."""
+	if not company or not currency:
+		return 1
+
+	company_currency = get_company_currency(company)
+	table = ExchangeRateTable.preload(company_currency, [currency])
+
+	return float(table.get_rate(currency, date))
+
+
 @frappe.whitelist()
 def get_logged_in_employee():
 	"""Get the employee record associated with the logged-in user."""
@@ -152,6 +293,40 @@ def create_expense_report(expense, details=None):
 	if not frappe.has_permission('Expense', 'read', expense):
 		frappe.throw(_('You do not have permission to access this expense'), frappe.PermissionError)
 
+	# Check the expense policy for all the expenses at once, before any changes
+	expense_ids = [detail.get('expense_id') for detail in details] if details else [expense]
+	blocking = policy.get_blocking_messages(policy.evaluate_expenses(expense_ids))
+	if blocking:
+		frappe.throw('<br>'.join(blocking), title=_('Expense Policy Violation'))
+
+	# Receipts may have been deleted, or the limits changed, since the expenses were saved
+	from erpnext_expenses import receipts
+
+	receipts.validate_expenses(expense_ids)
+
+	# Overlapping requests wait for each other here, so the active-report
+	# checks and the inserts below cannot interleave
+	with locks.hold(locks.expense_lock_keys(expense_ids)):
+		response = _create_expense_report(expense, details)
+
+	if response.get('response') != 'Success':
+		return response
+
+	# Flag likely duplicates and outliers for review; never fails the report
+	try:
+		found = anomalies.check_expenses(expense_ids)
+		frappe.db.commit()
+		if found:
+			response['anomalies'] = found
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(f"Error checking expenses for anomalies: {str(e)}")
+
+	return response
+
+
+def _create_expense_report(expense, details=None):
+	"""Create the report and its lines, and submit the expenses, in one transaction."""
 	report = None
 
 	try:
@@ -162,7 +337,10 @@ def create_expense_report(expense, details=None):
 			'employee',
 			'expense_date',
 			'company',
-			'paid_by'
+			'paid_by',
+			'currency',
+			'exchange_rate',
+			'base_total'
 		]
 
 		# Get the data from the Expense doctype
@@ -183,8 +361,19 @@ def create_expense_report(expense, details=None):
 		report.insert()
 
 		if details:
+			# Currency data comes from the database, not from the client
+			currencies = {
+				row.name: row
+				for row in frappe.db.get_all(
+					'Expense',
+					filters={'name': ('in', [detail.get('expense_id') for detail in details])},
+					fields=['name', 'currency', 'exchange_rate', 'base_total']
+				)
+			}
+
 			for detail in details:
 				_check_expense_not_in_active_report(detail.get('expense_id'))
+				currency_data = currencies.get(detail.get('expense_id')) or {}
 				report_detail = frappe.get_doc({
 					'doctype': 'Expense Detail',
 					'parent': report.name,
@@ -194,7 +383,10 @@ def create_expense_report(expense, details=None):
 					'expense_date': detail.get('expense_date'),
 					'category': detail.get('category'),
 					'description': detail.get('description'),
-					'subtotal': detail.get('subtotal')
+					'subtotal': detail.get('subtotal'),
+					'currency': currency_data.get('currency'),
+					'exchange_rate': currency_data.get('exchange_rate') or 1,
+					'base_subtotal': currency_data.get('base_total')
 				})
 				report_detail.insert()
 
@@ -210,7 +402,10 @@ def create_expense_report(expense, details=None):
 				'expense_date': expense_data.expense_date,
 				'category': expense_data.category,
 				'description': expense_data.expense_description,
-				'subtotal': expense_data.total
+				'subtotal': expense_data.total,
+				'currency': expense_data.currency,
+				'exchange_rate': expense_data.exchange_rate or 1,
+				'base_subtotal': expense_data.base_total
 			})
 			report_detail.insert()
 
@@ -248,20 +443,36 @@ def _check_expense_not_in_active_report(expense_id):
 		)
 
 	# Check if expense is already linked to an active (non-cancelled) report
-	existing = frappe.db.sql("""
-		SELECT ed.parent FROM `tabExpense Detail` ed
-		JOIN `tabExpense Report` er ON er.name = ed.parent
-		WHERE ed.expense_id = %s AND er.docstatus != 2
-		LIMIT 1
-	""", (expense_id,), as_dict=True)
+	existing = _get_active_report_links([expense_id])
 
 	if existing:
 		frappe.throw(
-			_('Expense {0} is already linked to Expense Report {1}.').format(expense_id, existing[0].parent),
+			_('Expense {0} is already linked to Expense Report {1}.').format(expense_id, existing[expense_id]),
 			title=_('Expense Already in Report')
 		)
 
 
+def _get_active_report_links(expense_ids):
+	"""Map each expense already linked to an active (non-cancelled) report to that report.
+
+	Args:
+		expense_ids: List of Expense names
+
+	Returns:
+		Dict of {expense_id: report_name} for the linked expenses only
+	"""
+	if not expense_ids:
+		return {}
+
+	linked = frappe.db.sql("""
+		SELECT ed.expense_id, ed.parent FROM `tabExpense Detail` ed
+		JOIN `tabExpense Report` er ON er.name = ed.parent
+		WHERE ed.expense_id IN %s AND er.docstatus != 2
+	""", (tuple(expense_ids),), as_dict=True)
+
+	return {row.expense_id: row.parent for row in linked}
+
+
 def _submit_expense(expense_name):
 	"""Submit an expense document (docstatus 0 → 1).
 
@@ -276,6 +487,22 @@ def _submit_expense(expense_name):
 		raise
 
 
+def _submit_expenses(expense_names):
+	"""Submit several Draft expenses through the document API.
+
+	Used by background batching. Each expense goes through validate and its
+	submit hooks, so policy counters, events and child rows stay consistent;
+	the caller commits or rolls back all of them together.
+
+	Args:
+		expense_names: List of Expense names
+	"""
+	for expense_name in expense_names:
+		doc = frappe.get_doc('Expense', expense_name)
+		if doc.docstatus == 0:
+			doc.submit()
+
+
 @frappe.whitelist()
 def create_bulk_expense_report(selected):
 	"""Create an expense report from multiple selected expenses."""
@@ -310,3 +537,139 @@ def create_bulk_expense_report(selected):
 
 	# Pass the information for processing
 	return create_expense_report(last_expense, details)
+
+
+def auto_batch_draft_expenses():
+	"""Scheduled job: group Draft expenses into Expense Reports per period.
+
+	Expenses are grouped by employee, company, paid by and reporting period,
+	and only periods that have fully ended are batched. Each run starts from
+	the watermark in Expense Settings, so it only scans expenses dated after
+	the last batched period or modified since the last run.
+	"""
+	settings = frappe.get_single('Expense Settings')
+	if not settings.auto_batch_enabled:
+		return
+
+	run_started = now_datetime()
+	period = settings.auto_batch_period or 'Weekly'
+
+	# Batch up to the end of the last fully elapsed period
+	cutoff = add_days(_get_period_start(getdate(), period), -1)
+
+	expenses = frappe.db.sql("""
+		SELECT name, owner, employee, company, paid_by, expense_date,
+			category, expense_description, total, currency, exchange_rate, base_total
+		FROM `tabExpense`
+		WHERE docstatus = 0
+		AND expense_date <= %(cutoff)s
+		AND (expense_date > %(processed_until)s OR modified > %(last_run)s)
+		ORDER BY expense_date, name
+	""", {
+		'cutoff': cutoff,
+		'processed_until': settings.auto_batch_processed_until or '1900-01-01',
+		'last_run': settings.auto_batch_last_run or '1900-01-01 00:00:00',
+	}, as_dict=True)
+
+	# Drafts of reports sent back to Draft are still linked, leave them there
+	skipped = set(_get_active_report_links([expense.name for expense in expenses]))
+
+	# Expenses breaking a blocking policy rule stay in Draft for the employee to fix
+	violations = policy.evaluate_expenses([expense.name for expense in expenses if expense.name not in skipped])
+	skipped.update(
+		expense_name
+		for expense_name, found in violations.items()
+		if any(violation['action'] == 'Block' for violation in found)
+	)
+
+	groups = {}
+	for expense in expenses:
+		if expense.name in skipped:
+			continue
+
+		key = (
+			expense.employee,
+			expense.company,
+			expense.paid_by,
+			_get_period_start(expense.expense_date, period)
+		)
+		groups.setdefault(key, []).append(expense)
+
+	created = 0
+	processed_until = max(cutoff, getdate(settings.auto_batch_processed_until or cutoff))
+	for group in groups.values():
+		try:
+			with locks.hold(locks.expense_lock_keys([expense.name for expense in group])):
+				_create_report_for_group(group)
+				frappe.db.commit()
+			created += 1
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error(f"Error auto-batching expenses {[expense.name for expense in group]}: {str(e)}")
+
+			# Keep the failed group's dates ahead of the watermark, so the next run retries it
+			earliest = min(getdate(expense.expense_date) for expense in group)
+			processed_until = min(processed_until, add_days(earliest, -1))
+
+	frappe.db.set_single_value('Expense Settings', {
+		'auto_batch_processed_until': processed_until,
+		'auto_batch_last_run': run_started,
+	})
+	frappe.db.commit()
+
+	return created
+
+
+def _create_report_for_group(expenses):
+	"""Create one Expense Report for a group of Draft expenses.
+
+	Args:
+		expenses: Expense rows sharing employee, company and paid by
+	"""
+	# Checked again under the lock, in case a user reported some of them meanwhile
+	linked = _get_active_report_links([expense.name for expense in expenses])
+	if linked:
+		frappe.throw(_('Expenses {0} are already in an Expense Report.').format(', '.join(linked)))
+
+	first = expenses[0]
+
+	report = frappe.get_doc({
+		'doctype': 'Expense Report',
+		'employee': first.employee,
+		'paid_by': first.paid_by,
+		'company': first.company,
+		'expense': [
+			{
+				'expense_id': expense.name,
+				'expense_date': expense.expense_date,
+				'category': expense.category,
+				'description': expense.expense_description,
+				'subtotal': expense.total,
+				'currency': expense.currency,
+				'exchange_rate': expense.exchange_rate or 1,
+				'base_subtotal': expense.base_total
+			}
+			for expense in expenses
+		]
+	})
+	report.insert(ignore_permissions=True)
+
+	# The report belongs to whoever recorded the expenses, so they can submit it
+	report.db_set('owner', first.owner, update_modified=False)
+
+	_submit_expenses([expense.name for expense in expenses])
+
+	return report
+
+
+def _get_period_start(date, period):
+	"""Return the first day of the reporting period containing a date."""
+	date = getdate(date)
+
+	if period == 'Daily':
+		return date
+	if period == 'Monthly':
+		return get_first_day(date)
+
+	# Weekly periods start on Monday
+	return add_days(date, -date.weekday())
@@ -0,0 +1,75 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses import anomalies
+
+
+def make_expense(name, total, creation, splits=()):
+	expense = frappe._dict(
+		name=name, employee="EMP-0001", company="_Test Company", category="Travel",
+		expense_date="2026-10-01", currency="USD", total=total, creation=creation,
+	)
+	expense.duplicate_key = anomalies.get_duplicate_key(expense)
+	expense.lines = [
+		frappe._dict(
+			parent=name, amount=amount, vat=None, cost_center=cost_center, project=None,
+			duplicate_key=anomalies.get_duplicate_key(expense, amount),
+		)
+		for amount, cost_center in splits
+	]
+
+	return expense
+
+
+class TestExpenseAnomaly(FrappeTestCase):
+	def find_duplicates(self, checked, stored):
+		"""Run duplicate detection on expenses with the database faked by the stored expenses."""
+		stored = sorted(stored, key=lambda expense: expense.creation)
+
+		def get_all(doctype, filters, **kwargs):
+			return [line for expense in checked for line in expense.lines]
+
+		def sql(query, values, **kwargs):
+			rows = []
+			for expense in stored:
+				for key in [expense.duplicate_key] + [line.duplicate_key for line in expense.lines]:
+					if key in values["keys"]:
+						rows.append(frappe._dict(duplicate_key=key, name=expense.name, creation=expense.creation))
+			return rows
+
+		with patch.object(frappe, "get_all", get_all), patch.object(frappe.db, "sql", sql):
+			return anomalies._find_duplicates(checked)
+
+	def test_split_line_claimed_by_a_later_expense(self):
+		split = make_expense("EXP-1", 100, "2026-10-01 09:00", splits=[(60, "Main"), (40, "Sales")])
+		claim = make_expense("EXP-2", 40, "2026-10-02 09:00")
+
+		findings = self.find_duplicates([split, claim], [split, claim])
+
+		self.assertEqual(
+			[(finding["expense"], finding["anomaly_type"], finding["duplicate_of"]) for finding in findings],
+			[("EXP-2", "Duplicate", "EXP-1")],
+		)
+
+	def test_split_of_an_earlier_expense(self):
+		original = make_expense("EXP-1", 40, "2026-10-01 09:00")
+		split = make_expense("EXP-2", 100, "2026-10-02 09:00", splits=[(60, "Main"), (40, "Sales")])
+
+		findings = self.find_duplicates([split], [original, split])
+
+		self.assertEqual([(finding["expense"], finding["duplicate_of"]) for finding in findings], [("EXP-2", "EXP-1")])
+
+	def test_equal_lines_of_one_expense(self):
+		# Same amount on different cost centers is a normal split
+		split = make_expense("EXP-1", 100, "2026-10-01 09:00", splits=[(50, "Main"), (50, "Sales")])
+		self.assertEqual(self.find_duplicates([split], [split]), [])
+
+		repeated = make_expense("EXP-2", 100, "2026-10-02 09:00", splits=[(50, "Main"), (50, "Main")])
+		findings = self.find_duplicates([repeated], [repeated])
+
+		self.assertEqual([finding["anomaly_type"] for finding in findings], ["Duplicate Split Line"])
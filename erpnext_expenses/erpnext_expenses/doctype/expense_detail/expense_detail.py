@@ -4,6 +4,13 @@
 # import frappe
 from frappe.model.document import Document
 
+from erpnext_expenses.search import EXPENSE_DETAIL_INDEX, add_fulltext_index
+
 
 class ExpenseDetail(Document):
 	pass
+
+
+def on_doctype_update():
+	"""Index line descriptions for erpnext_expenses.search."""
+	add_fulltext_index('tabExpense Detail', EXPENSE_DETAIL_INDEX, ['description'])
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Karani Geoffrey and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Expense Event", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,13 @@
+# Copyright (c) 2026, Karani Geoffrey and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+
+class ExpenseEvent(Document):
+	def validate(self):
+		# The event log is append-only
+		if not self.is_new():
+			frappe.throw(_("Expense Events cannot be changed"))
@@ -0,0 +1,202 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+from contextlib import ExitStack, contextmanager
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses import events, hooks
+
+
+class FakeDoc(frappe._dict):
+	def get_doc_before_save(self):
+		return self.before
+
+
+def make_report(expenses, workflow_state="Draft", before=None):
+	return FakeDoc(
+		name="EXP-REP-0001",
+		company="_Test Company",
+		employee="EMP-0001",
+		paid_by="Company",
+		workflow_state=workflow_state,
+		expense=[frappe._dict(expense_id=expense) for expense in expenses],
+		before=before,
+	)
+
+
+class EventTable:
+	"""In-memory Expense Event rows; rows of transactions still open are invisible to locking reads."""
+
+	def __init__(self):
+		self.rows = {}
+
+	def insert(self, name, committed=True):
+		self.rows[name] = frappe._dict(name=name, sequence=0, committed=committed, data=None)
+
+	def sql(self, query, *args, **kwargs):
+		# The highest sequence given
+		return [(max((row.sequence for row in self.rows.values()), default=0),)]
+
+	def sql_list(self, query, *args, **kwargs):
+		# Committed rows without a sequence, by id; FOR UPDATE SKIP LOCKED passes over the others
+		return sorted(name for name, row in self.rows.items() if row.committed and not row.sequence)
+
+	def bulk_update(self, doctype, updates, **kwargs):
+		for name, values in updates.items():
+			self.rows[name].update(values)
+
+	def get_all(self, doctype, filters, fields, order_by, limit_page_length):
+		after = filters["sequence"][1]
+		rows = sorted((row for row in self.rows.values() if row.sequence > after), key=lambda row: row.sequence)
+		return [frappe._dict(row) for row in rows[:limit_page_length]]
+
+
+@contextmanager
+def hold(keys):
+	yield
+
+
+class TestExpenseEvent(FrappeTestCase):
+	def record(self, hook, doc):
+		"""Run a doc event and return the events it records as (event type, doctype, name) tuples."""
+		recorded = []
+
+		def record_events(event_type, doctype, names, **kwargs):
+			recorded.extend((event_type, doctype, name) for name in names)
+
+		with patch.object(events, "record_events", record_events):
+			hook(doc)
+
+		return recorded
+
+	def test_report_submit_hooked_once(self):
+		# Frappe runs on_update on submit too
+		report_events = hooks.doc_events["Expense Report"]
+		self.assertEqual(report_events["on_update"], "erpnext_expenses.events.on_report_update")
+		self.assertNotIn("on_submit", report_events)
+
+	def test_report_created(self):
+		recorded = self.record(events.on_report_update, make_report(["EXP-1", "EXP-2"]))
+
+		self.assertEqual(recorded, [
+			("Created", "Expense Report", "EXP-REP-0001"),
+			("Added to Report", "Expense", "EXP-1"),
+			("Added to Report", "Expense", "EXP-2"),
+		])
+
+	def test_report_transition_records_new_expenses_only(self):
+		before = make_report(["EXP-1"])
+		recorded = self.record(
+			events.on_report_update, make_report(["EXP-1", "EXP-2"], "Pending Manager", before=before)
+		)
+
+		self.assertEqual(recorded, [
+			("Added to Report", "Expense", "EXP-2"),
+			("Workflow Transition", "Expense Report", "EXP-REP-0001"),
+		])
+
+	def test_report_unchanged(self):
+		before = make_report(["EXP-1"], "Approved")
+		self.assertEqual(self.record(events.on_report_update, make_report(["EXP-1"], "Approved", before=before)), [])
+
+	def test_report_back_to_draft_reverts_expenses(self):
+		before = make_report(["EXP-1", "EXP-2"], "Pending Manager")
+		recorded = self.record(events.on_report_update, make_report(["EXP-1", "EXP-2"], "Draft", before=before))
+
+		self.assertEqual(recorded, [
+			("Workflow Transition", "Expense Report", "EXP-REP-0001"),
+			("Reverted", "Expense", "EXP-1"),
+			("Reverted", "Expense", "EXP-2"),
+		])
+
+	def test_report_cancel_reverts_expenses(self):
+		before = make_report(["EXP-1"], "Journals Created")
+		recorded = self.record(events.on_report_cancel, make_report(["EXP-1"], "Cancelled", before=before))
+
+		self.assertEqual(recorded, [
+			("Workflow Transition", "Expense Report", "EXP-REP-0001"),
+			("Reverted", "Expense", "EXP-1"),
+		])
+
+	def test_expense_events(self):
+		expense = frappe._dict(
+			name="EXP-1", company="_Test Company", employee="EMP-0001", category="Travel",
+			expense_date="2026-10-01", total=100, currency="USD", docstatus=0, flags=frappe._dict(in_insert=True),
+		)
+
+		self.assertEqual(self.record(events.on_expense_insert, expense), [("Created", "Expense", "EXP-1")])
+		# The update run by insert is not recorded again
+		self.assertEqual(self.record(events.on_expense_update, expense), [])
+
+		expense.flags.in_insert = False
+		self.assertEqual(self.record(events.on_expense_update, expense), [("Updated", "Expense", "EXP-1")])
+		self.assertEqual(self.record(events.on_expense_trash, expense), [("Deleted", "Expense", "EXP-1")])
+
+	def test_journal_entry_events(self):
+		journal_entry = frappe._dict(name="ACC-JV-0001", company="_Test Company", remark="Expense Report: EXP-REP-0001")
+
+		self.assertEqual(
+			self.record(events.on_journal_entry_submit, journal_entry),
+			[("Journal Posted", "Expense Report", "EXP-REP-0001")],
+		)
+		self.assertEqual(
+			self.record(events.on_journal_entry_cancel, journal_entry),
+			[("Reverted", "Expense Report", "EXP-REP-0001")],
+		)
+
+		journal_entry.remark = "Reimbursement Batch: RB-0001 (EMP-0001)"
+		self.assertEqual(self.record(events.on_journal_entry_submit, journal_entry), [])
+
+	@contextmanager
+	def event_table(self):
+		table = EventTable()
+
+		with ExitStack() as stack:
+			stack.enter_context(patch.object(events.locks, "hold", hold))
+			stack.enter_context(patch.object(frappe.db, "sql", table.sql))
+			stack.enter_context(patch.object(frappe.db, "sql_list", table.sql_list))
+			stack.enter_context(patch.object(frappe.db, "bulk_update", table.bulk_update))
+			stack.enter_context(patch.object(frappe.db, "commit"))
+			stack.enter_context(patch.object(frappe, "get_all", table.get_all))
+			stack.enter_context(patch.object(frappe, "only_for"))
+			yield table
+
+	def test_cursor_follows_commit_order(self):
+		with self.event_table() as table:
+			# Event 1 belongs to a long transaction that commits after event 2
+			table.insert(1, committed=False)
+			table.insert(2)
+			events.sequence_events()
+
+			page = events.get_events(after=0)
+			self.assertEqual([event.name for event in page["events"]], [2])
+			self.assertEqual(page["cursor"], 1)
+
+			table.rows[1].committed = True
+			table.insert(3)
+			events.sequence_events()
+
+			page = events.get_events(after=page["cursor"])
+			self.assertEqual([event.name for event in page["events"]], [1, 3])
+			self.assertEqual(page["cursor"], 3)
+			self.assertFalse(page["has_more"])
+
+			# Nothing new: the cursor stays where it is
+			self.assertEqual(events.get_events(after=3), {"events": [], "cursor": 3, "has_more": False})
+
+	def test_cursor_pages(self):
+		with self.event_table() as table:
+			for name in range(1, 6):
+				table.insert(name)
+			events.sequence_events()
+
+			page = events.get_events(after=0, limit=2)
+			self.assertEqual([event.sequence for event in page["events"]], [1, 2])
+			self.assertTrue(page["has_more"])
+
+			page = events.get_events(after=page["cursor"], limit=10)
+			self.assertEqual([event.sequence for event in page["events"]], [3, 4, 5])
+			self.assertFalse(page["has_more"])
@@ -0,0 +1,24 @@
+# Copyright (c) 2026, Karani Geoffrey and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+from erpnext_expenses.policy import clear_policy_cache
+
+
+class ExpensePolicy(Document):
+	def validate(self):
+		"""Period limits only apply to spending limit rules."""
+		for rule in self.rules:
+			if rule.rule_type == 'Receipt Required':
+				rule.period = 'Per Expense'
+			elif not rule.period:
+				frappe.throw(_('Row #{0}: Period is required for spending limits.').format(rule.idx))
+
+	def on_update(self):
+		clear_policy_cache()
+
+	def on_trash(self):
+		clear_policy_cache()
@@ -42,6 +42,16 @@ frappe.ui.form.on("Expense Report", {
                 });
             });
         }
+
+        // Submitted reports have a cached print view that browsers can revalidate
+        if (frm.doc.docstatus === 1) {
+            frm.add_custom_button(__('Print View'), function() {
+                window.open(
+                    '/api/method/erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report.get_report_view'
+                    + `?report=${encodeURIComponent(frm.doc.name)}`
+                );
+            });
+        }
 	}
 
     // Journal creation is only triggered via the custom "Create Journal Entries" button
@@ -1,31 +1,130 @@
+import json
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import nowdate
+from frappe.model.workflow import apply_workflow, get_workflow_name
+from frappe.utils import create_batch, nowdate
+from werkzeug.wrappers import Response
+
+from erpnext_expenses import archive, events, locks, money, receipts, report_views
+from erpnext_expenses.accounting_dimensions import get_default_dimensions, get_dimension_fields
+from erpnext_expenses.erpnext_expenses.report.expense_analytics.expense_analytics import clear_analytics_cache
+from erpnext_expenses.exchange_rates import ExchangeRateTable, get_company_currency
+from erpnext_expenses.job_router import enqueue_for_company, group_by_company
+from erpnext_expenses.money import get_company_precision
+
+# Number of reports transitioned per database transaction in bulk workflow jobs
+BULK_TRANSITION_CHUNK_SIZE = 20
+
+# Largest number of reports in one PDF pack
+MAX_PDF_PACK_REPORTS = 1000
 
 
 class ExpenseReport(Document):
+    def validate(self):
+        # Recheck every receipt when the report is sent to the manager
+        if self.workflow_state == 'Pending Manager' and self.has_value_changed('workflow_state'):
+            receipts.validate_expenses([row.expense_id for row in self.expense])
+
     def on_update(self):
         """When report moves back to Draft, revert associated expenses to Draft."""
+        # Bulk transitions revert the expenses of a whole chunk in one update
+        if frappe.flags.in_bulk_expense_transition:
+            return
+
         if self.workflow_state == 'Draft':
             self.revert_expenses_to_draft()
 
+    def on_update_after_submit(self):
+        report_views.clear_report_view_cache([self.name])
+
+    def before_cancel(self):
+        if self.reimbursement_batch:
+            frappe.throw(
+                _('Expense Report {0} is in Reimbursement Batch {1}. Remove it from the batch before cancelling.')
+                .format(self.name, self.reimbursement_batch),
+                title=_('Cannot Cancel')
+            )
+
+    def on_cancel(self):
+        """Reverse the report's journal entries and expenses with it."""
+        _cancel_reports([self.name])
+
+        if self.workflow_state != 'Cancelled':
+            self.db_set('workflow_state', 'Cancelled', update_modified=False)
+
+        report_views.clear_report_view_cache([self.name])
+
+    def on_trash(self):
+        report_views.clear_report_view_cache([self.name])
+
     def revert_expenses_to_draft(self):
         """Revert associated expenses from Submitted back to Draft."""
-        expense_details = frappe.db.get_all(
-            'Expense Detail',
-            filters={'parent': self.name},
-            fields=['expense_id']
+        _revert_expenses_to_draft([self.name])
+
+
+def _revert_expenses_to_draft(report_names):
+    """Revert the submitted expenses of one or more reports back to Draft.
+
+    Args:
+        report_names: List of Expense Report names
+    """
+    if not report_names:
+        return
+
+    # Direct update to revert docstatus
+    # Required because Frappe doesn't support docstatus 1→0 via normal save
+    frappe.db.sql("""
+        UPDATE `tabExpense`
+        SET docstatus = 0
+        WHERE docstatus = 1
+        AND name IN (
+            SELECT expense_id FROM `tabExpense Detail`
+            WHERE parenttype = 'Expense Report' AND parent IN %s
         )
+    """, (tuple(report_names),))
+
 
-        for detail in expense_details:
-            expense_id = detail.expense_id
-            current_docstatus = frappe.db.get_value('Expense', expense_id, 'docstatus')
+def _cancel_reports(report_names):
+    """Cancel the journal entries of reports and revert their expenses to Draft.
 
-            if current_docstatus == 1:
-                # Direct update to revert docstatus
-                # Required because Frappe doesn't support docstatus 1→0 via normal save
-                frappe.db.set_value('Expense', expense_id, 'docstatus', 0)
+    Journal entries are found with one query and expenses reverted with one
+    update. Runs inside the caller's transaction, so a failure rolls back the
+    whole cancellation.
+    """
+    journal_entries = frappe.get_all(
+        'Journal Entry',
+        filters={
+            'remark': ('in', [f'Expense Report: {name}' for name in report_names]),
+            'docstatus': 1,
+        },
+        pluck='name'
+    )
+
+    # The Journal Entry on_cancel hook must not move these reports back to Approved
+    frappe.flags.in_expense_report_cancel = True
+    try:
+        for name in journal_entries:
+            frappe.get_doc('Journal Entry', name).cancel()
+    finally:
+        frappe.flags.in_expense_report_cancel = False
+
+    _revert_expenses_to_draft(report_names)
+
+
+def on_journal_entry_cancel(doc, method=None):
+    """Move an Expense Report back to Approved when its Journal Entry is cancelled."""
+    if frappe.flags.in_expense_report_cancel:
+        return
+
+    remark = doc.remark or ''
+    if not remark.startswith('Expense Report: '):
+        return
+
+    report = remark[len('Expense Report: '):].strip()
+    if frappe.db.get_value('Expense Report', report, 'workflow_state') == 'Journals Created':
+        _update_report_workflow_state(report, 'Approved')
 
 
 @frappe.whitelist()
@@ -39,188 +138,356 @@ def create_journal_entries(report, paying_account=None):
     if not frappe.has_permission('Expense Report', 'write', report):
         frappe.throw(_('You do not have permission to modify this expense report'), frappe.PermissionError)
 
-    try:
-        fields = [
-            'name',
-            'company',
-            'paying_account'
-        ]
+    # Held until after the commit, so a concurrent request sees the posted entry
+    with locks.hold([locks.report_lock_key(report)]):
+        try:
+            fields = [
+                'name',
+                'company',
+                'paying_account'
+            ]
+
+            expense_report = frappe.db.get_all(
+                'Expense Report',
+                filters={'name': report},
+                fields=fields
+            )
 
-        expense_report = frappe.db.get_all(
-            'Expense Report',
-            filters={'name': report},
-            fields=fields
+            if not expense_report:
+                frappe.throw(_("Expense Report {0} not found").format(report))
+
+            expense_report = expense_report[0]
+
+            # Use paying_account passed from client, fall back to DB value
+            if paying_account:
+                expense_report.paying_account = paying_account
+                # Persist to DB for future reference
+                frappe.db.set_value('Expense Report', report, 'paying_account', paying_account)
+                report_views.clear_report_view_cache([report])
+
+            if not expense_report.paying_account:
+                frappe.throw(
+                    _('Please set the Paying Account before creating journal entries.'),
+                    title=_('Missing Paying Account')
+                )
+
+            # Check for existing journal entries to prevent duplicates
+            existing_jv = frappe.db.sql("""
+                SELECT name FROM `tabJournal Entry`
+                WHERE remark = %s
+                AND docstatus = 1
+                LIMIT 1
+            """, (f'Expense Report: {report}',))
+
+            if existing_jv:
+                frappe.throw(
+                    _('Journal Entry {0} already exists for this Expense Report.').format(existing_jv[0][0]),
+                    title=_('Duplicate Journal Entry')
+                )
+
+            accounts, posting_date = get_journal_accounts(
+                report, expense_report.company, expense_report.paying_account
+            )
+
+            # Create the journal entries
+            jv = frappe.new_doc('Journal Entry')
+            jv.voucher_type = 'Journal Entry'
+            jv.naming_series = 'ACC-JV-.YYYY.-'
+            jv.posting_date = posting_date
+            jv.company = expense_report.company
+            jv.remark = f'Expense Report: {expense_report.name}'
+
+            for account in accounts:
+                jv.append('accounts', account)
+
+            jv.save()
+            jv.submit()
+
+            # Change the workflow state of the Expense Report
+            _update_report_workflow_state(report, 'Journals Created')
+
+            frappe.db.commit()
+
+            return {'response': 'Success', 'journal_entry': jv.name}
+
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Error creating journal entries: {str(e)}")
+            frappe.throw(_("Error creating journal entries: {0}").format(str(e)))
+
+
+def get_journal_accounts(report, company, paying_account):
+    """Build the Journal Entry account rows for an expense report.
+
+    Args:
+        report: Name of the Expense Report
+        company: Company of the report
+        paying_account: Account credited with the report total
+
+    Returns:
+        Tuple of (account rows, posting date)
+    """
+    company_currency = get_company_currency(company)
+    precision = get_company_precision(company)
+
+    # Get the expense lines of the report with their category account
+    expense_lines = frappe.db.sql("""
+        SELECT
+            ed.expense_id,
+            ed.subtotal,
+            ed.expense_date,
+            ed.currency,
+            ed.exchange_rate,
+            e.employee,
+            ec.expense_account
+        FROM
+            `tabExpense Detail` ed
+        JOIN
+            `tabExpense` e
+        ON
+            e.name = ed.expense_id
+        JOIN
+            `tabExpense Category` ec
+        ON
+            ec.name = e.category
+        WHERE
+            ed.parent = %s
+        ORDER BY
+            ed.idx
+    """, (report,), as_dict=True)
+
+    # Rates for lines without a stored rate are preloaded once for the report
+    rate_table = ExchangeRateTable.preload(
+        company_currency,
+        [line.currency for line in expense_lines if not line.exchange_rate]
+    )
+
+    for line in expense_lines:
+        if not line.exchange_rate:
+            line.exchange_rate = rate_table.get_rate(line.currency or company_currency, line.expense_date)
+
+    # Default dimensions for lines without their own, resolved once per employee
+    default_dimensions = get_default_dimensions({line.employee for line in expense_lines}, company)
+    for line in expense_lines:
+        line.dimensions = default_dimensions.get(line.employee) or default_dimensions[None]
+
+    # Get the split lines of every expense in the report with one query
+    dimension_fields = get_dimension_fields()
+    split_lines = frappe.db.get_all(
+        'Expense Splitting Detail',
+        filters={
+            'parenttype': 'Expense',
+            'parent': ('in', [line.expense_id for line in expense_lines] or [''])
+        },
+        fields=['parent', 'amount', 'vat', 'vat_amount'] + dimension_fields,
+        order_by='parent, idx'
+    )
+
+    tax_accounts = {
+        row.name: row.tax_account
+        for row in frappe.db.get_all(
+            'Expense Taxes',
+            filters={'name': ('in', list({row.vat for row in split_lines if row.vat}) or [''])},
+            fields=['name', 'tax_account']
         )
+    }
 
-        if not expense_report:
-            frappe.throw(_("Expense Report {0} not found").format(report))
+    accounts = _assemble_journal_accounts(
+        expense_lines, split_lines, tax_accounts, paying_account, precision, dimension_fields
+    )
 
-        expense_report = expense_report[0]
+    # FIX #6: Use the latest expense date as posting date
+    expense_dates = [line.expense_date for line in expense_lines if line.expense_date]
+    posting_date = max(expense_dates) if expense_dates else nowdate()
 
-        # Use paying_account passed from client, fall back to DB value
-        if paying_account:
-            expense_report.paying_account = paying_account
-            # Persist to DB for future reference
-            frappe.db.set_value('Expense Report', report, 'paying_account', paying_account)
+    return accounts, posting_date
 
-        if not expense_report.paying_account:
-            frappe.throw(
-                _('Please set the Paying Account before creating journal entries.'),
-                title=_('Missing Paying Account')
-            )
 
-        # Check for existing journal entries to prevent duplicates
-        existing_jv = frappe.db.sql("""
-            SELECT name FROM `tabJournal Entry`
-            WHERE remark = %s
-            AND docstatus = 1
-            LIMIT 1
-        """, (f'Expense Report: {report}',))
+def _assemble_journal_accounts(expense_lines, split_lines, tax_accounts, paying_account, precision,
+                               dimension_fields=()):
+    """Turn expense and split lines into balanced Journal Entry account rows.
 
-        if existing_jv:
-            frappe.throw(
-                _('Journal Entry {0} already exists for this Expense Report.').format(existing_jv[0][0]),
-                title=_('Duplicate Journal Entry')
-            )
+    All amounts are handled in integer minor units of the company currency.
+    Each expense is converted once; its VAT is converted as a total and split
+    back over its VAT lines with money.allocate(). The rest of the expense is
+    allocated over its split lines by their amount net of VAT, and any part
+    of the subtotal not covered by split lines goes to the expense defaults.
+    Expense debits are aggregated by (account, dimensions) in the same pass,
+    and the credit (the sum of the converted subtotals) always balances them.
 
-        # Get all the expense IDs for the expenses in the report
-        report_expenses = frappe.db.get_all(
-            'Expense Detail',
-            filters={'parent': report},
-            fields=['expense_id']
+    Args:
+        expense_lines: Rows with expense_id, subtotal, exchange_rate,
+            expense_account and dimensions (the default dimension values)
+        split_lines: Rows with parent (expense_id), amount, vat, vat_amount
+            and a value for each dimension field
+        tax_accounts: Dict of {Expense Taxes name: tax account}
+        paying_account: Account credited with the total
+        precision: Decimals of the company currency
+        dimension_fields: Dimension fieldnames, e.g. cost_center and project
+
+    Returns:
+        List of Journal Entry Account dicts
+    """
+    splits_by_expense = {}
+    for split_line in split_lines:
+        splits_by_expense.setdefault(split_line.parent, []).append(split_line)
+
+    expense_debits = {}
+    tax_debits = {}
+    total = 0
+
+    for line in expense_lines:
+        subtotal = money.convert(line.subtotal, line.exchange_rate, precision)
+        splits = splits_by_expense.get(line.expense_id, [])
+        expense_vat = [split for split in splits if split.vat and money.to_decimal(split.vat_amount) > 0]
+
+        # Deduct only the tax for THIS specific expense, not all taxes
+        expense_tax = money.convert(
+            sum(money.to_decimal(split.vat_amount) for split in expense_vat),
+            line.exchange_rate,
+            precision
         )
+        shares = money.allocate(expense_tax, [split.vat_amount for split in expense_vat])
 
-        # Dictionary to store tax amounts for each tax type
-        tax_amounts = {}
+        for split, share in zip(expense_vat, shares):
+            # Get the tax account associated with the tax found
+            tax_account = tax_accounts.get(split.vat)
 
-        # Dictionary to store tax amounts per expense (for correct deduction)
-        expense_tax_totals = {}
+            if not tax_account:
+                frappe.throw(
+                    _('Tax "{0}" does not have a Tax Account configured. '
+                    'Please set a Tax Account in the Expense Taxes master.').format(split.vat),
+                    title=_('Missing Tax Account')
+                )
 
-        # Iterate through each expense to calculate tax amounts
-        for report_expense in report_expenses:
-            expense_id = report_expense.expense_id
-            expense_tax_totals[expense_id] = 0
+            tax_debits[tax_account] = tax_debits.get(tax_account, 0) + share
 
-            expense_vat = frappe.db.get_all(
-                'Expense Splitting Detail',
-                filters={'parent': expense_id},
-                fields=['vat', 'vat_amount']
-            )
+        defaults = line.dimensions or {}
+        targets = [
+            tuple(split.get(field) or defaults.get(field) for field in dimension_fields)
+            for split in splits
+        ]
+        weights = [
+            max(money.to_decimal(split.amount) - money.to_decimal(split.vat_amount), 0)
+            for split in splits
+        ]
+
+        uncovered = money.to_decimal(line.subtotal) - sum(money.to_decimal(split.amount) for split in splits)
+        if uncovered > 0 or not splits:
+            targets.append(tuple(defaults.get(field) for field in dimension_fields))
+            weights.append(uncovered if splits else 1)
+
+        for dimensions, share in zip(targets, money.allocate(subtotal - expense_tax, weights)):
+            key = (line.expense_account, dimensions)
+            expense_debits[key] = expense_debits.get(key, 0) + share
+
+        total += subtotal
+
+    # Entry to the Credit Side
+    accounts = [_journal_account(paying_account, credit=total, precision=precision)]
+
+    # Entry to the Debit Side for each expense account and dimension combination
+    for (expense_account, dimensions), amount_less_tax in expense_debits.items():
+        account = _journal_account(expense_account, debit=amount_less_tax, precision=precision)
+        account.update({field: value for field, value in zip(dimension_fields, dimensions) if value})
+        accounts.append(account)
+
+    # Entry to the tax accounts
+    for tax_account, tax_amount in tax_debits.items():
+        accounts.append(_journal_account(tax_account, debit=tax_amount, precision=precision))
 
-            for tax_exists in expense_vat:
-                if tax_exists.vat_amount and tax_exists.vat_amount > 0:
-                    # Get the tax account associated with the tax found
-                    tax_account = frappe.db.get_value(
-                        'Expense Taxes',
-                        tax_exists.vat,
-                        'tax_account'
-                    )
-
-                    if not tax_account:
-                        frappe.throw(
-                            _('Tax "{0}" does not have a Tax Account configured. '
-                            'Please set a Tax Account in the Expense Taxes master.').format(tax_exists.vat),
-                            title=_('Missing Tax Account')
-                        )
-
-                    if tax_account not in tax_amounts:
-                        tax_amounts[tax_account] = 0
-                    tax_amounts[tax_account] += tax_exists.vat_amount
-
-                    # Track tax per expense for correct deduction
-                    expense_tax_totals[expense_id] += tax_exists.vat_amount
-
-        # Get the associated expense value from the expenses child table
-        expense_details = frappe.db.get_all(
-            'Expense Detail',
-            filters={'parent': report},
-            fields=['expense_id', 'subtotal', 'description', 'expense_date']
+    return accounts
+
+
+def _journal_account(account, debit=0, credit=0, precision=money.DEFAULT_PRECISION):
+    """Build a Journal Entry Account row from minor-unit amounts."""
+    return {
+        'account': account,
+        'debit': money.to_float(debit, precision),
+        'credit': money.to_float(credit, precision),
+        'debit_in_account_currency': money.to_float(debit, precision),
+        'credit_in_account_currency': money.to_float(credit, precision),
+    }
+
+
+@frappe.whitelist()
+def bulk_create_journal_entries(reports):
+    """Queue journal posting for several Approved Expense Reports.
+
+    Reports are posted by one background job per company, routed through the
+    company job queues. Each report uses its own Paying Account.
+
+    Args:
+        reports: JSON list of Expense Report names
+    """
+    if isinstance(reports, str):
+        try:
+            reports = json.loads(reports)
+        except json.JSONDecodeError:
+            frappe.throw(_('Invalid JSON format'))
+
+    if not isinstance(reports, list) or not reports:
+        frappe.throw(_('Please select at least one Expense Report.'))
+
+    reports = list(dict.fromkeys(reports))
+    rows = {
+        row.name: row
+        for row in frappe.get_all(
+            'Expense Report',
+            filters={'name': ('in', reports)},
+            fields=['name', 'company', 'workflow_state', 'paying_account']
+        )
+    }
+
+    outcomes = []
+    queued = {}
+    for name in reports:
+        row = rows.get(name)
+        outcome = {'report': name, 'status': 'Skipped'}
+
+        if not row:
+            outcome['message'] = _('Expense Report {0} not found').format(name)
+        elif not frappe.has_permission('Expense Report', 'write', name):
+            outcome['message'] = _('You do not have permission to modify this expense report')
+        elif row.workflow_state != 'Approved':
+            outcome['message'] = _('Only Approved Expense Reports can be posted.')
+        elif not row.paying_account:
+            outcome['message'] = _('Please set the Paying Account before creating journal entries.')
+        else:
+            outcome['status'] = 'Queued'
+            queued.setdefault(row.company, []).append(name)
+
+        outcomes.append(outcome)
+
+    for company, company_reports in queued.items():
+        enqueue_for_company(
+            company,
+            'erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report.post_journal_entries',
+            reports=company_reports,
         )
 
-        expense_total = sum(item.subtotal for item in expense_details)
-
-        # FIX #6: Use the latest expense date as posting date
-        expense_dates = [item.expense_date for item in expense_details if item.expense_date]
-        posting_date = max(expense_dates) if expense_dates else nowdate()
-
-        # Create the journal entries
-        jv = frappe.new_doc('Journal Entry')
-        jv.voucher_type = 'Journal Entry'
-        jv.naming_series = 'ACC-JV-.YYYY.-'
-        jv.posting_date = posting_date
-        jv.company = expense_report.company
-        jv.remark = f'Expense Report: {expense_report.name}'
-
-        # Entry to the Credit Side
-        jv.append('accounts', {
-            'account': expense_report.paying_account,
-            'credit': float(expense_total),
-            'debit': float(0),
-            'debit_in_account_currency': float(0),
-            'credit_in_account_currency': float(expense_total),
-        })
-
-        # Entry to the Debit Side for each expense category
-        # Using parameterized query to prevent SQL injection
-        expense_account_sql = """
-            SELECT
-                ec.expense_account,
-                ed.subtotal,
-                ed.expense_id
-            FROM
-                `tabExpense Category` ec
-            JOIN
-                `tabExpense` e
-            ON
-                ec.name = e.category
-            JOIN
-                `tabExpense Detail` ed
-            ON
-                e.name = ed.expense_id
-            WHERE
-                ed.parent = %s
-        """
-
-        expense_accounts = frappe.db.sql(expense_account_sql, (report,), as_dict=True)
-
-        for acc in expense_accounts:
-            # Deduct only the tax for THIS specific expense, not all taxes
-            expense_tax = expense_tax_totals.get(acc.expense_id, 0)
-            amount_less_tax = acc.subtotal - expense_tax
-
-            # Entry to the Debit Side
-            jv.append('accounts', {
-                'account': acc.expense_account,
-                'debit': float(amount_less_tax),
-                'credit': float(0),
-                'credit_in_account_currency': float(0),
-                'debit_in_account_currency': float(amount_less_tax)
-            })
-
-        # Entry to the tax accounts
-        for tax_account, tax_amount in tax_amounts.items():
-            jv.append('accounts', {
-                'account': tax_account,
-                'debit': float(tax_amount),
-                'credit': float(0),
-                'credit_in_account_currency': float(0),
-                'debit_in_account_currency': float(tax_amount)
-            })
-
-        jv.save()
-        jv.submit()
-
-        # Change the workflow state of the Expense Report
-        _update_report_workflow_state(report, 'Journals Created')
+    return {'response': 'Success', 'outcomes': outcomes}
 
-        frappe.db.commit()
 
-        return {'response': 'Success', 'journal_entry': jv.name}
+def post_journal_entries(reports):
+    """Background job: create the journal entries of several reports, one transaction each."""
+    outcomes = []
 
-    except Exception as e:
-        frappe.db.rollback()
-        frappe.log_error(f"Error creating journal entries: {str(e)}")
-        frappe.throw(_("Error creating journal entries: {0}").format(str(e)))
+    for name in reports:
+        try:
+            result = create_journal_entries(name)
+            outcomes.append({'report': name, 'status': 'Success', 'message': result['journal_entry']})
+        except Exception as e:
+            frappe.db.rollback()
+            outcomes.append({'report': name, 'status': 'Error', 'message': str(e)})
+
+    frappe.publish_realtime(
+        'expense_report_bulk_transition',
+        {'action': 'Create Journal Entries', 'outcomes': outcomes},
+        user=frappe.session.user
+    )
+
+    return outcomes
 
 
 def _update_report_workflow_state(report_name, target_state):
@@ -231,7 +498,270 @@ def _update_report_workflow_state(report_name, target_state):
         target_state: Target workflow state name (e.g. 'Journals Created')
     """
     try:
+        current = frappe.db.get_value('Expense Report', report_name, ['workflow_state', 'company'], as_dict=True)
         frappe.db.set_value('Expense Report', report_name, 'workflow_state', target_state)
+        report_views.clear_report_view_cache([report_name])
+        clear_analytics_cache()
+
+        # set_value runs no doc events, so the transition is recorded here
+        if current and current.workflow_state != target_state:
+            events.record_workflow_transition(report_name, current.company, current.workflow_state, target_state)
     except Exception as e:
         frappe.log_error(f"Error updating expense report workflow state: {str(e)}")
         raise
+
+
+@frappe.whitelist()
+def get_report_view(report, view='print', print_format=None):
+    """Render an Expense Report for viewing, with caching and ETag support.
+
+    Submitted reports are served from a cache keyed by name and `modified`;
+    a client sending a matching If-None-Match header gets a 304 without the
+    report being rendered again. Draft reports are always rendered fresh.
+
+    Args:
+        report: Expense Report name
+        view: 'print' for print format HTML, 'detail' for the report and its expenses as JSON
+        print_format: Print format for the 'print' view (defaults to the doctype's)
+    """
+    if not report or not isinstance(report, str):
+        frappe.throw(_('Invalid report parameter'))
+
+    if view not in report_views.VIEWS:
+        frappe.throw(_('Invalid view {0}').format(view))
+
+    # Archived reports are out of the live table: serve their detail from the archive
+    if not frappe.db.exists('Expense Report', report) and archive.is_archived('Expense Report', report):
+        if view != 'detail':
+            frappe.throw(
+                _('Expense Report {0} is archived; only its detail view is available.').format(report),
+                title=_('Archived Expense Report')
+            )
+
+        return Response(
+            frappe.as_json(archive.get_report(report)),
+            mimetype='application/json',
+            headers={'Cache-Control': 'no-store'}
+        )
+
+    if not frappe.has_permission('Expense Report', 'read', report):
+        frappe.throw(_('You do not have permission to access this expense report'), frappe.PermissionError)
+
+    if view == 'print':
+        render = lambda: frappe.get_print('Expense Report', report, print_format)
+        mimetype = 'text/html'
+    else:
+        render = lambda: report_views.render_detail(report)
+        mimetype = 'application/json'
+
+    modified = report_views.get_report_version(report)
+    if not modified:
+        return Response(render(), mimetype=mimetype, headers={'Cache-Control': 'no-store'})
+
+    etag = report_views.get_etag(report, modified, view, print_format)
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+
+    if etag in frappe.request.if_none_match:
+        return Response(status=304, headers=headers)
+
+    return Response(report_views.get_cached_view(etag, render), mimetype=mimetype, headers=headers)
+
+
+@frappe.whitelist()
+def create_report_pack(reports, print_format=None, combine=1):
+    """Queue a PDF pack of Expense Reports with their receipts.
+
+    Args:
+        reports: JSON list of Expense Report names
+        print_format: Print format to render the reports with
+        combine: 1 for one zip archive, 0 to attach a PDF to each report
+    """
+    if isinstance(reports, str):
+        try:
+            reports = json.loads(reports)
+        except json.JSONDecodeError:
+            frappe.throw(_('Invalid JSON format'))
+
+    if not isinstance(reports, list) or not reports:
+        frappe.throw(_('Please select at least one Expense Report.'))
+
+    reports = list(dict.fromkeys(reports))
+    if len(reports) > MAX_PDF_PACK_REPORTS:
+        frappe.throw(_('A PDF pack can contain at most {0} Expense Reports.').format(MAX_PDF_PACK_REPORTS))
+
+    for report in reports:
+        if not frappe.has_permission('Expense Report', 'print', report):
+            frappe.throw(
+                _('You do not have permission to print Expense Report {0}').format(report), frappe.PermissionError
+            )
+
+    # One pack per company, each routed to its company's job queue
+    for company, company_reports in group_by_company('Expense Report', reports).items():
+        enqueue_for_company(
+            company,
+            'erpnext_expenses.pdf_packs.build_report_pack',
+            reports=company_reports,
+            print_format=print_format,
+            combine=combine,
+            user=frappe.session.user,
+        )
+
+    return {'response': 'Success', 'count': len(reports)}
+
+
+@frappe.whitelist()
+def bulk_apply_workflow(reports, action):
+    """Apply a workflow action to several Expense Reports in the background.
+
+    Transitions are validated for the whole selection up front. Reports that
+    pass are transitioned by a background job in chunked transactions, which
+    publishes the per-report outcomes to the user when it finishes.
+
+    Args:
+        reports: JSON list of Expense Report names
+        action: Workflow action to apply (e.g. 'Approve')
+    """
+    # Input validation
+    if not reports:
+        frappe.throw(_('Please select at least one Expense Report.'))
+
+    if isinstance(reports, str):
+        try:
+            reports = json.loads(reports)
+        except json.JSONDecodeError:
+            frappe.throw(_('Invalid JSON format'))
+
+    if not isinstance(reports, list) or not reports:
+        frappe.throw(_('Selection must be a list'))
+
+    if not action or not isinstance(action, str):
+        frappe.throw(_('Invalid workflow action'))
+
+    # Drop duplicates while keeping the selection order
+    reports = list(dict.fromkeys(reports))
+    outcomes = _validate_bulk_transition(reports, action)
+    queued = [outcome['report'] for outcome in outcomes if outcome['status'] == 'Queued']
+
+    for company, company_reports in group_by_company('Expense Report', queued).items():
+        enqueue_for_company(
+            company,
+            'erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report.apply_bulk_transition',
+            reports=company_reports,
+            action=action,
+        )
+
+    return {'response': 'Success', 'outcomes': outcomes}
+
+
+def _validate_bulk_transition(report_names, action):
+    """Check that an action is allowed for each report before queueing it.
+
+    Uses one query for the workflow transitions and one for the reports.
+    Transition conditions are evaluated later by apply_workflow().
+
+    Returns:
+        List of outcome dicts with 'report', 'status' and 'message' keys
+    """
+    transitions = frappe.get_all(
+        'Workflow Transition',
+        filters={'parent': get_workflow_name('Expense Report'), 'action': action},
+        fields=['state', 'next_state', 'allowed']
+    )
+
+    roles = set(frappe.get_roles())
+    next_states = {t.state: t.next_state for t in transitions if t.allowed in roles}
+
+    current_states = {
+        row.name: row.workflow_state
+        for row in frappe.get_all(
+            'Expense Report',
+            filters={'name': ('in', report_names)},
+            fields=['name', 'workflow_state']
+        )
+    }
+
+    outcomes = []
+    for name in report_names:
+        outcome = {'report': name, 'status': 'Skipped'}
+        state = current_states.get(name)
+
+        if name not in current_states:
+            outcome['message'] = _('Expense Report {0} not found').format(name)
+        elif not frappe.has_permission('Expense Report', 'write', name):
+            outcome['message'] = _('You do not have permission to modify this expense report')
+        elif state not in next_states:
+            outcome['message'] = _('Action "{0}" is not allowed in state "{1}".').format(_(action), _(state))
+        else:
+            outcome['status'] = 'Queued'
+            outcome['next_state'] = next_states[state]
+
+        outcomes.append(outcome)
+
+    return outcomes
+
+
+def apply_bulk_transition(reports, action):
+    """Background job: apply a workflow action to reports in chunks.
+
+    Each chunk is committed as one transaction. A failing report is rolled
+    back to its savepoint so the rest of the chunk still goes through.
+
+    Args:
+        reports: List of Expense Report names validated by bulk_apply_workflow()
+        action: Workflow action to apply
+    """
+    outcomes = []
+
+    for chunk in create_batch(reports, BULK_TRANSITION_CHUNK_SIZE):
+        outcomes.extend(_apply_transition_chunk(chunk, action))
+
+    frappe.publish_realtime(
+        'expense_report_bulk_transition',
+        {'action': action, 'outcomes': outcomes},
+        user=frappe.session.user
+    )
+
+    return outcomes
+
+
+def _apply_transition_chunk(report_names, action):
+    """Apply a workflow action to one chunk of reports in a single transaction."""
+    outcomes = []
+    reverted = []
+
+    frappe.flags.in_bulk_expense_transition = True
+    try:
+        for name in report_names:
+            savepoint = f'bulk_transition_{frappe.generate_hash(length=8)}'
+            frappe.db.savepoint(savepoint)
+
+            try:
+                doc = apply_workflow({'doctype': 'Expense Report', 'name': name}, action)
+            except Exception as e:
+                frappe.db.rollback(save_point=savepoint)
+                outcomes.append({'report': name, 'status': 'Error', 'message': str(e)})
+                continue
+
+            if doc.workflow_state == 'Draft':
+                reverted.append(name)
+
+            outcomes.append({'report': name, 'status': 'Success', 'workflow_state': doc.workflow_state})
+
+        # Side effects of the transitions, batched for the whole chunk
+        _revert_expenses_to_draft(reverted)
+
+        frappe.db.commit()
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Error applying bulk workflow action {action}: {str(e)}")
+
+        outcomes = [
+            {'report': name, 'status': 'Error', 'message': _('Chunk rolled back: {0}').format(str(e))}
+            for name in report_names
+        ]
+
+    finally:
+        frappe.flags.in_bulk_expense_transition = False
+
+    return outcomes
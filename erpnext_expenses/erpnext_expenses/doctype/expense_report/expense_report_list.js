@@ -0,0 +1,209 @@
+// Copyright (c) 2024, Karani Geoffrey and contributors
+// For license information, please see license.txt
+
+// Workflow actions offered for bulk processing from the list view
+const BULK_WORKFLOW_ACTIONS = ['Submit to Finance', 'Approve', 'Reject'];
+
+frappe.listview_settings['Expense Report'] = {
+    onload: function(listview) {
+        BULK_WORKFLOW_ACTIONS.forEach(function(action) {
+            listview.page.add_action_item(__('{0} (Bulk)', [__(action)]), function() {
+                applyBulkWorkflowAction(listview, action);
+            });
+        });
+
+        listview.page.add_action_item(__('Create Journal Entries (Bulk)'), function() {
+            createBulkJournalEntries(listview);
+        });
+
+        listview.page.add_action_item(__('Download PDF Pack'), function() {
+            createReportPack(listview);
+        });
+
+        frappe.realtime.off('expense_report_pdf_pack');
+        frappe.realtime.on('expense_report_pdf_pack', showReportPackResult);
+
+        frappe.realtime.off('expense_report_bulk_transition');
+        frappe.realtime.on('expense_report_bulk_transition', function(data) {
+            showBulkTransitionOutcomes(data.action, data.outcomes);
+            listview.refresh();
+        });
+    }
+};
+
+
+// Validate and queue a workflow action for the checked reports
+function applyBulkWorkflowAction(listview, action) {
+    const reports = listview.get_checked_items(true);
+
+    if (!reports.length) {
+        frappe.throw(__('Please select at least one Expense Report.'));
+    }
+
+    frappe.confirm(__('Apply "{0}" to {1} Expense Reports?', [__(action), reports.length]), function() {
+        frappe.call({
+            method: 'erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report.bulk_apply_workflow',
+            args: {
+                'reports': reports,
+                'action': action
+            },
+            freeze: true,
+            freeze_message: __('Validating Expense Reports...'),
+            callback: function(r) {
+                if (!r.message) return;
+
+                const outcomes = r.message.outcomes || [];
+                const queued = outcomes.filter(o => o.status === 'Queued').length;
+                const skipped = outcomes.filter(o => o.status !== 'Queued');
+
+                if (queued) {
+                    frappe.show_alert({
+                        message: __('{0} Expense Reports queued for "{1}".', [queued, __(action)]),
+                        indicator: 'blue'
+                    });
+                }
+
+                if (skipped.length) {
+                    showBulkTransitionOutcomes(action, skipped);
+                }
+
+                listview.clear_checked_items();
+            }
+        });
+    });
+}
+
+
+// Queue journal posting for the checked reports
+function createBulkJournalEntries(listview) {
+    const reports = listview.get_checked_items(true);
+
+    if (!reports.length) {
+        frappe.throw(__('Please select at least one Expense Report.'));
+    }
+
+    frappe.confirm(__('Create journal entries for {0} Expense Reports?', [reports.length]), function() {
+        frappe.call({
+            method: 'erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report.bulk_create_journal_entries',
+            args: { 'reports': reports },
+            freeze: true,
+            freeze_message: __('Validating Expense Reports...'),
+            callback: function(r) {
+                if (!r.message) return;
+
+                const outcomes = r.message.outcomes || [];
+                const queued = outcomes.filter(o => o.status === 'Queued').length;
+                const skipped = outcomes.filter(o => o.status !== 'Queued');
+
+                if (queued) {
+                    frappe.show_alert({
+                        message: __('{0} Expense Reports queued for posting.', [queued]),
+                        indicator: 'blue'
+                    });
+                }
+
+                if (skipped.length) {
+                    showBulkTransitionOutcomes(__('Create Journal Entries'), skipped);
+                }
+
+                listview.clear_checked_items();
+            }
+        });
+    });
+}
+
+
+// Show the per-report outcome of a bulk transition
+function showBulkTransitionOutcomes(action, outcomes) {
+    if (!outcomes || !outcomes.length) return;
+
+    const indicators = {'Success': 'green', 'Queued': 'blue', 'Skipped': 'orange', 'Error': 'red'};
+    let html = '<table class="table table-bordered table-condensed">'
+        + '<thead><tr><th>' + __('Expense Report') + '</th><th>' + __('Status') + '</th><th>'
+        + __('Details') + '</th></tr></thead><tbody>';
+
+    outcomes.forEach(function(o) {
+        html += '<tr><td>' + frappe.utils.escape_html(o.report) + '</td>'
+            + '<td><span class="indicator-pill ' + (indicators[o.status] || 'gray') + '">'
+            + __(o.status) + '</span></td>'
+            + '<td>' + frappe.utils.escape_html(o.message || __(o.workflow_state || '')) + '</td></tr>';
+    });
+
+    html += '</tbody></table>';
+
+    frappe.msgprint({
+        title: __('Bulk "{0}" Results', [__(action)]),
+        message: html,
+        wide: true
+    });
+}
+
+
+// Ask for pack options and queue a PDF pack of the checked reports
+function createReportPack(listview) {
+    const reports = listview.get_checked_items(true);
+
+    if (!reports.length) {
+        frappe.throw(__('Please select at least one Expense Report.'));
+    }
+
+    frappe.prompt([
+        {
+            fieldname: 'print_format',
+            fieldtype: 'Link',
+            label: __('Print Format'),
+            options: 'Print Format',
+            get_query: () => ({ filters: { doc_type: 'Expense Report', disabled: 0 } })
+        },
+        {
+            fieldname: 'combine',
+            fieldtype: 'Check',
+            label: __('One zip archive for all reports'),
+            description: __('Otherwise each report gets its PDF attached'),
+            default: 1
+        }
+    ], function(values) {
+        frappe.call({
+            method: 'erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report.create_report_pack',
+            args: {
+                'reports': reports,
+                'print_format': values.print_format,
+                'combine': values.combine
+            },
+            callback: function(r) {
+                if (r.message && r.message.response === 'Success') {
+                    frappe.show_alert({
+                        message: __('PDF pack of {0} Expense Reports queued. You will be notified when it is ready.',
+                            [r.message.count]),
+                        indicator: 'blue'
+                    });
+                    listview.clear_checked_items();
+                }
+            }
+        });
+    }, __('Download PDF Pack'), __('Create'));
+}
+
+
+// Notify the user when a PDF pack is ready
+function showReportPackResult(data) {
+    let message;
+    if (!data.combine) {
+        message = __('PDFs of {0} Expense Reports were attached to the reports.', [data.count]);
+    } else if (data.file_url) {
+        message = __('Your PDF pack is ready: <a href="{0}" target="_blank">download</a>', [data.file_url]);
+    } else {
+        message = __('The PDF pack could not be created.');
+    }
+
+    if (data.errors && data.errors.length) {
+        message += '<br><br>' + __('Some items could not be included:') + '<ul>'
+            + data.errors.map(e => '<li>' + frappe.utils.escape_html(e) + '</li>').join('') + '</ul>';
+    }
+
+    frappe.msgprint({
+        title: __('PDF Pack'),
+        indicator: data.errors && data.errors.length ? 'orange' : 'green',
+        message: message
+    });
+}
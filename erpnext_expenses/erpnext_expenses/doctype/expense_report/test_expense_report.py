@@ -1,9 +1,86 @@
 # Copyright (c) 2024, Karani Geoffrey and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report import (
+	_assemble_journal_accounts,
+)
+
+DIMENSIONS = ("cost_center", "project")
+TAX_ACCOUNTS = {"VAT-16": "VAT"}
+
+
+def expense_line(expense_id, subtotal, account="Travel", cost_center="Main"):
+	return frappe._dict(
+		expense_id=expense_id,
+		subtotal=subtotal,
+		exchange_rate=1,
+		expense_account=account,
+		dimensions={"cost_center": cost_center},
+	)
+
+
+def split_line(parent, amount, vat=None, vat_amount=0, cost_center=None, project=None):
+	return frappe._dict(
+		parent=parent, amount=amount, vat=vat, vat_amount=vat_amount, cost_center=cost_center, project=project
+	)
+
+
+def debits(accounts):
+	return {
+		(row["account"], row.get("cost_center"), row.get("project")): row["debit"]
+		for row in accounts
+		if row["debit"]
+	}
+
 
 class TestExpenseReport(FrappeTestCase):
-	pass
+	def test_split_lines_post_to_their_own_dimensions(self):
+		accounts = _assemble_journal_accounts(
+			[expense_line("EXP-1", 100)],
+			[
+				split_line("EXP-1", 60, vat="VAT-16", vat_amount=9.6, cost_center="Sales", project="PROJ-1"),
+				split_line("EXP-1", 40),
+			],
+			TAX_ACCOUNTS, "Bank", 2, DIMENSIONS
+		)
+
+		self.assertEqual(debits(accounts), {
+			("Travel", "Sales", "PROJ-1"): 50.4,
+			("Travel", "Main", None): 40.0,
+			("VAT", None, None): 9.6,
+		})
+		self.assertEqual(accounts[0]["credit"], 100.0)
+
+	def test_uncovered_amount_uses_default_dimensions(self):
+		accounts = _assemble_journal_accounts(
+			[expense_line("EXP-1", 100)],
+			[split_line("EXP-1", 30, cost_center="Sales")],
+			TAX_ACCOUNTS, "Bank", 2, DIMENSIONS
+		)
+
+		self.assertEqual(debits(accounts), {
+			("Travel", "Sales", None): 30.0,
+			("Travel", "Main", None): 70.0,
+		})
+
+	def test_lines_are_aggregated_by_account_and_dimensions(self):
+		accounts = _assemble_journal_accounts(
+			[
+				expense_line("EXP-1", 10.1),
+				expense_line("EXP-2", 20.2),
+				expense_line("EXP-3", 5, account="Meals"),
+				expense_line("EXP-4", 7, cost_center="Sales"),
+			],
+			[],
+			TAX_ACCOUNTS, "Bank", 2, DIMENSIONS
+		)
+
+		self.assertEqual(debits(accounts), {
+			("Travel", "Main", None): 30.3,
+			("Meals", "Main", None): 5.0,
+			("Travel", "Sales", None): 7.0,
+		})
+		self.assertEqual(len(accounts), 4)
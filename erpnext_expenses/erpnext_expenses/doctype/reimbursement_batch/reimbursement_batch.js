@@ -0,0 +1,88 @@
+// Copyright (c) 2026, Karani Geoffrey and contributors
+// For license information, please see license.txt
+
+const REIMBURSEMENT_BATCH_METHOD = 'erpnext_expenses.erpnext_expenses.doctype.reimbursement_batch.reimbursement_batch';
+
+frappe.ui.form.on("Reimbursement Batch", {
+	setup(frm) {
+		frm.set_query('payment_account', function() {
+			return {
+				filters: {
+					company: frm.doc.company,
+					account_type: ['in', ['Bank', 'Cash']],
+					is_group: 0
+				}
+			};
+		});
+
+		frappe.realtime.on('reimbursement_batch_payments', function(data) {
+			if (data.batch === frm.doc.name) {
+				frm.reload_doc();
+			}
+		});
+	},
+
+	refresh(frm) {
+		if (frm.is_new()) {
+			return;
+		}
+
+		if (frm.doc.status === 'Draft') {
+			frm.add_custom_button(__('Get Outstanding Reimbursements'), function() {
+				frappe.call({
+					method: `${REIMBURSEMENT_BATCH_METHOD}.get_outstanding_reimbursements`,
+					args: { batch: frm.doc.name },
+					freeze: true,
+					freeze_message: __('Collecting outstanding reimbursements...'),
+					callback: function(r) {
+						if (!r.message) {
+							return;
+						}
+
+						frm.reload_doc();
+
+						if (r.message.missing_bank_details.length) {
+							frappe.msgprint({
+								title: __('Missing Bank Details'),
+								indicator: 'orange',
+								message: __('These employees have no bank account or IBAN: {0}',
+									[r.message.missing_bank_details.join(', ')])
+							});
+						}
+					}
+				});
+			});
+		}
+
+		if (['Draft', 'Failed'].includes(frm.doc.status) && frm.doc.employee_count) {
+			frm.add_custom_button(__('Create Payments'), function() {
+				frappe.confirm(
+					__('Create a payment journal entry for each of the {0} employees?', [frm.doc.employee_count]),
+					function() {
+						frappe.call({
+							method: `${REIMBURSEMENT_BATCH_METHOD}.create_reimbursement_payments`,
+							args: { batch: frm.doc.name },
+							callback: function(r) {
+								if (r.message && r.message.response === 'Success') {
+									frappe.show_alert({
+										message: __('Payments queued. This page will refresh when they are posted.'),
+										indicator: 'blue'
+									});
+									frm.reload_doc();
+								}
+							}
+						});
+					}
+				);
+			});
+		}
+
+		if (frm.doc.employee_count) {
+			frm.add_custom_button(__('Download Bank File'), function() {
+				window.open(
+					`/api/method/${REIMBURSEMENT_BATCH_METHOD}.download_bank_file?batch=${encodeURIComponent(frm.doc.name)}`
+				);
+			});
+		}
+	},
+});
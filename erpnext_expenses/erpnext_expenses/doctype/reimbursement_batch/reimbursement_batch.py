@@ -0,0 +1,329 @@
+# Copyright (c) 2026, Karani Geoffrey and contributors
+# For license information, please see license.txt
+
+import csv
+import io
+import tempfile
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import create_batch, now_datetime
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+from erpnext_expenses import money
+from erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report import _journal_account
+from erpnext_expenses.job_router import enqueue_for_company
+from erpnext_expenses.report_views import clear_report_view_cache
+
+# Employees paid per database transaction by the payment job
+PAYMENT_CHUNK_SIZE = 50
+
+# Employee rows read per query while writing the bank file
+BANK_FILE_PAGE_SIZE = 1000
+
+BANK_FILE_COLUMNS = [
+	'Employee', 'Employee Name', 'Bank Name', 'Bank Account No', 'IBAN', 'Amount', 'Currency', 'Reference'
+]
+
+
+class ReimbursementBatch(Document):
+	def validate(self):
+		account_company = frappe.get_cached_value('Account', self.payment_account, 'company')
+		if account_company != self.company:
+			frappe.throw(
+				_('Payment Account {0} does not belong to company {1}.').format(self.payment_account, self.company)
+			)
+
+	def on_trash(self):
+		if self.status != 'Draft':
+			frappe.throw(_('Only Draft Reimbursement Batches can be deleted.'))
+
+		_release_reports(self.name)
+
+
+def _release_reports(batch):
+	"""Make the reports claimed by a batch outstanding again."""
+	frappe.db.sql("""
+		UPDATE `tabExpense Report`
+		SET reimbursement_batch = NULL
+		WHERE reimbursement_batch = %s
+	""", (batch,))
+	clear_report_view_cache()
+
+
+@frappe.whitelist()
+def get_outstanding_reimbursements(batch):
+	"""Claim all outstanding reimbursable reports of the company for a batch.
+
+	Reports paid by the employee whose journals are posted and that are not
+	in another batch are claimed with one update, then totalled per employee
+	from the amounts their journals credited.
+
+	Returns:
+		Dict with the number of employees, the total and employees without bank details
+	"""
+	doc = frappe.get_doc('Reimbursement Batch', batch)
+	doc.check_permission('write')
+
+	if doc.status != 'Draft':
+		frappe.throw(_('Outstanding reimbursements can only be fetched for a Draft batch.'))
+
+	_release_reports(doc.name)
+
+	frappe.db.sql("""
+		UPDATE `tabExpense Report`
+		SET reimbursement_batch = %(batch)s
+		WHERE company = %(company)s
+		AND docstatus = 1
+		AND workflow_state = 'Journals Created'
+		AND paid_by = 'Employee (to reimburse)'
+		AND IFNULL(employee, '') != ''
+		AND IFNULL(reimbursement_batch, '') = ''
+	""", {'batch': doc.name, 'company': doc.company})
+	clear_report_view_cache()
+
+	precision = money.get_company_precision(doc.company)
+	debits, report_counts = _get_posted_amounts(doc.name, doc.company, precision)
+
+	employees = frappe.get_all(
+		'Employee',
+		filters={'name': ('in', list(debits))},
+		fields=['name as employee', 'employee_name', 'bank_name', 'bank_ac_no', 'iban'],
+		order_by='name asc',
+	) if debits else []
+
+	total = 0
+	rows = []
+	timestamp = now_datetime()
+
+	for idx, employee in enumerate(employees, start=1):
+		amount = sum(amount for _account, amount in debits[employee.employee])
+		total += amount
+		rows.append((
+			frappe.generate_hash(length=10), timestamp, timestamp, frappe.session.user, frappe.session.user,
+			doc.name, 'Reimbursement Batch', 'employees', idx, employee.employee, employee.employee_name,
+			money.to_float(amount, precision), report_counts[employee.employee],
+			employee.bank_name, employee.bank_ac_no, employee.iban,
+		))
+
+	# Thousands of rows: write them in bulk instead of one insert per child doc
+	frappe.db.delete('Reimbursement Batch Employee', {'parent': doc.name, 'parenttype': 'Reimbursement Batch'})
+	frappe.db.bulk_insert(
+		'Reimbursement Batch Employee',
+		fields=[
+			'name', 'creation', 'modified', 'owner', 'modified_by',
+			'parent', 'parenttype', 'parentfield', 'idx', 'employee', 'employee_name',
+			'amount', 'report_count', 'bank_name', 'bank_ac_no', 'iban',
+		],
+		values=rows,
+	)
+
+	doc.db_set({'total_amount': money.to_float(total, precision), 'employee_count': len(rows)})
+	frappe.db.commit()
+
+	return {
+		'employee_count': len(rows),
+		'total_amount': money.to_float(total, precision),
+		'missing_bank_details': [
+			employee.employee for employee in employees if not (employee.bank_ac_no or employee.iban)
+		],
+	}
+
+
+@frappe.whitelist()
+def create_reimbursement_payments(batch):
+	"""Queue the journal entries paying each employee of a batch."""
+	doc = frappe.get_doc('Reimbursement Batch', batch)
+	doc.check_permission('write')
+
+	if doc.status not in ('Draft', 'Failed'):
+		frappe.throw(_('Payments for Reimbursement Batch {0} are already {1}.').format(doc.name, _(doc.status)))
+
+	if not doc.employee_count:
+		frappe.throw(_('There are no outstanding reimbursements in this batch.'))
+
+	doc.db_set('status', 'Queued')
+	enqueue_for_company(
+		doc.company,
+		'erpnext_expenses.erpnext_expenses.doctype.reimbursement_batch.reimbursement_batch.make_reimbursement_payments',
+		batch=doc.name,
+	)
+
+	return {'response': 'Success'}
+
+
+def make_reimbursement_payments(batch):
+	"""Background job: post one journal entry per employee of a batch.
+
+	Each employee's entry debits the accounts their reports were credited to
+	and credits the batch's payment account. Employees are paid in chunked
+	transactions; employees that already have a journal entry are skipped, so
+	a failed run can simply be queued again.
+	"""
+	doc = frappe.db.get_value(
+		'Reimbursement Batch', batch, ['name', 'company', 'posting_date', 'payment_account'], as_dict=True
+	)
+	precision = money.get_company_precision(doc.company)
+
+	rows = {
+		row.employee: row
+		for row in frappe.get_all(
+			'Reimbursement Batch Employee',
+			filters={'parent': batch, 'parenttype': 'Reimbursement Batch'},
+			fields=['name', 'employee', 'journal_entry'],
+		)
+	}
+
+	debits, _report_counts = _get_posted_amounts(batch, doc.company, precision)
+
+	pending = [employee for employee in debits if employee in rows and not rows[employee].journal_entry]
+	status = 'Completed'
+
+	for chunk in create_batch(pending, PAYMENT_CHUNK_SIZE):
+		try:
+			updates = {}
+			for employee in chunk:
+				jv = _make_payment_entry(doc, employee, debits[employee], precision)
+				updates[rows[employee].name] = {'journal_entry': jv.name}
+
+			frappe.db.bulk_update('Reimbursement Batch Employee', updates, update_modified=False)
+			frappe.db.commit()
+
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error(f"Error creating reimbursement payments for {batch}: {str(e)}")
+			status = 'Failed'
+			break
+
+	frappe.db.set_value('Reimbursement Batch', batch, 'status', status)
+	frappe.db.commit()
+
+	frappe.publish_realtime(
+		'reimbursement_batch_payments',
+		{'batch': batch, 'status': status},
+		user=frappe.session.user
+	)
+
+
+def _get_posted_amounts(batch, company, precision):
+	"""Return what the journals of a batch's reports credited, per employee and account.
+
+	The amounts are read from the submitted report journals themselves, so a
+	batch pays exactly what was posted, currency conversion and rounding
+	included.
+
+	Returns:
+		Tuple of {employee: [(account, minor amount)]} sorted by account,
+		and {employee: number of reports}
+	"""
+	reports = frappe.get_all(
+		'Expense Report',
+		filters={'reimbursement_batch': batch},
+		fields=['name', 'employee', 'paying_account'],
+	)
+	if not reports:
+		return {}, {}
+
+	# Credits of every report journal, in one aggregated query
+	posted = {
+		(row.remark, row.account): row.amount
+		for row in frappe.db.sql("""
+			SELECT je.remark, jea.account, SUM(jea.credit) - SUM(jea.debit) AS amount
+			FROM `tabJournal Entry` je
+			JOIN `tabJournal Entry Account` jea ON jea.parent = je.name AND jea.parenttype = 'Journal Entry'
+			WHERE je.company = %(company)s AND je.docstatus = 1 AND je.remark IN %(remarks)s
+			GROUP BY je.remark, jea.account
+		""", {
+			'company': company,
+			'remarks': tuple(f'Expense Report: {report.name}' for report in reports),
+		}, as_dict=True)
+	}
+
+	amounts = {}
+	report_counts = {}
+	for report in reports:
+		amount = money.to_minor(posted.get((f'Expense Report: {report.name}', report.paying_account)), precision)
+		accounts = amounts.setdefault(report.employee, {})
+		accounts[report.paying_account] = accounts.get(report.paying_account, 0) + amount
+		report_counts[report.employee] = report_counts.get(report.employee, 0) + 1
+
+	debits = {employee: sorted(accounts.items()) for employee, accounts in sorted(amounts.items())}
+
+	return debits, report_counts
+
+
+def _make_payment_entry(batch, employee, debits, precision):
+	"""Post the journal entry paying one employee."""
+	jv = frappe.new_doc('Journal Entry')
+	jv.voucher_type = 'Journal Entry'
+	jv.naming_series = 'ACC-JV-.YYYY.-'
+	jv.posting_date = batch.posting_date
+	jv.company = batch.company
+	jv.remark = f'Reimbursement Batch: {batch.name} ({employee})'
+
+	for account, amount in debits:
+		jv.append('accounts', _journal_account(account, debit=amount, precision=precision))
+
+	jv.append('accounts', _journal_account(
+		batch.payment_account, credit=sum(amount for _account, amount in debits), precision=precision
+	))
+
+	jv.insert()
+	jv.submit()
+
+	return jv
+
+
+@frappe.whitelist()
+def download_bank_file(batch):
+	"""Download the bank bulk-payment file of a batch as CSV.
+
+	Rows are read a page at a time, encoded and written to a spooled
+	temporary file that is streamed to the client, so large batches are never
+	held in memory.
+	"""
+	doc = frappe.get_doc('Reimbursement Batch', batch)
+	doc.check_permission('read')
+
+	currency = frappe.get_cached_value('Company', doc.company, 'default_currency')
+	output = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+	_write_csv_rows(output, [BANK_FILE_COLUMNS])
+
+	last_idx = 0
+	while True:
+		page = frappe.get_all(
+			'Reimbursement Batch Employee',
+			filters={'parent': doc.name, 'parenttype': 'Reimbursement Batch', 'idx': ('>', last_idx)},
+			fields=['idx', 'employee', 'employee_name', 'bank_name', 'bank_ac_no', 'iban', 'amount'],
+			order_by='idx asc',
+			limit_page_length=BANK_FILE_PAGE_SIZE,
+		)
+		if not page:
+			break
+
+		_write_csv_rows(output, (
+			[row.employee, row.employee_name, row.bank_name, row.bank_ac_no, row.iban, row.amount, currency, doc.name]
+			for row in page
+		))
+		last_idx = page[-1].idx
+
+	output.seek(0)
+
+	response = Response(
+		wrap_file(frappe.local.request.environ, output),
+		mimetype='text/csv',
+		direct_passthrough=True,
+	)
+	response.headers['Content-Disposition'] = f'attachment; filename="{doc.name}.csv"'
+
+	return response
+
+
+def _write_csv_rows(output, rows):
+	"""Append CSV rows to a binary file as UTF-8."""
+	# SpooledTemporaryFile cannot be wrapped in a TextIOWrapper before Python 3.11
+	buffer = io.StringIO(newline='')
+	csv.writer(buffer).writerows(rows)
+	output.write(buffer.getvalue().encode('utf-8'))
@@ -0,0 +1,28 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+import tempfile
+
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses.erpnext_expenses.doctype.reimbursement_batch.reimbursement_batch import (
+	BANK_FILE_COLUMNS,
+	_write_csv_rows,
+)
+
+
+class TestReimbursementBatch(FrappeTestCase):
+	def test_bank_file_rows_are_written_to_spooled_file(self):
+		output = tempfile.SpooledTemporaryFile(max_size=64)
+		_write_csv_rows(output, [BANK_FILE_COLUMNS])
+		_write_csv_rows(output, (
+			["HR-EMP-0000%d" % index, "Müller, Anna", "Bank", "123", "", 10.5, "EUR", "REIMB-2026-10-0001"]
+			for index in range(1, 4)
+		))
+
+		output.seek(0)
+		lines = output.read().decode("utf-8").split("\r\n")
+
+		self.assertEqual(lines[0], ",".join(BANK_FILE_COLUMNS))
+		self.assertEqual(lines[1], 'HR-EMP-00001,"Müller, Anna",Bank,123,,10.5,EUR,REIMB-2026-10-0001')
+		self.assertEqual(len([line for line in lines if line]), 4)
@@ -0,0 +1,63 @@
+// Copyright (c) 2026, Karani Geoffrey and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Expense Analytics"] = {
+    filters: [
+        {
+            fieldname: "company",
+            label: __("Company"),
+            fieldtype: "Link",
+            options: "Company",
+            default: frappe.defaults.get_user_default("Company"),
+            reqd: 1
+        },
+        {
+            fieldname: "from_date",
+            label: __("From Date"),
+            fieldtype: "Date",
+            default: frappe.datetime.add_months(frappe.datetime.get_today(), -12)
+        },
+        {
+            fieldname: "to_date",
+            label: __("To Date"),
+            fieldtype: "Date",
+            default: frappe.datetime.get_today()
+        },
+        {
+            fieldname: "category",
+            label: __("Category"),
+            fieldtype: "Link",
+            options: "Expense Category"
+        },
+        {
+            fieldname: "workflow_state",
+            label: __("Report Status"),
+            fieldtype: "Select",
+            options: [
+                "",
+                "Not Reported",
+                "Draft",
+                "Pending Manager",
+                "Pending Finance",
+                "Approved",
+                "Rejected",
+                "Journals Created"
+            ].join("\n")
+        },
+        {
+            fieldname: "group_by",
+            label: __("Group By"),
+            fieldtype: "Select",
+            options: "Category\nEmployee\nTax\nMonth",
+            default: "Category",
+            reqd: 1
+        },
+        {
+            fieldname: "pivot_by",
+            label: __("Pivot By"),
+            fieldtype: "Select",
+            options: "\nMonth\nCategory\nEmployee\nTax",
+            default: "Month"
+        }
+    ]
+};
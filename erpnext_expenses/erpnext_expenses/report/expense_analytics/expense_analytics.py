@@ -0,0 +1,285 @@
+# Copyright (c) 2026, Karani Geoffrey and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from frappe.desk.reportview import build_match_conditions
+from frappe.utils import flt, getdate
+
+from erpnext_expenses.archive import get_table
+from erpnext_expenses.exchange_rates import get_company_currency
+
+VERSION_KEY = "erpnext_expenses:expense_analytics:version"
+CACHE_KEY = "erpnext_expenses:expense_analytics"
+
+# Cached results also expire on their own, for changes made without doc events
+CACHE_TTL = 60 * 60
+
+NOT_REPORTED = "Not Reported"
+
+DIMENSIONS = {
+	"Category": "category",
+	"Employee": "employee",
+	"Tax": "tax",
+	"Month": "period",
+}
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	validate_filters(filters)
+
+	rows = get_grouped_rows(filters)
+	precision = frappe.get_precision("Expense", "base_total") or 2
+
+	group_by = DIMENSIONS[filters.group_by or "Category"]
+	pivot_by = DIMENSIONS.get(filters.pivot_by) if filters.pivot_by != filters.group_by else None
+
+	if pivot_by:
+		return get_pivot_columns(filters, rows, group_by, pivot_by), pivot(rows, group_by, pivot_by, precision)
+
+	return get_summary_columns(filters, group_by), summarize(rows, group_by, precision)
+
+
+def validate_filters(filters):
+	if not filters.company:
+		frappe.throw(_("Please select a Company"))
+
+	if filters.from_date and filters.to_date and getdate(filters.from_date) > getdate(filters.to_date):
+		frappe.throw(_("From Date cannot be after To Date"))
+
+	if (filters.group_by or "Category") not in DIMENSIONS:
+		frappe.throw(_("Invalid Group By {0}").format(filters.group_by))
+
+	if filters.pivot_by and filters.pivot_by not in DIMENSIONS:
+		frappe.throw(_("Invalid Pivot By {0}").format(filters.pivot_by))
+
+
+def get_grouped_rows(filters):
+	"""Return the base-currency totals per category, employee, tax and month, cached per filter set.
+
+	The cache key includes the user's permission conditions, so users who see
+	different expenses never share a result.
+	"""
+	conditions, values = get_conditions(filters)
+
+	version = frappe.cache.get_value(VERSION_KEY) or ""
+	key = hashlib.sha1(json.dumps([version, conditions, values], sort_keys=True, default=str).encode()).hexdigest()
+
+	rows = frappe.cache.get_value(f"{CACHE_KEY}:{key}")
+	if rows is None:
+		rows = query_grouped_rows(conditions, values, filters.from_date)
+		frappe.cache.set_value(f"{CACHE_KEY}:{key}", rows, expires_in_sec=CACHE_TTL)
+
+	return rows
+
+
+def get_conditions(filters):
+	conditions = ["e.docstatus < 2", "e.company = %(company)s"]
+	values = {"company": filters.company, "not_reported": NOT_REPORTED}
+
+	if filters.from_date:
+		conditions.append("e.expense_date >= %(from_date)s")
+		values["from_date"] = filters.from_date
+
+	if filters.to_date:
+		conditions.append("e.expense_date <= %(to_date)s")
+		values["to_date"] = filters.to_date
+
+	if filters.category:
+		conditions.append("e.category = %(category)s")
+		values["category"] = filters.category
+
+	if filters.workflow_state:
+		conditions.append("IFNULL(r.workflow_state, %(not_reported)s) = %(workflow_state)s")
+		values["workflow_state"] = filters.workflow_state
+
+	match_conditions = build_match_conditions("Expense")
+	if match_conditions:
+		conditions.append("({0})".format(match_conditions.replace("`tabExpense`", "e")))
+
+	return conditions, values
+
+
+def query_grouped_rows(conditions, values, from_date=None):
+	"""Aggregate the split lines of matching expenses in one grouped query.
+
+	Expenses without split lines count with their whole total and no tax. Each
+	expense is counted once, under the tax of its first split line. Archived
+	expenses are included when the date range reaches back to them.
+	"""
+	return frappe.db.sql(
+		"""
+		SELECT
+			e.category,
+			e.employee,
+			MAX(e.employee_name) AS employee_name,
+			IFNULL(sd.vat, '') AS tax,
+			EXTRACT(YEAR FROM e.expense_date) AS year,
+			EXTRACT(MONTH FROM e.expense_date) AS month,
+			COUNT(DISTINCT CASE WHEN sd.idx IS NULL OR sd.idx = 1 THEN e.name END) AS expense_count,
+			COUNT(sd.name) AS line_count,
+			SUM(COALESCE(sd.amount, e.total) * e.exchange_rate) AS total,
+			SUM(IFNULL(sd.vat_amount, 0) * e.exchange_rate) AS tax_amount
+		FROM {expense} e
+		LEFT JOIN {split} sd
+			ON sd.parent = e.name AND sd.parenttype = 'Expense'
+		LEFT JOIN (
+			SELECT ed.expense_id, er.workflow_state
+			FROM {detail} ed
+			INNER JOIN {report} er ON er.name = ed.parent
+			WHERE ed.parenttype = 'Expense Report' AND er.docstatus < 2
+		) r ON r.expense_id = e.name
+		WHERE {conditions}
+		GROUP BY e.category, e.employee, IFNULL(sd.vat, ''),
+			EXTRACT(YEAR FROM e.expense_date), EXTRACT(MONTH FROM e.expense_date)
+		""".format(
+			expense=get_table("Expense", from_date),
+			split=get_table("Expense Splitting Detail", from_date),
+			detail=get_table("Expense Detail", from_date),
+			report=get_table("Expense Report", from_date),
+			conditions=" AND ".join(conditions),
+		),
+		values,
+		as_dict=True,
+	)
+
+
+def get_key(row, dimension):
+	if dimension == "period":
+		return "{0:04d}-{1:02d}".format(int(row.year), int(row.month))
+
+	return row[dimension] or ""
+
+
+def summarize(rows, group_by, precision):
+	"""Total the grouped rows by one dimension."""
+	groups = {}
+	for row in rows:
+		key = get_key(row, group_by)
+		group = groups.get(key)
+		if not group:
+			group = groups[key] = {
+				group_by: key,
+				"employee_name": row.employee_name if group_by == "employee" else None,
+				"count": 0,
+				"net": 0.0,
+				"tax_amount": 0.0,
+				"total": 0.0,
+			}
+
+		group["count"] += row.line_count if group_by == "tax" else row.expense_count
+		group["tax_amount"] += flt(row.tax_amount)
+		group["total"] += flt(row.total)
+
+	data = sort_groups(groups, group_by)
+	for group in data:
+		group["net"] = flt(group["total"] - group["tax_amount"], precision)
+		group["tax_amount"] = flt(group["tax_amount"], precision)
+		group["total"] = flt(group["total"], precision)
+
+	return data
+
+
+def pivot(rows, group_by, pivot_by, precision):
+	"""Spread the grouped rows' totals over one column per value of the pivot dimension."""
+	groups = {}
+	for row in rows:
+		key = get_key(row, group_by)
+		group = groups.get(key)
+		if not group:
+			group = groups[key] = {
+				group_by: key,
+				"employee_name": row.employee_name if group_by == "employee" else None,
+				"total": 0.0,
+			}
+
+		column = scrub_column(get_key(row, pivot_by))
+		group[column] = group.get(column, 0.0) + flt(row.total)
+		group["total"] += flt(row.total)
+
+	data = sort_groups(groups, group_by)
+	for group in data:
+		for fieldname, value in group.items():
+			if isinstance(value, float):
+				group[fieldname] = flt(value, precision)
+
+	return data
+
+
+def sort_groups(groups, group_by):
+	"""Months in order, everything else largest first."""
+	if group_by == "period":
+		return [groups[key] for key in sorted(groups)]
+
+	return sorted(groups.values(), key=lambda group: -group["total"])
+
+
+def scrub_column(value):
+	return "pivot_" + (hashlib.md5(value.encode()).hexdigest()[:10] if value else "none")
+
+
+def get_group_columns(group_by):
+	if group_by == "employee":
+		return [
+			{"label": _("Employee"), "fieldname": "employee", "fieldtype": "Link", "options": "Employee", "width": 150},
+			{"label": _("Employee Name"), "fieldname": "employee_name", "fieldtype": "Data", "width": 180},
+		]
+
+	if group_by == "period":
+		return [{"label": _("Month"), "fieldname": "period", "fieldtype": "Data", "width": 120}]
+
+	if group_by == "tax":
+		return [{"label": _("Tax"), "fieldname": "tax", "fieldtype": "Link", "options": "Expense Taxes", "width": 180}]
+
+	return [{"label": _("Category"), "fieldname": "category", "fieldtype": "Link", "options": "Expense Category", "width": 200}]
+
+
+def get_summary_columns(filters, group_by):
+	currency = get_company_currency(filters.company)
+
+	return get_group_columns(group_by) + [
+		{"label": _("Split Lines") if group_by == "tax" else _("Expenses"), "fieldname": "count", "fieldtype": "Int", "width": 100},
+		{"label": _("Net Amount"), "fieldname": "net", "fieldtype": "Currency", "options": currency, "width": 140},
+		{"label": _("Tax Amount"), "fieldname": "tax_amount", "fieldtype": "Currency", "options": currency, "width": 140},
+		{"label": _("Total"), "fieldname": "total", "fieldtype": "Currency", "options": currency, "width": 140},
+	]
+
+
+def get_pivot_columns(filters, rows, group_by, pivot_by):
+	currency = get_company_currency(filters.company)
+
+	columns = get_group_columns(group_by)
+	for value in sorted({get_key(row, pivot_by) for row in rows}):
+		columns.append({
+			"label": get_pivot_label(value, pivot_by),
+			"fieldname": scrub_column(value),
+			"fieldtype": "Currency",
+			"options": currency,
+			"width": 130,
+		})
+
+	columns.append({"label": _("Total"), "fieldname": "total", "fieldtype": "Currency", "options": currency, "width": 140})
+
+	return columns
+
+
+def get_pivot_label(value, pivot_by):
+	if pivot_by == "period":
+		year, month = value.split("-")
+		return "{0} {1}".format(_(MONTHS[int(month) - 1]), year)
+
+	if pivot_by == "tax" and not value:
+		return _("No Tax")
+
+	return value or _("Not Set")
+
+
+def clear_analytics_cache(doc=None, method=None):
+	"""Invalidate every cached result; called on expense and report changes."""
+	frappe.cache.set_value(VERSION_KEY, frappe.generate_hash(length=10))
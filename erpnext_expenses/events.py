@@ -0,0 +1,285 @@
+"""
+Change-data-capture feed of the expense lifecycle.
+
+Doc events (see hooks.py) append an Expense Event row whenever an expense or
+report is created, changed or deleted, an expense is added to a report, a
+report moves through its workflow, its journal entry is posted or cancelled,
+or its expenses are reverted to Draft. Events are written in the same
+transaction as the change, so a rolled back change leaves no event behind.
+
+Auto-increment ids follow insert order, not commit order: a long
+transaction can commit an event with a lower id after a higher one is
+already visible. So each event also gets a sequence number once it is
+committed, by sequence_events() running after the commit (and from the
+scheduler for any left over). Numbering is serialized by a lock and only
+ever continues from the highest number given, so sequence numbers grow in the
+order events became visible. Downstream systems keep the sequence of the last
+event they processed and call get_events() with it to receive the next batch,
+instead of polling list endpoints for changes.
+"""
+
+import json
+
+import frappe
+from frappe.utils import cint, create_batch, now
+
+from erpnext_expenses import locks
+
+MAX_PAGE_LENGTH = 1000
+
+# Events numbered per update
+SEQUENCE_CHUNK_SIZE = 1000
+
+SEQUENCE_LOCK_KEY = "erpnext_expenses:lock:expense_event_sequence"
+
+EVENT_FIELDS = [
+	"name",
+	"sequence",
+	"creation",
+	"event_type",
+	"reference_doctype",
+	"reference_name",
+	"expense_report",
+	"journal_entry",
+	"company",
+	"from_state",
+	"to_state",
+	"owner",
+	"data",
+]
+
+
+def record_events(event_type, doctype, names, company=None, expense_report=None, journal_entry=None,
+		from_state=None, to_state=None, data=None):
+	"""Append one event per document name, with one insert."""
+	if not names:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	payload = json.dumps(data, default=str) if data else None
+
+	frappe.db.bulk_insert(
+		"Expense Event",
+		fields=[
+			"creation", "modified", "owner", "modified_by", "event_type", "reference_doctype",
+			"reference_name", "company", "expense_report", "journal_entry", "from_state", "to_state", "data",
+		],
+		values=[
+			(timestamp, timestamp, user, user, event_type, doctype, name, company, expense_report,
+				journal_entry, from_state, to_state, payload)
+			for name in names
+		],
+	)
+
+	# Once per transaction: number the events after they are committed
+	if not frappe.flags.expense_events_to_sequence:
+		frappe.flags.expense_events_to_sequence = True
+		frappe.db.after_commit.add(sequence_events)
+		frappe.db.after_rollback.add(_forget_sequencing)
+
+
+def record_event(event_type, doctype, name, **kwargs):
+	record_events(event_type, doctype, [name], **kwargs)
+
+
+def _expense_data(doc):
+	return {
+		"employee": doc.employee,
+		"category": doc.category,
+		"expense_date": doc.expense_date,
+		"total": doc.total,
+		"currency": doc.currency,
+		"docstatus": doc.docstatus,
+	}
+
+
+def _report_expenses(doc):
+	return [row.expense_id for row in doc.get("expense") or [] if row.expense_id]
+
+
+def on_expense_insert(doc, method=None):
+	record_event("Created", "Expense", doc.name, company=doc.company, data=_expense_data(doc))
+
+
+def on_expense_update(doc, method=None):
+	# Insert already recorded "Created"
+	if doc.flags.in_insert:
+		return
+
+	record_event("Updated", "Expense", doc.name, company=doc.company, data=_expense_data(doc))
+
+
+def on_expense_trash(doc, method=None):
+	record_event("Deleted", "Expense", doc.name, company=doc.company)
+
+
+def on_report_update(doc, method=None):
+	"""Record creation, newly added expenses and workflow transitions of a report."""
+	before = doc.get_doc_before_save()
+
+	if not before:
+		record_event(
+			"Created", "Expense Report", doc.name, company=doc.company, to_state=doc.workflow_state,
+			data={"employee": doc.employee, "paid_by": doc.paid_by},
+		)
+
+	previous = set(_report_expenses(before)) if before else set()
+	record_events(
+		"Added to Report", "Expense",
+		[expense for expense in _report_expenses(doc) if expense not in previous],
+		company=doc.company, expense_report=doc.name,
+	)
+
+	from_state = before.workflow_state if before else None
+	if before and from_state != doc.workflow_state:
+		record_workflow_transition(doc.name, doc.company, from_state, doc.workflow_state, _report_expenses(doc))
+
+
+def on_report_cancel(doc, method=None):
+	# The workflow has already set the Cancelled state by now
+	before = doc.get_doc_before_save()
+	from_state = before.workflow_state if before else doc.workflow_state
+
+	record_workflow_transition(doc.name, doc.company, from_state, "Cancelled", _report_expenses(doc), reverted=True)
+
+
+def on_report_trash(doc, method=None):
+	record_event("Deleted", "Expense Report", doc.name, company=doc.company)
+
+
+def on_expense_detail_insert(doc, method=None):
+	"""Record expenses added by inserting a report line directly."""
+	if doc.parenttype != "Expense Report" or not doc.expense_id:
+		return
+
+	record_event(
+		"Added to Report", "Expense", doc.expense_id,
+		company=frappe.db.get_value("Expense Report", doc.parent, "company"), expense_report=doc.parent,
+	)
+
+
+def record_workflow_transition(report, company, from_state, to_state, expenses=None, reverted=False):
+	"""Record a report's transition, and the reverting of its expenses when it goes back to Draft."""
+	record_event(
+		"Workflow Transition", "Expense Report", report, company=company, from_state=from_state, to_state=to_state
+	)
+
+	if reverted or to_state == "Draft":
+		if expenses is None:
+			expenses = frappe.get_all(
+				"Expense Detail", filters={"parenttype": "Expense Report", "parent": report}, pluck="expense_id"
+			)
+
+		record_events("Reverted", "Expense", expenses, company=company, expense_report=report, to_state="Draft")
+
+
+def _get_report(journal_entry):
+	remark = journal_entry.remark or ""
+	if remark.startswith("Expense Report: "):
+		return remark[len("Expense Report: "):].strip()
+
+
+def on_journal_entry_submit(doc, method=None):
+	report = _get_report(doc)
+	if report:
+		record_event("Journal Posted", "Expense Report", report, company=doc.company, journal_entry=doc.name)
+
+
+def on_journal_entry_cancel(doc, method=None):
+	report = _get_report(doc)
+	if report:
+		record_event("Reverted", "Expense Report", report, company=doc.company, journal_entry=doc.name)
+
+
+def _forget_sequencing():
+	frappe.flags.expense_events_to_sequence = False
+
+
+def sequence_events():
+	"""Number the committed events that have no sequence yet, in id order.
+
+	Runs after each commit that recorded events, and from the scheduler for
+	events whose numbering failed. An event is only numbered once committed,
+	and every run numbers after the highest sequence of the run before, so a
+	cursor over sequences never passes an event committed later.
+	"""
+	frappe.flags.expense_events_to_sequence = False
+
+	try:
+		with locks.hold([SEQUENCE_LOCK_KEY]):
+			# Locking reads see the latest committed rows whatever the snapshot;
+			# events of transactions still open are locked by them, and skipped
+			last = frappe.db.sql("""
+				SELECT sequence FROM `tabExpense Event`
+				ORDER BY sequence DESC LIMIT 1
+				FOR UPDATE
+			""")
+			last = last[0][0] if last else 0
+
+			names = frappe.db.sql_list("""
+				SELECT name FROM `tabExpense Event`
+				WHERE sequence = 0
+				ORDER BY name
+				FOR UPDATE SKIP LOCKED
+			""")
+
+			for chunk in create_batch(names, SEQUENCE_CHUNK_SIZE):
+				frappe.db.bulk_update(
+					"Expense Event",
+					{name: {"sequence": last + position} for position, name in enumerate(chunk, 1)},
+					update_modified=False,
+				)
+				last += len(chunk)
+
+			frappe.db.commit()
+
+	except locks.ExpenseLockError:
+		# Another run holds the lock; the scheduler numbers what it leaves
+		pass
+
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(title="Error sequencing expense events")
+
+
+@frappe.whitelist()
+def get_events(after=0, limit=500, reference_doctype=None, company=None):
+	"""Return the events committed after a cursor, in commit order.
+
+	Args:
+		after: Sequence of the last event already processed (0 to start from the beginning)
+		limit: Largest number of events to return
+		reference_doctype: Only events of "Expense" or "Expense Report"
+		company: Only events of this company
+
+	Returns:
+		Dict with 'events', 'cursor' (pass it as `after` next time) and
+		'has_more' (whether more events are ready now)
+	"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+
+	after = cint(after)
+	limit = min(cint(limit) or 500, MAX_PAGE_LENGTH)
+
+	filters = {"sequence": (">", after)}
+	if reference_doctype:
+		filters["reference_doctype"] = reference_doctype
+	if company:
+		filters["company"] = company
+
+	events = frappe.get_all(
+		"Expense Event", filters=filters, fields=EVENT_FIELDS, order_by="sequence asc", limit_page_length=limit + 1
+	)
+
+	has_more = len(events) > limit
+	events = events[:limit]
+
+	for event in events:
+		event.data = json.loads(event.data) if event.data else None
+
+	return {
+		"events": events,
+		"cursor": events[-1].sequence if events else after,
+		"has_more": has_more,
+	}
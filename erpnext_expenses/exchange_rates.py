@@ -0,0 +1,107 @@
+"""
+Date-indexed exchange rates for expenses in foreign currencies.
+
+Rates come from ERPNext's Currency Exchange records (buying rates). Each
+currency pair is loaded once into a sorted, date-indexed table kept in the
+Redis cache, so converting a report with hundreds of lines needs at most one
+query for all the currencies it uses instead of one lookup per line.
+"""
+
+from bisect import bisect_right
+from decimal import Decimal
+
+import frappe
+from frappe import _
+from frappe.utils import getdate
+
+CACHE_KEY = "erpnext_expenses:exchange_rates"
+
+
+class ExchangeRateTable:
+	"""Exchange rates into one target currency, indexed by date per source currency."""
+
+	def __init__(self, to_currency):
+		self.to_currency = to_currency
+		self._dates = {}
+		self._rates = {}
+
+	@classmethod
+	def preload(cls, to_currency, currencies):
+		"""Build a table for the given source currencies with a single query.
+
+		Pairs already in the cache are not queried again.
+
+		Args:
+			to_currency: Target (company) currency
+			currencies: Iterable of source currencies
+		"""
+		table = cls(to_currency)
+		missing = []
+
+		for currency in set(currencies) - {to_currency, None, ""}:
+			cached = frappe.cache.hget(CACHE_KEY, _pair_key(currency, to_currency))
+			if cached is None:
+				missing.append(currency)
+			else:
+				table._add(currency, cached)
+
+		if missing:
+			rows = frappe.get_all(
+				"Currency Exchange",
+				filters={
+					"from_currency": ("in", missing),
+					"to_currency": to_currency,
+					"for_buying": 1,
+				},
+				fields=["from_currency", "date", "exchange_rate"],
+				order_by="date asc",
+			)
+
+			history = {currency: [] for currency in missing}
+			for row in rows:
+				history[row.from_currency].append((str(row.date), str(row.exchange_rate)))
+
+			for currency, entries in history.items():
+				frappe.cache.hset(CACHE_KEY, _pair_key(currency, to_currency), entries)
+				table._add(currency, entries)
+
+		return table
+
+	def _add(self, currency, entries):
+		self._dates[currency] = [getdate(date) for date, _rate in entries]
+		self._rates[currency] = [Decimal(rate) for _date, rate in entries]
+
+	def get_rate(self, currency, date):
+		"""Return the latest rate on or before a date as a Decimal.
+
+		Raises:
+			frappe.ValidationError: If no rate exists for the currency and date
+		"""
+		if not currency or currency == self.to_currency:
+			return Decimal(1)
+
+		dates = self._dates.get(currency) or []
+		index = bisect_right(dates, getdate(date))
+
+		if not index:
+			frappe.throw(
+				_("No exchange rate found from {0} to {1} on or before {2}. "
+				"Please add a Currency Exchange record.").format(currency, self.to_currency, date),
+				title=_("Missing Exchange Rate"),
+			)
+
+		return self._rates[currency][index - 1]
+
+
+def get_company_currency(company):
+	"""Return the default currency of a company."""
+	return frappe.get_cached_value("Company", company, "default_currency")
+
+
+def clear_exchange_rate_cache(doc=None, method=None):
+	"""Drop cached rate tables when a Currency Exchange record changes."""
+	frappe.cache.delete_value(CACHE_KEY)
+
+
+def _pair_key(from_currency, to_currency):
+	return f"{from_currency}:{to_currency}"
@@ -0,0 +1,109 @@
+"""
+Hashed fixture sync.
+
+Frappe re-imports every record of every file in an app's `fixtures` folder
+on each `bench migrate`, whether it changed or not. This app's fixtures live
+in `synced_fixtures/` instead and are imported after migrate by
+sync_fixtures(), which keeps a content hash per record and per file and only
+imports records whose content changed or that are missing from the site. A
+file is skipped, with one query for its record names, when its hash is
+unchanged and all of its records exist.
+
+The records exported are listed, with filters scoped to this app, in the
+`hashed_fixtures` hook. Export them with:
+
+	bench --site <site> execute erpnext_expenses.fixture_sync.export_fixtures
+"""
+
+import hashlib
+import json
+import os
+
+import frappe
+from frappe.modules.import_file import import_doc
+
+APP = "erpnext_expenses"
+
+# Global default holding {"<doctype>:<name>": hash, "file:<file name>": hash}
+HASH_KEY = "erpnext_expenses_fixture_hashes"
+
+
+def get_fixtures_path(*parts):
+	return frappe.get_app_path(APP, "synced_fixtures", *parts)
+
+
+def get_fixture_specs():
+	"""Return the fixtures of the `hashed_fixtures` hook as dicts with 'dt' and 'filters'."""
+	specs = []
+	for spec in frappe.get_hooks("hashed_fixtures", app_name=APP):
+		if isinstance(spec, str):
+			spec = {"dt": spec}
+		specs.append(spec)
+
+	return specs
+
+
+def sync_fixtures():
+	"""Import the fixture records that changed since the last sync."""
+	hashes = json.loads(frappe.db.get_global(HASH_KEY) or "{}")
+
+	for spec in get_fixture_specs():
+		file_name = f"{frappe.scrub(spec['dt'])}.json"
+		path = get_fixtures_path(file_name)
+		if not os.path.exists(path):
+			continue
+
+		with open(path, "rb") as f:
+			content = f.read()
+
+		docs = json.loads(content)
+		names = [doc["name"] for doc in docs]
+		existing = set(frappe.get_all(spec["dt"], filters={"name": ("in", names)}, pluck="name")) if names else set()
+
+		file_hash = hashlib.sha256(content).hexdigest()
+		if hashes.get(f"file:{file_name}") == file_hash and existing.issuperset(names):
+			continue
+
+		frappe.flags.mute_emails = True
+		try:
+			_sync_records(spec["dt"], docs, existing, hashes)
+		finally:
+			frappe.flags.mute_emails = False
+
+		hashes[f"file:{file_name}"] = file_hash
+		frappe.db.set_global(HASH_KEY, json.dumps(hashes, sort_keys=True))
+		frappe.db.commit()
+
+
+def _sync_records(doctype, docs, existing, hashes):
+	"""Import the records of one fixture file whose hash changed or that are missing."""
+	for doc in docs:
+		key = f"{doctype}:{doc['name']}"
+		record_hash = get_record_hash(doc)
+
+		if hashes.get(key) == record_hash and doc["name"] in existing:
+			continue
+
+		import_doc(doc, data_import=True, reset_permissions=True)
+		hashes[key] = record_hash
+
+
+def get_record_hash(doc):
+	"""Hash a fixture record's content, independent of key order."""
+	return hashlib.sha256(json.dumps(doc, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def export_fixtures():
+	"""Export the `hashed_fixtures` records of this site into `synced_fixtures/`."""
+	from frappe.core.doctype.data_import.data_import import export_json
+
+	os.makedirs(get_fixtures_path(), exist_ok=True)
+
+	for spec in get_fixture_specs():
+		export_json(
+			spec["dt"],
+			get_fixtures_path(f"{frappe.scrub(spec['dt'])}.json"),
+			filters=spec.get("filters"),
+			or_filters=spec.get("or_filters"),
+			order_by="idx asc, creation asc",
+		)
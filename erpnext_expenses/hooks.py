@@ -130,6 +130,75 @@ required_apps = ["frappe", "erpnext"]
 # 	}
 # }
 
+doc_events = {
+	"Currency Exchange": {
+		"on_update": "erpnext_expenses.exchange_rates.clear_exchange_rate_cache",
+		"on_trash": "erpnext_expenses.exchange_rates.clear_exchange_rate_cache",
+	},
+	"Employee": {
+		"on_update": "erpnext_expenses.accounting_dimensions.clear_employee_dimension_cache",
+		"on_trash": "erpnext_expenses.accounting_dimensions.clear_employee_dimension_cache",
+	},
+	"Department": {
+		"on_update": "erpnext_expenses.accounting_dimensions.clear_employee_dimension_cache",
+		"on_trash": "erpnext_expenses.accounting_dimensions.clear_employee_dimension_cache",
+	},
+	"Accounting Dimension": {
+		"on_update": "erpnext_expenses.accounting_dimensions.clear_employee_dimension_cache",
+		"on_trash": "erpnext_expenses.accounting_dimensions.clear_employee_dimension_cache",
+	},
+	"Print Format": {
+		"on_update": "erpnext_expenses.report_views.clear_rendering_cache",
+		"on_trash": "erpnext_expenses.report_views.clear_rendering_cache",
+	},
+	"Letter Head": {
+		"on_update": "erpnext_expenses.report_views.clear_rendering_cache",
+		"on_trash": "erpnext_expenses.report_views.clear_rendering_cache",
+	},
+	"Print Settings": {
+		"on_update": "erpnext_expenses.report_views.clear_rendering_cache",
+	},
+	"Expense Settings": {
+		"on_update": "erpnext_expenses.report_views.clear_rendering_cache",
+	},
+	"Journal Entry": {
+		"before_cancel": "erpnext_expenses.archive.validate_journal_entry_cancel",
+		"on_submit": "erpnext_expenses.events.on_journal_entry_submit",
+		"on_cancel": [
+			"erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report.on_journal_entry_cancel",
+			"erpnext_expenses.events.on_journal_entry_cancel",
+		],
+	},
+	"Expense": {
+		"after_insert": "erpnext_expenses.events.on_expense_insert",
+		"on_update": "erpnext_expenses.events.on_expense_update",
+		"on_change": "erpnext_expenses.erpnext_expenses.report.expense_analytics.expense_analytics.clear_analytics_cache",
+		"on_trash": [
+			"erpnext_expenses.erpnext_expenses.report.expense_analytics.expense_analytics.clear_analytics_cache",
+			"erpnext_expenses.events.on_expense_trash",
+		],
+	},
+	"Expense Report": {
+		"on_update": "erpnext_expenses.events.on_report_update",
+		"on_update_after_submit": "erpnext_expenses.events.on_report_update",
+		"on_cancel": "erpnext_expenses.events.on_report_cancel",
+		"on_change": "erpnext_expenses.erpnext_expenses.report.expense_analytics.expense_analytics.clear_analytics_cache",
+		"on_trash": [
+			"erpnext_expenses.erpnext_expenses.report.expense_analytics.expense_analytics.clear_analytics_cache",
+			"erpnext_expenses.events.on_report_trash",
+		],
+	},
+	"Expense Detail": {
+		"after_insert": "erpnext_expenses.events.on_expense_detail_insert",
+	},
+}
+
+# Accounting Dimensions
+# ---------------------
+# ERPNext adds a field for every accounting dimension to these doctypes
+
+accounting_dimension_doctypes = ["Expense Splitting Detail"]
+
 # Scheduled Tasks
 # ---------------
 
@@ -151,6 +220,22 @@ required_apps = ["frappe", "erpnext"]
 # 	],
 # }
 
+scheduler_events = {
+	"all": [
+		"erpnext_expenses.job_router.dispatch",
+		"erpnext_expenses.events.sequence_events"
+	],
+	"hourly": [
+		"erpnext_expenses.anomalies.scan_expenses"
+	],
+	"daily": [
+		"erpnext_expenses.erpnext_expenses.doctype.expense.expense.auto_batch_draft_expenses"
+	],
+	"daily_long": [
+		"erpnext_expenses.archive.archive_expenses"
+	],
+}
+
 # Testing
 # -------
 
@@ -228,17 +313,41 @@ required_apps = ["frappe", "erpnext"]
 # }
 
 
-fixtures = [
-    "Client Script",
-    "Custom Field",
-	"Print Format",
-	"Property Setter",
-    "Workspace",
-    "Workflow State",
-    "Workflow Action Master",
-    "Workflow"
+# Fixtures
+# --------
+# Synced after migrate by erpnext_expenses.fixture_sync from synced_fixtures/,
+# importing only records whose content hash changed. They are not declared as
+# standard `fixtures` because Frappe force-imports every fixture file on each
+# migrate. The Expenses workspace is a standard module workspace.
+
+hashed_fixtures = [
+	{"dt": "Client Script", "filters": [["module", "=", "Erpnext Expenses"]]},
+	{"dt": "Custom Field", "filters": [["dt", "in", ["Expense", "Expense Report", "Expense Category"]]]},
+	{
+		"dt": "Workflow State",
+		"filters": [[
+			"name",
+			"in",
+			["Draft", "Pending Manager", "Pending Finance", "Approved", "Rejected", "Journals Created", "Cancelled"],
+		]],
+	},
+	{
+		"dt": "Workflow Action Master",
+		"filters": [[
+			"name",
+			"in",
+			[
+				"Submit to Manager", "Submit to Finance", "Recall", "Request Amendment",
+				"Approve", "Reject", "Revise", "Cancel", "Create Journal Entries",
+			],
+		]],
+	},
+	{"dt": "Workflow", "filters": [["document_type", "=", "Expense Report"]]},
 ]
 
-# Translations are now managed centrally by rustic_translator.
-# See rustic_translator/setup_translations.py
-# after_migrate = ["erpnext_expenses.setup_translations.setup_translations"]
\ No newline at end of file
+# Arabic strings ship in translations/ar.csv; the Translation rows are only
+# re-synced when that bundle changes
+after_migrate = [
+	"erpnext_expenses.fixture_sync.sync_fixtures",
+	"erpnext_expenses.setup_translations.sync_translations",
+]
\ No newline at end of file
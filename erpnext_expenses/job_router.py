@@ -0,0 +1,229 @@
+"""
+Company-aware routing of this app's heavy background jobs.
+
+Journal posting, bulk report processing, reimbursement payments and exports
+are not put on the shared queue directly. They are added to a pending list per
+company in Redis, and dispatch() hands them to the `long` queue round-robin
+across companies, one job per company per round, never running more than the
+configured number of jobs per company at once. One company's month-end
+therefore cannot fill the workers while other companies wait.
+
+Jobs are only added to the pending lists, and dispatched, after the
+caller's transaction commits: a worker never reads rows from before the
+commit, and a rolled back request queues nothing.
+
+Running jobs are tracked per company with their start time, so a job whose
+worker died is forgotten after JOB_TIMEOUT instead of holding its slot.
+"""
+
+import json
+import time
+
+import frappe
+from frappe.utils import cint
+
+PENDING_KEY = "erpnext_expenses:jobs:pending"
+RUNNING_KEY = "erpnext_expenses:jobs:running"
+COMPANIES_KEY = "erpnext_expenses:jobs:companies"
+ROUND_ROBIN_KEY = "erpnext_expenses:jobs:next_company"
+DISPATCH_LOCK_KEY = "erpnext_expenses:jobs:dispatch_lock"
+
+# Seconds after which a running job is assumed lost
+JOB_TIMEOUT = 4 * 60 * 60
+
+DEFAULT_JOBS_PER_COMPANY = 2
+
+
+def enqueue_for_company(company, method, **kwargs):
+	"""Queue a job for a company once the current transaction commits, then dispatch.
+
+	Args:
+		company: Company the job works on
+		method: Dotted path of the job function
+		kwargs: Keyword arguments for the job (must be JSON serializable)
+
+	Returns:
+		The id of the job
+	"""
+	job = {
+		"id": frappe.generate_hash(length=12),
+		"method": method,
+		"kwargs": kwargs,
+		"user": frappe.session.user,
+		"queued_at": time.time(),
+	}
+
+	# Once per transaction: queue and dispatch the jobs after the commit
+	if not frappe.flags.expense_jobs_to_queue:
+		frappe.flags.expense_jobs_to_queue = []
+		frappe.db.after_commit.add(_queue_after_commit)
+		frappe.db.after_rollback.add(_forget_queued_jobs)
+
+	frappe.flags.expense_jobs_to_queue.append((company, job))
+
+	return job["id"]
+
+
+def _queue_after_commit():
+	jobs = frappe.flags.expense_jobs_to_queue or []
+	frappe.flags.expense_jobs_to_queue = None
+
+	for company, job in jobs:
+		frappe.cache.rpush(_key(PENDING_KEY, company), json.dumps(job))
+		frappe.cache.sadd(COMPANIES_KEY, company)
+
+	dispatch()
+
+
+def _forget_queued_jobs():
+	frappe.flags.expense_jobs_to_queue = None
+
+
+def dispatch():
+	"""Start pending jobs, one per company per round, within each company's limit.
+
+	Also runs from the scheduler, so jobs left pending by a lost worker are
+	picked up again.
+	"""
+	companies = _get_companies()
+	if not companies:
+		return
+
+	limit = get_jobs_per_company()
+
+	# One dispatcher at a time, so two of them cannot both fill the last slot
+	lock = frappe.cache.lock(frappe.cache.make_key(DISPATCH_LOCK_KEY), timeout=60, blocking_timeout=10)
+	if not lock.acquire():
+		return
+
+	try:
+		# Start each dispatch with the company after the one served first last time
+		start = cint(frappe.cache.get_value(ROUND_ROBIN_KEY)) % len(companies)
+		companies = companies[start:] + companies[:start]
+		frappe.cache.set_value(ROUND_ROBIN_KEY, start + 1)
+
+		while companies:
+			for company in list(companies):
+				if not _start_next_job(company, limit):
+					companies.remove(company)
+	finally:
+		lock.release()
+
+
+def _start_next_job(company, limit):
+	"""Start the next pending job of a company if it has a free slot.
+
+	Returns:
+		True if a job was started
+	"""
+	if len(_get_running(company)) >= limit:
+		return False
+
+	payload = frappe.cache.lpop(_key(PENDING_KEY, company))
+	if not payload:
+		return False
+
+	job = json.loads(payload)
+	running_key = _key(RUNNING_KEY, company)
+
+	# The slot is taken before the job can start, as a fast worker frees it on
+	# finishing, and given back with the job if it cannot be enqueued
+	frappe.cache.hset(running_key, job["id"], time.time())
+
+	try:
+		frappe.enqueue(
+			"erpnext_expenses.job_router.run_job",
+			queue="long",
+			timeout=JOB_TIMEOUT,
+			job_id=f"erpnext_expenses:{job['id']}",
+			company=company,
+			job=job,
+		)
+	except Exception:
+		frappe.cache.hdel(running_key, job["id"])
+		frappe.cache.lpush(_key(PENDING_KEY, company), payload)
+		frappe.log_error(title=f"Error enqueuing expense job {job['method']} for {company}")
+		return False
+
+	return True
+
+
+def run_job(company, job):
+	"""Worker entry point: run a routed job, then free its slot and dispatch more."""
+	try:
+		frappe.set_user(job["user"])
+		frappe.get_attr(job["method"])(**job["kwargs"])
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(title=f"Expense job {job['method']} failed for {company}")
+	finally:
+		frappe.cache.hdel(_key(RUNNING_KEY, company), job["id"])
+		dispatch()
+
+
+def _get_running(company):
+	"""Return {job id: start time} of a company's running jobs, dropping lost ones."""
+	running_key = _key(RUNNING_KEY, company)
+	running = frappe.cache.hgetall(running_key) or {}
+
+	lost = [job_id for job_id, started in running.items() if time.time() - started > JOB_TIMEOUT]
+	if lost:
+		frappe.cache.hdel(running_key, lost)
+
+	return {job_id: started for job_id, started in running.items() if job_id not in lost}
+
+
+def _get_companies():
+	return sorted(company.decode() if isinstance(company, bytes) else company
+		for company in frappe.cache.smembers(COMPANIES_KEY) or [])
+
+
+def get_jobs_per_company():
+	return cint(frappe.db.get_single_value("Expense Settings", "max_jobs_per_company")) or DEFAULT_JOBS_PER_COMPANY
+
+
+def _key(prefix, company):
+	return f"{prefix}:{company}"
+
+
+@frappe.whitelist()
+def get_queue_metrics():
+	"""Return the pending and running job counts of each company.
+
+	Returns:
+		List of dicts with 'company', 'pending', 'running', 'limit' and
+		'oldest_pending' (seconds waited by the oldest pending job)
+	"""
+	frappe.only_for(["System Manager", "Accounts Manager"])
+
+	limit = get_jobs_per_company()
+	metrics = []
+
+	for company in _get_companies():
+		pending_key = _key(PENDING_KEY, company)
+		oldest = frappe.cache.lrange(pending_key, 0, 0)
+
+		metrics.append({
+			"company": company,
+			"pending": frappe.cache.llen(pending_key),
+			"running": len(_get_running(company)),
+			"limit": limit,
+			"oldest_pending": int(time.time() - json.loads(oldest[0])["queued_at"]) if oldest else 0,
+		})
+
+	return metrics
+
+
+def group_by_company(doctype, names):
+	"""Group document names by their company with one query, keeping their order."""
+	companies = dict(
+		frappe.get_all(doctype, filters={"name": ("in", names)}, fields=["name", "company"], as_list=True)
+	)
+
+	groups = {}
+	for name in names:
+		if name in companies:
+			groups.setdefault(companies[name], []).append(name)
+
+	return groups
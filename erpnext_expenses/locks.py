@@ -0,0 +1,85 @@
+"""
+Fine-grained Redis locks for expenses and reports.
+
+Adding expenses to a report and posting a report's journal entries are
+check-then-write sequences: two workers could both pass the check before
+either writes. They now run while holding a lock on each expense or report
+involved, so requests on disjoint expenses still run in parallel while
+overlapping ones wait for each other.
+
+Locks are plain Redis keys set with NX and an expiry, so a crashed worker
+never holds one for longer than LOCK_TIMEOUT. Several keys are always taken
+in sorted order, which rules out deadlocks between two multi-key holders,
+and released with a compare-and-delete script so a lock that expired and was
+taken by someone else is never released by its previous holder.
+"""
+
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+
+# Seconds before a lock expires on its own
+LOCK_TIMEOUT = 300
+
+# Seconds to wait for locks held by someone else
+WAIT_TIMEOUT = 30
+
+RETRY_INTERVAL = 0.1
+
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+	return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class ExpenseLockError(frappe.ValidationError):
+	pass
+
+
+def expense_lock_keys(expense_ids):
+	return [f"erpnext_expenses:lock:expense:{expense_id}" for expense_id in expense_ids if expense_id]
+
+
+def report_lock_key(report):
+	return f"erpnext_expenses:lock:report:{report}"
+
+
+@contextmanager
+def hold(keys, timeout=LOCK_TIMEOUT, wait=WAIT_TIMEOUT):
+	"""Hold the locks on several keys for the duration of a block.
+
+	Anything the block writes should be committed inside it, so another
+	holder never reads data from before the commit.
+
+	Raises:
+		ExpenseLockError: If the locks are not free within `wait` seconds
+	"""
+	token = frappe.generate_hash(length=16)
+	acquired = []
+	deadline = time.monotonic() + wait
+
+	try:
+		for key in sorted(set(keys)):
+			redis_key = frappe.cache.make_key(key)
+
+			while not frappe.cache.set(redis_key, token, nx=True, ex=timeout):
+				if time.monotonic() >= deadline:
+					frappe.throw(
+						_("This is being processed by another request. Please try again in a moment."),
+						ExpenseLockError,
+						title=_("Busy"),
+					)
+				time.sleep(RETRY_INTERVAL)
+
+			acquired.append(redis_key)
+
+		yield
+
+	finally:
+		release = frappe.cache.register_script(RELEASE_SCRIPT)
+		for redis_key in reversed(acquired):
+			release(keys=[redis_key], args=[token])
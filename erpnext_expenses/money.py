@@ -0,0 +1,109 @@
+"""
+Exact money arithmetic for expenses and journal entries.
+
+Amounts are converted once from the stored values into integer minor units
+(e.g. cents) at the company's currency precision, added and split as
+integers, and only turned back into floats when written to a document.
+Rounding happens in one place, half up, and any rounding remainder is
+allocated deterministically, so sums of thousands of lines never drift and
+journal entries always balance.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+import frappe
+from frappe.utils import cint, get_number_format_info
+
+DEFAULT_PRECISION = 2
+
+
+def get_company_precision(company):
+	"""Return the number of decimals used for amounts in a company's currency."""
+	precision = cint(frappe.db.get_default("currency_precision"))
+	if precision:
+		return precision
+
+	currency = frappe.get_cached_value("Company", company, "default_currency")
+	number_format = (
+		frappe.get_cached_value("Currency", currency, "number_format")
+		or frappe.db.get_default("number_format")
+		or "#,###.##"
+	)
+
+	return get_number_format_info(number_format)[2]
+
+
+def to_decimal(value):
+	"""Convert a stored amount (float, str, int or Decimal) to Decimal without float noise."""
+	if isinstance(value, Decimal):
+		return value
+
+	return Decimal(str(value or 0))
+
+
+def to_minor(amount, precision=DEFAULT_PRECISION):
+	"""Round an amount half up to integer minor units."""
+	return int(to_decimal(amount).scaleb(precision).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor(minor, precision=DEFAULT_PRECISION):
+	"""Convert integer minor units back to a Decimal amount."""
+	return Decimal(minor).scaleb(-precision)
+
+
+def to_float(minor, precision=DEFAULT_PRECISION):
+	"""Convert integer minor units to a float for a Currency field."""
+	return float(from_minor(minor, precision))
+
+
+def convert(amount, exchange_rate, precision=DEFAULT_PRECISION):
+	"""Convert an amount with an exchange rate into minor units of the target currency."""
+	return to_minor(to_decimal(amount) * to_decimal(exchange_rate or 1), precision)
+
+
+def percentage_of(amount, percentage, precision=DEFAULT_PRECISION):
+	"""Return a percentage of an amount (e.g. VAT) in minor units."""
+	return to_minor(to_decimal(amount) * to_decimal(percentage) / 100, precision)
+
+
+def allocate(total, weights):
+	"""Split an integer total proportionally to weights, exactly.
+
+	Uses the largest remainder method: every share is floored, then the
+	leftover units go to the largest fractional remainders, ties going to
+	the earliest weight. The shares always add up to the total and the
+	result only depends on the order of the weights.
+
+	Args:
+		total: Integer amount in minor units (may be negative)
+		weights: Non-negative numbers, e.g. the original line amounts
+
+	Returns:
+		List of integer shares, one per weight
+	"""
+	weights = [to_decimal(weight) for weight in weights]
+	weight_total = sum(weights)
+
+	if not weights:
+		return []
+
+	if not weight_total:
+		# Nothing to be proportional to: give everything to the first line
+		return [total] + [0] * (len(weights) - 1)
+
+	sign = -1 if total < 0 else 1
+	magnitude = abs(total)
+
+	shares = []
+	remainders = []
+	for index, weight in enumerate(weights):
+		exact = magnitude * weight / weight_total
+		share = int(exact)
+		shares.append(share)
+		remainders.append((exact - share, -index))
+
+	leftover = magnitude - sum(shares)
+	for _remainder, negative_index in sorted(remainders, reverse=True)[:leftover]:
+		shares[-negative_index] += 1
+
+	return [sign * share for share in shares]
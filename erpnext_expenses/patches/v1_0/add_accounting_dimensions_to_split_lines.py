@@ -0,0 +1,16 @@
+import frappe
+
+
+def execute():
+	"""Add fields for existing accounting dimensions to Expense Splitting Detail.
+
+	ERPNext only adds dimension fields to the doctypes in
+	accounting_dimension_doctypes when a dimension is created, so dimensions
+	created before this app declared the hook need their fields added here.
+	"""
+	from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
+		create_accounting_dimensions_for_doctype,
+	)
+
+	create_accounting_dimensions_for_doctype("Expense Splitting Detail")
+	frappe.clear_cache(doctype="Expense Splitting Detail")
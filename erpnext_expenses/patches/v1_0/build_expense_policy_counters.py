@@ -0,0 +1,29 @@
+import frappe
+
+
+def execute():
+	"""Build the Expense Policy Counter table from existing expenses.
+
+	After this, counters are maintained incrementally by the Expense controller.
+	"""
+	frappe.db.delete("Expense Policy Counter")
+
+	period_starts = {
+		"Daily": "expense_date",
+		"Monthly": "DATE_SUB(expense_date, INTERVAL DAYOFMONTH(expense_date) - 1 DAY)",
+	}
+
+	for period, period_start in period_starts.items():
+		frappe.db.sql(f"""
+			INSERT INTO `tabExpense Policy Counter`
+				(name, creation, modified, owner, modified_by, employee, category, period, period_start, amount)
+			SELECT
+				CONCAT_WS('|', employee, category, '{period}', {period_start}),
+				NOW(), NOW(), 'Administrator', 'Administrator',
+				employee, category, '{period}', {period_start}, SUM(base_total)
+			FROM `tabExpense`
+			WHERE docstatus != 2
+			AND IFNULL(employee, '') != ''
+			AND IFNULL(category, '') != ''
+			GROUP BY employee, category, {period_start}
+		""")
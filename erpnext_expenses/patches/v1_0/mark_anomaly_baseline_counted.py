@@ -0,0 +1,14 @@
+import frappe
+
+
+def execute():
+	"""Mark expenses already counted in the anomaly baselines, which used to be told apart by the scan watermark."""
+	watermark = frappe.db.get_single_value("Expense Settings", "anomaly_scan_watermark")
+	if not watermark:
+		return
+
+	frappe.db.sql("""
+		UPDATE `tabExpense`
+		SET anomaly_baseline_counted = 1
+		WHERE creation <= %s AND docstatus != 2
+	""", (watermark,))
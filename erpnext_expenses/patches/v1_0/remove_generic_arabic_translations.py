@@ -0,0 +1,64 @@
+import frappe
+
+# Generic Frappe/ERPNext strings the app used to ship, with the translation it set for them
+REMOVED = {
+	"Error": "خطأ",
+	"Success": "تم بنجاح",
+	"Refresh": "تحديث",
+	"Tabs": "علامات التبويب",
+	"Loading...": "جارٍ التحميل...",
+	"Description": "الوصف",
+	"Category": "الفئة",
+	"Amount": "المبلغ",
+	"Date": "التاريخ",
+	"Notes": "ملاحظات",
+	"Attachments": "المرفقات",
+	"Uploading...": "جارٍ الرفع...",
+	"Cancel": "إلغاء",
+	"Saving...": "جارٍ الحفظ...",
+	"Save": "حفظ",
+	"Edit": "تعديل",
+	"Delete": "حذف",
+	"Draft": "مسودة",
+	"Submitted": "مُعتمد",
+	"Cancelled": "ملغي",
+	"Manager": "المدير",
+	"Finance": "المالية",
+	"Approved": "مُعتمد",
+	"Complete": "مكتمل",
+	"Rejected": "مرفوض",
+	"Recall": "استرجاع",
+	"Revise": "مراجعة",
+	"Employee": "موظف",
+	"Company": "شركة",
+	"Total": "الإجمالي",
+	"Employee Name": "اسم الموظف",
+	"Amended From": "معدّل من",
+	"Permission Denied": "تم رفض الإذن",
+	"{0}: {1}": "{0}: {1}",
+	"Expenses": "المصروفات",
+	"Paid By": "مدفوع بواسطة",
+	"Open in New Tab": "فتح في تبويب جديد",
+	"Syncing...": "جارٍ المزامنة...",
+}
+
+
+def execute():
+	"""Delete the Translation rows the app created for generic strings, so core translations apply again.
+
+	Rows whose translation was changed on the site since are kept.
+	"""
+	rows = frappe.get_all(
+		"Translation",
+		filters={"language": "ar", "source_text": ("in", list(REMOVED)), "context": ("is", "not set")},
+		fields=["name", "source_text", "translated_text"],
+	)
+
+	names = [
+		row.name
+		for row in rows
+		# The database compares case-insensitively; only exact matches are ours
+		if row.source_text in REMOVED and row.translated_text == REMOVED[row.source_text]
+	]
+	if names:
+		frappe.db.delete("Translation", {"name": ("in", names)})
@@ -0,0 +1,6 @@
+from erpnext_expenses.events import sequence_events
+
+
+def execute():
+	"""Number the events recorded before the feed's cursor moved from event ids to commit-ordered sequences."""
+	sequence_events()
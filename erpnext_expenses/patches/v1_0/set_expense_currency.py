@@ -0,0 +1,27 @@
+import frappe
+
+
+def execute():
+	"""Backfill currency fields on expenses recorded before multi-currency support.
+
+	Existing expenses were always in company currency, so they get the company
+	currency, an exchange rate of 1 and a company-currency total equal to the total.
+	"""
+	frappe.db.sql("""
+		UPDATE `tabExpense` e
+		JOIN `tabCompany` c ON c.name = e.company
+		SET e.currency = c.default_currency,
+			e.company_currency = c.default_currency,
+			e.exchange_rate = 1,
+			e.base_total = e.total
+		WHERE IFNULL(e.currency, '') = ''
+	""")
+
+	frappe.db.sql("""
+		UPDATE `tabExpense Detail` ed
+		JOIN `tabExpense` e ON e.name = ed.expense_id
+		SET ed.currency = e.currency,
+			ed.exchange_rate = 1,
+			ed.base_subtotal = ed.subtotal
+		WHERE IFNULL(ed.currency, '') = ''
+	""")
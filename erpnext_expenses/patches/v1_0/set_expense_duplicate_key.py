@@ -0,0 +1,20 @@
+import frappe
+from frappe.utils import create_batch
+
+from erpnext_expenses.anomalies import get_duplicate_key
+
+
+def execute():
+	"""Compute the duplicate key of expenses saved before duplicate detection."""
+	expenses = frappe.get_all(
+		"Expense",
+		filters={"duplicate_key": ("is", "not set")},
+		fields=["name", "employee", "company", "category", "expense_date", "currency", "total"],
+	)
+
+	for chunk in create_batch(expenses, 1000):
+		frappe.db.bulk_update(
+			"Expense",
+			{expense.name: {"duplicate_key": get_duplicate_key(expense)} for expense in chunk},
+			update_modified=False,
+		)
@@ -0,0 +1,21 @@
+import frappe
+from frappe.utils import create_batch
+
+from erpnext_expenses.anomalies import get_duplicate_key
+
+
+def execute():
+	"""Compute the duplicate key of split lines saved before split lines were checked for duplicates."""
+	lines = frappe.db.sql("""
+		SELECT sd.name, sd.amount, e.employee, e.company, e.category, e.expense_date, e.currency
+		FROM `tabExpense Splitting Detail` sd
+		INNER JOIN `tabExpense` e ON e.name = sd.parent
+		WHERE sd.parenttype = 'Expense' AND IFNULL(sd.duplicate_key, '') = ''
+	""", as_dict=True)
+
+	for chunk in create_batch(lines, 1000):
+		frappe.db.bulk_update(
+			"Expense Splitting Detail",
+			{line.name: {"duplicate_key": get_duplicate_key(line, line.amount)} for line in chunk},
+			update_modified=False,
+		)
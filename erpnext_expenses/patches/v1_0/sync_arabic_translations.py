@@ -0,0 +1,6 @@
+from erpnext_expenses.setup_translations import sync_translations
+
+
+def execute():
+	"""Merge the Translation rows left by the per-string inserts into one row per bundle string."""
+	sync_translations(force=True)
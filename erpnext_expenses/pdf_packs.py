@@ -0,0 +1,243 @@
+"""
+PDF packs of Expense Reports with their receipts, for auditors.
+
+Reports are rendered through a print format by a pool of worker processes,
+each with its own site connection, and written straight to a temporary
+directory. Each report's PDF is then merged with the PDF and image receipts
+of its expenses into one file per report. Only one report is held in memory
+at a time: finished reports are either attached to their Expense Report or
+added to a zip archive on disk and their temporary files deleted.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+
+# Processes rendering print formats in parallel
+PDF_WORKERS = min(4, os.cpu_count() or 1)
+
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp"}
+
+
+def build_report_pack(reports, print_format=None, combine=True, user=None):
+	"""Background job: build the PDF pack of several Expense Reports.
+
+	Args:
+		reports: List of Expense Report names
+		print_format: Print format used to render the reports
+		combine: True for one zip archive of all reports, False to attach
+			each report's PDF to the report itself
+		user: User notified when the pack is ready
+	"""
+	user = user or frappe.session.user
+	work_dir = tempfile.mkdtemp(prefix="expense_pack_")
+	attachments = _get_receipt_paths(reports)
+	errors = []
+	file_url = None
+
+	try:
+		archive = None
+		if cint(combine):
+			archive_name = f"expense-reports-{now_datetime().strftime('%Y%m%d-%H%M%S')}.zip"
+			archive_path = os.path.join(work_dir, archive_name)
+			archive = zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED)
+
+		jobs = [(report, print_format, os.path.join(work_dir, f"{report}.print.pdf")) for report in reports]
+
+		with ProcessPoolExecutor(
+			max_workers=PDF_WORKERS,
+			mp_context=multiprocessing.get_context("spawn"),
+			initializer=_init_worker,
+			initargs=(frappe.local.site, frappe.local.sites_path, user),
+		) as executor:
+			# map() yields in report order, so the pack order is deterministic
+			for report, error in zip(reports, executor.map(_render_report, jobs)):
+				if error:
+					errors.append(_("{0}: {1}").format(report, error))
+					continue
+
+				report_path = os.path.join(work_dir, f"{report}.pdf")
+				errors.extend(
+					_merge_report(os.path.join(work_dir, f"{report}.print.pdf"), attachments.get(report, []), report_path)
+				)
+
+				if archive:
+					archive.write(report_path, arcname=f"{report}.pdf")
+					os.remove(report_path)
+				else:
+					# Moves the file into the site's private files
+					_save_file(report_path, f"{report}.pdf", "Expense Report", report)
+
+				frappe.db.commit()
+
+		if archive:
+			archive.close()
+			file_url = _save_file(archive_path, archive_name)
+			frappe.db.commit()
+
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(f"Error building expense report PDF pack: {str(e)}")
+		errors.append(str(e))
+
+	finally:
+		shutil.rmtree(work_dir, ignore_errors=True)
+
+	frappe.publish_realtime(
+		"expense_report_pdf_pack",
+		{"file_url": file_url, "combine": cint(combine), "count": len(reports), "errors": errors},
+		user=user,
+	)
+
+
+def _init_worker(site, sites_path, user):
+	"""Connect a pool process to the site."""
+	frappe.init(site=site, sites_path=sites_path)
+	frappe.connect()
+	frappe.set_user(user)
+
+
+def _render_report(job):
+	"""Render one report to a PDF file in a pool process.
+
+	Returns:
+		None on success, or the error message
+	"""
+	report, print_format, path = job
+
+	try:
+		pdf = frappe.get_print("Expense Report", report, print_format, as_pdf=True)
+		with open(path, "wb") as f:
+			f.write(pdf)
+	except Exception as e:
+		frappe.db.rollback()
+		return str(e)
+
+	return None
+
+
+def _get_receipt_paths(reports):
+	"""Map each report to the files of its expenses' attachments, in one query."""
+	rows = frappe.db.sql(
+		"""
+		SELECT ed.parent AS report, ea.attachment
+		FROM `tabExpense Detail` ed
+		JOIN `tabExpense Attachment` ea ON ea.parent = ed.expense_id AND ea.parenttype = 'Expense'
+		WHERE ed.parenttype = 'Expense Report' AND ed.parent IN %s AND IFNULL(ea.attachment, '') != ''
+		ORDER BY ed.parent, ed.idx, ea.idx
+		""",
+		(tuple(reports),),
+		as_dict=True,
+	)
+
+	receipts = {}
+	for row in rows:
+		receipts.setdefault(row.report, []).append(row.attachment)
+
+	return receipts
+
+
+def _get_local_path(file_url):
+	"""Return the path on disk of a site file, checked to be inside the site's files folders.
+
+	Raises:
+		frappe.DoesNotExistError: If no File has the URL
+		frappe.PermissionError: If the file resolves outside the public and private files folders
+	"""
+	path = os.path.realpath(frappe.get_doc("File", {"file_url": file_url}).get_full_path())
+
+	for folder in ("public", "private"):
+		root = os.path.realpath(frappe.get_site_path(folder, "files"))
+		if os.path.commonpath([root, path]) == root:
+			return path
+
+	frappe.throw(_("Receipt {0} is outside the site's files").format(file_url), frappe.PermissionError)
+
+
+def _merge_report(print_path, receipts, output_path):
+	"""Append a report's receipts to its printed PDF and write the result.
+
+	PDF receipts are appended as they are and images are converted to a
+	page each. Other file types are skipped.
+
+	Returns:
+		List of messages for receipts that could not be added
+	"""
+	from PIL import Image
+	from pypdf import PdfWriter
+
+	errors = []
+	writer = PdfWriter()
+	writer.append(print_path)
+
+	for file_url in receipts:
+		extension = file_url.rsplit(".", 1)[-1].lower()
+
+		try:
+			path = _get_local_path(file_url)
+		except frappe.DoesNotExistError:
+			path = None
+		except frappe.PermissionError as e:
+			errors.append(str(e))
+			continue
+
+		if not path or not os.path.exists(path):
+			errors.append(_("Receipt {0} not found").format(file_url))
+			continue
+
+		try:
+			if extension == "pdf":
+				writer.append(path)
+			elif extension in IMAGE_EXTENSIONS:
+				image_pdf = f"{output_path}.image.pdf"
+				with Image.open(path) as image:
+					image.convert("RGB").save(image_pdf, "PDF")
+				writer.append(image_pdf)
+				os.remove(image_pdf)
+			else:
+				errors.append(_("Receipt {0} is not a PDF or image and was left out").format(file_url))
+		except Exception as e:
+			errors.append(_("Receipt {0} could not be added: {1}").format(file_url, str(e)))
+
+	with open(output_path, "wb") as f:
+		writer.write(f)
+
+	writer.close()
+	os.remove(print_path)
+
+	return errors
+
+
+def _save_file(path, file_name, attached_to_doctype=None, attached_to_name=None):
+	"""Move a finished file into the site's private files and register it.
+
+	Returns:
+		The URL of the new File
+	"""
+	file_name = f"{frappe.generate_hash(length=8)}-{file_name}"
+	site_path = frappe.get_site_path("private", "files", file_name)
+	shutil.move(path, site_path)
+
+	try:
+		file_doc = frappe.get_doc({
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+			"attached_to_doctype": attached_to_doctype,
+			"attached_to_name": attached_to_name,
+		})
+		file_doc.insert(ignore_permissions=True)
+	except Exception:
+		# Do not leave a file on disk without its File record
+		os.remove(site_path)
+		raise
+
+	return file_doc.file_url
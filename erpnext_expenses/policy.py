@@ -0,0 +1,299 @@
+"""
+Expense policy rules engine.
+
+Expense Policy rules are compiled once per company into small evaluator
+functions, indexed by category, and reused for every expense checked until a
+policy changes. Daily and monthly limits read period totals from the Expense
+Policy Counter table, which is kept up to date incrementally as expenses are
+saved, cancelled or deleted, so a check never sums an employee's history.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import fmt_money, get_first_day, getdate, now_datetime
+
+from erpnext_expenses import money
+
+CACHE_KEY = "erpnext_expenses:expense_policy_rules"
+
+# Periods tracked in Expense Policy Counter
+COUNTER_PERIODS = ("Daily", "Monthly")
+
+# Compiled policies of this process, rebuilt when the cached rules change
+_compiled_policies = {}
+
+
+class CompiledPolicy:
+	"""The enabled policy rules of one company, compiled into evaluators."""
+
+	def __init__(self, rules):
+		self.rules = rules
+		self._checks = {}
+
+		for rule in rules:
+			self._checks.setdefault(rule["category"] or None, []).append(_compile_rule(rule))
+
+	def evaluate(self, expense, period_totals):
+		"""Evaluate the rules that apply to an expense.
+
+		Args:
+			expense: Dict with category, grade, base_total and attachment_count
+			period_totals: Dict of {period: amount} for the expense's
+				employee, category and date, including the expense itself
+
+		Returns:
+			List of violation dicts with 'action' and 'message'
+		"""
+		checks = self._checks.get(None, []) + self._checks.get(expense.category, [])
+		return [violation for violation in (check(expense, period_totals) for check in checks) if violation]
+
+
+def get_policy(company):
+	"""Return the compiled policy of a company."""
+	rules = frappe.cache.hget(CACHE_KEY, company, generator=lambda: _load_rules(company))
+
+	compiled = _compiled_policies.get(company)
+	if not compiled or compiled.rules != rules:
+		compiled = _compiled_policies[company] = CompiledPolicy(rules)
+
+	return compiled
+
+
+def _load_rules(company):
+	return frappe.db.sql(
+		"""
+		SELECT r.rule_type, r.category, r.employee_grade, r.period, r.limit_amount, r.action
+		FROM `tabExpense Policy Rule` r
+		JOIN `tabExpense Policy` p ON p.name = r.parent
+		WHERE r.parenttype = 'Expense Policy' AND p.enabled = 1 AND p.company = %s
+		ORDER BY p.name, r.idx
+		""",
+		(company,),
+		as_dict=True,
+	)
+
+
+def _compile_rule(rule):
+	"""Compile one rule into a function of (expense, period_totals)."""
+	limit = money.to_decimal(rule["limit_amount"])
+	grade = rule["employee_grade"]
+	category = rule["category"] or _("all categories")
+
+	def applies(expense):
+		return not grade or expense.grade == grade
+
+	def violation(message):
+		return {"action": rule["action"], "message": message}
+
+	if rule["rule_type"] == "Receipt Required":
+
+		def check(expense, period_totals):
+			if applies(expense) and expense.base_total > limit and not expense.attachment_count:
+				return violation(
+					_("A receipt is required for {0} expenses above {1}.").format(category, fmt_money(limit))
+				)
+
+	elif rule["period"] in COUNTER_PERIODS:
+		period = rule["period"]
+
+		def check(expense, period_totals):
+			total = period_totals.get(period, 0)
+			if applies(expense) and total > limit:
+				return violation(
+					_("{0} limit of {1} for {2} exceeded: {3} spent.").format(
+						_(period), fmt_money(limit), category, fmt_money(total)
+					)
+				)
+
+	else:
+
+		def check(expense, period_totals):
+			if applies(expense) and expense.base_total > limit:
+				return violation(
+					_("Limit of {0} per expense for {1} exceeded.").format(fmt_money(limit), category)
+				)
+
+	return check
+
+
+def evaluate_expense(doc):
+	"""Evaluate the policy for an Expense being saved.
+
+	Period totals come from the counters, with this expense's previously
+	saved amount swapped for its current one.
+
+	Returns:
+		List of violation dicts
+	"""
+	policy = get_policy(doc.company)
+	if not policy.rules:
+		return []
+
+	current = _counter_contributions(doc)
+	before = doc.get_doc_before_save()
+	previous = _counter_contributions(before) if before and before.docstatus != 2 else {}
+	counters = _get_counters(list(current))
+
+	period_totals = {
+		key[2]: counters.get(key, 0) - previous.get(key, 0) + amount for key, amount in current.items()
+	}
+
+	expense = frappe._dict(
+		category=doc.category,
+		grade=_get_grades([doc.employee]).get(doc.employee),
+		base_total=money.to_decimal(doc.base_total),
+		attachment_count=len([row for row in doc.get("attachments") or [] if row.attachment]),
+	)
+
+	return policy.evaluate(expense, period_totals)
+
+
+def evaluate_expenses(expense_names):
+	"""Evaluate the policy for several saved expenses with a fixed number of queries.
+
+	Returns:
+		Dict of {expense name: [violations]} for expenses with violations
+	"""
+	if not expense_names:
+		return {}
+
+	expenses = frappe.get_all(
+		"Expense",
+		filters={"name": ("in", expense_names)},
+		fields=["name", "company", "employee", "category", "expense_date", "base_total"],
+	)
+
+	attachment_counts = dict(
+		frappe.db.sql(
+			"""
+			SELECT parent, COUNT(*) FROM `tabExpense Attachment`
+			WHERE parenttype = 'Expense' AND parent IN %s AND IFNULL(attachment, '') != ''
+			GROUP BY parent
+			""",
+			(tuple(expense_names),),
+		)
+	)
+
+	contributions = {expense.name: _counter_contributions(expense) for expense in expenses}
+	counters = _get_counters([key for keys in contributions.values() for key in keys])
+	grades = _get_grades([expense.employee for expense in expenses])
+
+	violations = {}
+	for expense in expenses:
+		policy = get_policy(expense.company)
+		if not policy.rules:
+			continue
+
+		# Saved expenses are already included in the counters
+		period_totals = {key[2]: counters.get(key, 0) for key in contributions[expense.name]}
+
+		expense.grade = grades.get(expense.employee)
+		expense.base_total = money.to_decimal(expense.base_total)
+		expense.attachment_count = attachment_counts.get(expense.name, 0)
+
+		found = policy.evaluate(expense, period_totals)
+		if found:
+			violations[expense.name] = found
+
+	return violations
+
+
+def get_blocking_messages(violations):
+	"""Flatten the blocking violations of evaluate_expenses() into messages."""
+	return [
+		_("Expense {0}: {1}").format(expense, violation["message"])
+		for expense, found in violations.items()
+		for violation in found
+		if violation["action"] == "Block"
+	]
+
+
+def update_counters(doc, removed=False):
+	"""Apply the change in an expense's amount to the period counters.
+
+	Args:
+		doc: Expense document after save, or being cancelled or deleted
+		removed: True when the expense no longer counts (cancel or delete)
+	"""
+	deltas = {}
+
+	if removed:
+		previous = _counter_contributions(doc)
+	else:
+		before = doc.get_doc_before_save()
+		previous = _counter_contributions(before) if before and before.docstatus != 2 else {}
+
+		for key, amount in _counter_contributions(doc).items():
+			deltas[key] = deltas.get(key, 0) + amount
+
+	for key, amount in previous.items():
+		deltas[key] = deltas.get(key, 0) - amount
+
+	timestamp = now_datetime()
+	for (employee, category, period, period_start), amount in deltas.items():
+		if not amount:
+			continue
+
+		frappe.db.sql(
+			"""
+			INSERT INTO `tabExpense Policy Counter`
+				(name, creation, modified, owner, modified_by, employee, category, period, period_start, amount)
+			VALUES (%(name)s, %(now)s, %(now)s, 'Administrator', 'Administrator',
+				%(employee)s, %(category)s, %(period)s, %(period_start)s, %(amount)s)
+			ON DUPLICATE KEY UPDATE amount = amount + VALUES(amount), modified = VALUES(modified)
+			""",
+			{
+				"name": _counter_name(employee, category, period, period_start),
+				"now": timestamp,
+				"employee": employee,
+				"category": category,
+				"period": period,
+				"period_start": period_start,
+				"amount": amount,
+			},
+		)
+
+
+def _counter_contributions(expense):
+	"""Return {counter key: amount} for the counters an expense adds to."""
+	if not expense or not expense.employee or not expense.category or not expense.expense_date:
+		return {}
+
+	amount = money.to_decimal(expense.base_total)
+	date = getdate(expense.expense_date)
+	starts = {"Daily": date, "Monthly": get_first_day(date)}
+
+	return {(expense.employee, expense.category, period, starts[period]): amount for period in COUNTER_PERIODS}
+
+
+def _get_counters(keys):
+	"""Load the current amounts of several counters in one query."""
+	if not keys:
+		return {}
+
+	names = {_counter_name(*key): key for key in keys}
+	rows = frappe.get_all(
+		"Expense Policy Counter", filters={"name": ("in", list(names))}, fields=["name", "amount"]
+	)
+
+	return {names[row.name]: money.to_decimal(row.amount) for row in rows}
+
+
+def _counter_name(employee, category, period, period_start):
+	return f"{employee}|{category}|{period}|{period_start}"
+
+
+def _get_grades(employees):
+	"""Map employees to their grade, if the Employee doctype has one."""
+	employees = list({employee for employee in employees if employee})
+	if not employees or not frappe.get_meta("Employee").has_field("grade"):
+		return {}
+
+	return dict(
+		frappe.get_all("Employee", filters={"name": ("in", employees)}, fields=["name", "grade"], as_list=True)
+	)
+
+
+def clear_policy_cache():
+	"""Drop cached rules so policies are recompiled on next use."""
+	frappe.cache.delete_value(CACHE_KEY)
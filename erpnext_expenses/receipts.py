@@ -0,0 +1,167 @@
+"""
+Report-level receipt checks.
+
+Expense.validate_attachments() checks an expense's receipts when the expense
+is saved, but a file can be deleted, or the limits tightened, before the
+expense is reported. check_expenses() checks the receipts of many expenses
+again at once: their attachment rows are read with one query and their files
+with one File query. Problems are collected for all of them instead of
+stopping at the first one, so the user can fix everything in one go.
+
+Whether an expense needs a receipt at all is an expense policy rule (see
+erpnext_expenses.policy); this only checks the receipts that are attached.
+"""
+
+import os
+
+import frappe
+from frappe import _
+
+from erpnext_expenses.erpnext_expenses.doctype.expense.expense import (
+	ALLOWED_EXTENSIONS,
+	MAX_ATTACHMENTS,
+	MAX_FILE_SIZE_MB,
+	MAX_TOTAL_SIZE_MB,
+)
+
+MB = 1024 * 1024
+
+
+def check_expenses(expense_names):
+	"""Check the attached receipts of several expenses.
+
+	Args:
+		expense_names: List of Expense names
+
+	Returns:
+		List of problem dicts with 'expense', 'idx' (the attachment row, or
+		None for the whole expense), 'file_name', 'reason' (one of 'missing',
+		'disallowed', 'oversized', 'too_many', 'total_size') and 'message'
+	"""
+	expense_names = [name for name in expense_names if name]
+	if not expense_names:
+		return []
+
+	attachments = frappe.get_all(
+		"Expense Attachment",
+		filters={"parenttype": "Expense", "parent": ("in", expense_names), "attachment": ("is", "set")},
+		fields=["parent", "idx", "attachment", "file_name"],
+		order_by="parent, idx",
+	)
+	if not attachments:
+		return []
+
+	files = _get_files(attachments)
+
+	attachments_by_expense = {}
+	for attachment in attachments:
+		attachments_by_expense.setdefault(attachment.parent, []).append(attachment)
+
+	problems = []
+	for expense in expense_names:
+		problems.extend(_check_expense(expense, attachments_by_expense.get(expense, []), files))
+
+	return problems
+
+
+def _get_files(attachments):
+	"""Return {(file url, expense): File row} for the attachments, with one query.
+
+	A URL can have several File records; the one attached to the expense is
+	preferred, any other is used under the key (file url, None).
+	"""
+	files = {}
+	for row in frappe.get_all(
+		"File",
+		filters={"file_url": ("in", list({attachment.attachment for attachment in attachments}))},
+		fields=["file_url", "file_name", "file_size", "attached_to_doctype", "attached_to_name"],
+	):
+		if row.attached_to_doctype == "Expense":
+			files[(row.file_url, row.attached_to_name)] = row
+		files.setdefault((row.file_url, None), row)
+
+	return files
+
+
+def _check_expense(expense, attachments, files):
+	problems = []
+
+	if len(attachments) > MAX_ATTACHMENTS:
+		problems.append(_problem(
+			expense, None, None, "too_many",
+			_("{0}: Maximum {1} attachments allowed per expense. It has {2}.").format(
+				expense, MAX_ATTACHMENTS, len(attachments)
+			),
+		))
+
+	total_size = 0
+	for attachment in attachments:
+		file = files.get((attachment.attachment, expense)) or files.get((attachment.attachment, None))
+		file_name = (file and file.file_name) or attachment.file_name or attachment.attachment.rsplit("/", 1)[-1]
+
+		if not file:
+			problems.append(_problem(
+				expense, attachment.idx, file_name, "missing",
+				_("{0}: Attachment #{1} ({2}) no longer exists.").format(expense, attachment.idx, file_name),
+			))
+			continue
+
+		extension = os.path.splitext(file_name)[1].lower().lstrip(".")
+		if extension not in ALLOWED_EXTENSIONS:
+			problems.append(_problem(
+				expense, attachment.idx, file_name, "disallowed",
+				_('{0}: Attachment #{1} ({2}): File type ".{3}" is not allowed.').format(
+					expense, attachment.idx, file_name, extension
+				),
+			))
+
+		file_size = file.file_size or 0
+		if file_size > MAX_FILE_SIZE_MB * MB:
+			problems.append(_problem(
+				expense, attachment.idx, file_name, "oversized",
+				_("{0}: Attachment #{1} ({2}) is {3}MB, above the maximum of {4}MB.").format(
+					expense, attachment.idx, file_name, f"{file_size / MB:.1f}", MAX_FILE_SIZE_MB
+				),
+			))
+
+		total_size += file_size
+
+	if total_size > MAX_TOTAL_SIZE_MB * MB:
+		problems.append(_problem(
+			expense, None, None, "total_size",
+			_("{0}: Attachments total {1}MB, above the maximum of {2}MB.").format(
+				expense, f"{total_size / MB:.1f}", MAX_TOTAL_SIZE_MB
+			),
+		))
+
+	return problems
+
+
+def _problem(expense, idx, file_name, reason, message):
+	return {"expense": expense, "idx": idx, "file_name": file_name, "reason": reason, "message": message}
+
+
+def validate_expenses(expense_names):
+	"""Throw one message listing every receipt problem of the expenses, if there are any."""
+	problems = check_expenses(expense_names)
+	if problems:
+		frappe.throw(
+			"<br>".join(problem["message"] for problem in problems),
+			title=_("Receipt Problems"),
+		)
+
+
+@frappe.whitelist()
+def check_report_receipts(report):
+	"""Return the receipt problems of every expense in an Expense Report."""
+	if not frappe.has_permission("Expense Report", "read", report):
+		frappe.throw(_("You do not have permission to access this expense report"), frappe.PermissionError)
+
+	return check_expenses(
+		frappe.get_all(
+			"Expense Detail",
+			filters={"parenttype": "Expense Report", "parent": report},
+			pluck="expense_id",
+			order_by="idx",
+		)
+	)
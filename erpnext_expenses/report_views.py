@@ -0,0 +1,144 @@
+"""
+Read-through cache for rendered Expense Report views.
+
+Submitted reports (Approved or Journals Created) change rarely but are opened
+and printed many times during review. Their rendered print HTML and detail
+data are cached in Redis under a key made of the report name, its `modified`
+timestamp and the view options, and served with an ETag so browsers can
+revalidate with If-None-Match.
+
+The `modified` timestamp of each cached report is itself kept in a Redis hash,
+so a repeat view needs no query to find its cache key. Anything that changes a
+submitted report must call clear_report_view_cache().
+
+The print HTML also depends on the Print Format, Letter Head and print and
+expense settings. A rendering version, renewed by their doc events (see
+hooks.py), is part of every ETag, so changing any of them invalidates all
+cached views at once.
+"""
+
+import hashlib
+
+import frappe
+from frappe.utils import cstr
+
+MODIFIED_KEY = "erpnext_expenses:report_view_modified"
+RENDER_VERSION_KEY = "erpnext_expenses:report_view_render_version"
+CONTENT_KEY = "erpnext_expenses:report_view"
+
+# Rendered views expire on their own after a day without being invalidated
+CONTENT_TTL = 24 * 60 * 60
+
+VIEWS = ("print", "detail")
+
+
+def get_report_version(report):
+	"""Return the `modified` timestamp of a submitted report, or None for drafts.
+
+	Only submitted reports are remembered in the cache; drafts change too
+	often to be worth it and are always rendered fresh.
+	"""
+	modified = frappe.cache.hget(MODIFIED_KEY, report)
+	if modified:
+		return modified
+
+	row = frappe.db.get_value("Expense Report", report, ["modified", "docstatus"], as_dict=True)
+	if not row or row.docstatus != 1:
+		return None
+
+	modified = cstr(row.modified)
+	frappe.cache.hset(MODIFIED_KEY, report, modified)
+
+	return modified
+
+
+def get_etag(report, modified, view, print_format=None):
+	"""Build the ETag (and cache key suffix) of one rendering of a report."""
+	parts = [report, modified, view, print_format or "", frappe.local.lang, get_render_version()]
+	return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def get_render_version():
+	"""Return the token that changes whenever something report renderings depend on changes."""
+	version = frappe.cache.get_value(RENDER_VERSION_KEY)
+	if not version:
+		version = frappe.generate_hash(length=10)
+		frappe.cache.set_value(RENDER_VERSION_KEY, version)
+
+	return version
+
+
+def clear_rendering_cache(doc=None, method=None):
+	"""Invalidate every cached view when a Print Format, Letter Head or settings change."""
+	frappe.cache.delete_value(RENDER_VERSION_KEY)
+
+
+def get_cached_view(etag, render):
+	"""Return a cached rendering, calling render() and caching it on a miss."""
+	key = f"{CONTENT_KEY}:{etag}"
+	content = frappe.cache.get_value(key)
+
+	if content is None:
+		content = render()
+		frappe.cache.set_value(key, content, expires_in_sec=CONTENT_TTL)
+
+	return content
+
+
+def render_detail(report):
+	"""Collect a report, its lines and their expenses with a fixed number of queries."""
+	doc = frappe.db.get_value(
+		"Expense Report",
+		report,
+		["name", "employee", "company", "paid_by", "paying_account", "workflow_state", "reimbursement_batch"],
+		as_dict=True,
+	)
+
+	lines = frappe.get_all(
+		"Expense Detail",
+		filters={"parent": report, "parenttype": "Expense Report"},
+		fields=["idx", "expense_id", "expense_date", "category", "description", "subtotal", "currency",
+			"exchange_rate", "base_subtotal"],
+		order_by="idx asc",
+	)
+
+	expense_ids = [line.expense_id for line in lines]
+	expenses = {
+		row.name: row
+		for row in frappe.get_all(
+			"Expense",
+			filters={"name": ("in", expense_ids)},
+			fields=["name", "employee", "paid_by", "expense_description"],
+		)
+	} if expense_ids else {}
+
+	attachments = {}
+	if expense_ids:
+		for row in frappe.get_all(
+			"Expense Attachment",
+			filters={"parent": ("in", expense_ids), "parenttype": "Expense"},
+			fields=["parent", "attachment"],
+			order_by="idx asc",
+		):
+			if row.attachment:
+				attachments.setdefault(row.parent, []).append(row.attachment)
+
+	for line in lines:
+		line.expense = expenses.get(line.expense_id)
+		line.attachments = attachments.get(line.expense_id, [])
+
+	doc.lines = lines
+
+	return frappe.as_json(doc)
+
+
+def clear_report_view_cache(reports=None):
+	"""Forget the cached versions of some or all reports.
+
+	Rendered content does not need deleting: it is keyed by `modified` and
+	expires on its own.
+	"""
+	if reports is None:
+		frappe.cache.delete_value(MODIFIED_KEY)
+	elif reports:
+		frappe.cache.hdel(MODIFIED_KEY, list(reports))
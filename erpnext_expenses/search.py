@@ -0,0 +1,152 @@
+"""
+Full-text search over expenses.
+
+On MariaDB, Expense (description and notes) and Expense Detail (description)
+have FULLTEXT indexes, added by their doctypes' on_doctype_update hooks, and
+search_expenses() ranks matches with MATCH ... AGAINST instead of scanning
+with LIKE '%...%'. Every word must match, as a prefix. Words shorter than the
+index's minimum token size, and databases without FULLTEXT support, fall back
+to LIKE.
+"""
+
+import re
+
+import frappe
+from frappe.desk.reportview import build_match_conditions
+from frappe.utils import cint
+
+EXPENSE_INDEX = "expense_description_fulltext"
+EXPENSE_DETAIL_INDEX = "expense_detail_description_fulltext"
+
+# InnoDB's default innodb_ft_min_token_size
+MIN_TOKEN_SIZE = 3
+
+MAX_PAGE_LENGTH = 100
+
+
+def add_fulltext_index(table, index_name, columns):
+	"""Add a FULLTEXT index on MariaDB if it does not exist yet."""
+	if frappe.db.db_type != "mariadb" or frappe.db.has_index(table, index_name):
+		return
+
+	frappe.db.sql_ddl(
+		"ALTER TABLE `{0}` ADD FULLTEXT INDEX `{1}` ({2})".format(
+			table, index_name, ", ".join(f"`{column}`" for column in columns)
+		)
+	)
+
+
+@frappe.whitelist()
+def search_expenses(
+	query, employee=None, company=None, from_date=None, to_date=None, category=None, start=0, page_length=20
+):
+	"""Search expenses by the words in their description, notes or report line descriptions.
+
+	Args:
+		query: Words to search for
+		employee, company, category: Optional exact filters
+		from_date, to_date: Optional expense date range
+		start, page_length: Paging
+
+	Returns:
+		List of expenses, best matches first, each with a relevance 'score'
+	"""
+	frappe.has_permission("Expense", "read", throw=True)
+
+	terms = _get_terms(query)
+	if not terms:
+		return []
+
+	values = {
+		"start": cint(start),
+		"page_length": min(cint(page_length) or 20, MAX_PAGE_LENGTH),
+	}
+
+	conditions = ["`tabExpense`.docstatus != 2"]
+	for fieldname, value in (("employee", employee), ("company", company), ("category", category)):
+		if value:
+			conditions.append(f"`tabExpense`.{fieldname} = %({fieldname})s")
+			values[fieldname] = value
+
+	if from_date:
+		conditions.append("`tabExpense`.expense_date >= %(from_date)s")
+		values["from_date"] = from_date
+
+	if to_date:
+		conditions.append("`tabExpense`.expense_date <= %(to_date)s")
+		values["to_date"] = to_date
+
+	match_conditions = build_match_conditions("Expense")
+	if match_conditions:
+		conditions.append(f"({match_conditions})")
+
+	if frappe.db.db_type == "mariadb" and all(len(term) >= MIN_TOKEN_SIZE for term in terms):
+		values["query"] = " ".join(f"+{term}*" for term in terms)
+		return frappe.db.sql(get_fulltext_query(conditions), values, as_dict=True)
+
+	# No FULLTEXT support or words too short for the index
+	like = []
+	for index, term in enumerate(terms):
+		values[f"term{index}"] = f"%{term}%"
+		like.append(f"""(
+			`tabExpense`.expense_description LIKE %(term{index})s
+			OR `tabExpense`.notes LIKE %(term{index})s
+			OR EXISTS (
+				SELECT 1 FROM `tabExpense Detail` ed
+				WHERE ed.expense_id = `tabExpense`.name AND ed.description LIKE %(term{index})s
+			)
+		)""")
+
+	return frappe.db.sql(f"""
+		SELECT `tabExpense`.name, `tabExpense`.expense_description, `tabExpense`.expense_date,
+			`tabExpense`.employee, `tabExpense`.employee_name, `tabExpense`.company,
+			`tabExpense`.category, `tabExpense`.total, `tabExpense`.currency, `tabExpense`.docstatus,
+			0 AS score
+		FROM `tabExpense`
+		WHERE {" AND ".join(like + conditions)}
+		ORDER BY `tabExpense`.expense_date DESC
+		LIMIT %(page_length)s OFFSET %(start)s
+	""", values, as_dict=True)
+
+
+def get_fulltext_query(conditions):
+	"""Return the ranked FULLTEXT search query, filtered by the given conditions on `tabExpense`.
+
+	The candidates are the union of two selects each driven by its own FULLTEXT
+	index, one on Expense and one on Expense Detail mapped to its expense, so
+	MariaDB never scans the tables. Only that small id set is joined back to
+	Expense for the filters and the ranking: an OR between the two MATCHes in
+	one WHERE clause would rule the indexes out.
+	"""
+	expense_match = "MATCH(expense_description, notes) AGAINST (%(query)s IN BOOLEAN MODE)"
+	detail_match = "MATCH(description) AGAINST (%(query)s IN BOOLEAN MODE)"
+
+	return f"""
+		SELECT `tabExpense`.name, `tabExpense`.expense_description, `tabExpense`.expense_date,
+			`tabExpense`.employee, `tabExpense`.employee_name, `tabExpense`.company,
+			`tabExpense`.category, `tabExpense`.total, `tabExpense`.currency, `tabExpense`.docstatus,
+			matches.score
+		FROM (
+			SELECT expense_id, SUM(score) AS score
+			FROM (
+				SELECT name AS expense_id, {expense_match} AS score
+				FROM `tabExpense`
+				WHERE {expense_match}
+				UNION ALL
+				SELECT expense_id, MAX({detail_match}) AS score
+				FROM `tabExpense Detail`
+				WHERE {detail_match} AND parenttype = 'Expense Report'
+				GROUP BY expense_id
+			) candidates
+			GROUP BY expense_id
+		) matches
+		INNER JOIN `tabExpense` ON `tabExpense`.name = matches.expense_id
+		WHERE {" AND ".join(conditions)}
+		ORDER BY matches.score DESC, `tabExpense`.expense_date DESC
+		LIMIT %(start)s, %(page_length)s
+	"""
+
+
+def _get_terms(query):
+	"""Split a query into words, dropping full-text operators."""
+	return [term for term in re.split(r"[\s+\-<>()~*\"@%_]+", query or "") if term][:10]
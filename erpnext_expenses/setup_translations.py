@@ -1,25 +1,38 @@
 """
-DEPRECATED: Translations are now managed centrally by rustic_translator.
-See rustic_translator/rustic_translator/setup_translations.py and
-rustic_translator/rustic_translator/translations/ar.csv
+Arabic translations for the Expense Management system.
 
-This file is kept as a reference. The after_migrate hook has been
-disabled in hooks.py. Do NOT re-enable it — doing so would create
-duplicate Translation DocType entries.
+TRANSLATIONS is the source. It is compiled into `translations/ar.csv`, which
+Frappe reads into its translation cache together with every other app's
+bundle, so the strings need no database rows to be translated:
 
---- Original description ---
-Centralized Arabic translations for the Expense Management system.
+    bench --site <site> execute erpnext_expenses.setup_translations.compile_translations
 
-Translations are inserted into the Translation DocType (Frappe's global translation system)
-so both erpnext_expenses and POSNext pick them up via get_all_translations("ar").
+POSNext and older installs also read these strings from the Translation
+DocType, where duplicates were left behind by the previous per-string
+inserts. sync_translations() brings those rows in line with the bundle in one
+pass: it fetches the existing rows with one query, then deletes duplicates,
+updates changed rows and inserts missing ones in bulk. It runs after migrate,
+but only when the bundle's hash differs from the last synced one, and warms
+the cache for get_all_translations("ar") afterwards.
 """
 
+import csv
+import hashlib
+import os
+
 import frappe
+from frappe.translate import clear_cache, get_all_translations
+from frappe.utils import now_datetime
+
+LANGUAGE = "ar"
 
+# Global default holding the hash of the last synced bundle
+HASH_KEY = "erpnext_expenses_translations_hash"
 
-# All Arabic translations for expense-related strings across both apps.
-# Includes common terms to ensure they survive Frappe/ERPNext updates
-# (rustic_translator edits core CSVs which get overwritten on update).
+# Arabic translations of the strings of this app and POSNext's expense screens.
+# Only strings these apps define belong here: translations are global, so a
+# generic Frappe/ERPNext string such as "Save" or "Submitted" would change
+# its translation everywhere on the site.
 TRANSLATIONS = {
     # ── erpnext_expenses: Python (expense.py) ──
     "Expenses must be submitted via an Expense Report. "
@@ -31,7 +44,6 @@ TRANSLATIONS = {
         "حدث خطأ أثناء إنشاء تقرير المصروفات",
     "You can only create expenses for your own employee record.":
         "يمكنك فقط إنشاء مصروفات لسجل الموظف الخاص بك.",
-    "Permission Denied": "تم رفض الإذن",
     "Maximum {0} attachments allowed per expense. You have {1}.":
         "الحد الأقصى {0} مرفقات مسموح بها لكل مصروف. لديك {1}.",
     "Too Many Attachments": "عدد المرفقات كثير جداً",
@@ -80,7 +92,6 @@ TRANSLATIONS = {
     # ── erpnext_expenses: JS (expense.js) ──
     "Create Report": "إنشاء تقرير",
     "Creating Expense Report...": "جارٍ إنشاء تقرير المصروفات...",
-    "Error": "خطأ",
     "An error was encountered. Please see the error logs for details.":
         "حدث خطأ. يرجى مراجعة سجلات الأخطاء للتفاصيل.",
     "The expense date cannot be in the future.": "لا يمكن أن يكون تاريخ المصروف في المستقبل.",
@@ -97,7 +108,6 @@ TRANSLATIONS = {
     "Attachment #{0}: File type \".{1}\" is not allowed.":
         "المرفق #{0}: نوع الملف \".{1}\" غير مسموح.",
     "View Attachments": "عرض المرفقات",
-    "Open in New Tab": "فتح في تبويب جديد",
     "No attachments found.": "لم يتم العثور على مرفقات.",
     "Attachments ({0})": "المرفقات ({0})",
     "Invoice Attachments ({0}/{1})": "مرفقات الفاتورة ({0}/{1})",
@@ -110,7 +120,6 @@ TRANSLATIONS = {
     "Create Journal Entries": "إنشاء القيود المحاسبية",
     "Please provide the paying account!": "يرجى تحديد حساب الدفع!",
     "Creating Journal Entry...": "جارٍ إنشاء القيد المحاسبي...",
-    "Success": "تم بنجاح",
     "Journal Entry {0} created successfully.": "تم إنشاء القيد المحاسبي {0} بنجاح.",
     "Failed to create journal entry. Check error logs for details.":
         "فشل إنشاء القيد المحاسبي. تحقق من سجلات الأخطاء للتفاصيل.",
@@ -142,15 +151,12 @@ TRANSLATIONS = {
 
     # ── POSNext: Vue (ExpenseManagement.vue) ──
     "Expense Management": "إدارة المصروفات",
-    "Refresh": "تحديث",
     "You are offline": "أنت غير متصل",
     "Expenses will sync when you reconnect.":
         "سيتم مزامنة المصروفات عند إعادة الاتصال.",
     "No Employee Record Found": "لم يتم العثور على سجل موظف",
     "Your user account must be linked to an active Employee record to manage expenses.":
         "يجب ربط حساب المستخدم الخاص بك بسجل موظف نشط لإدارة المصروفات.",
-    "Tabs": "علامات التبويب",
-    "Loading...": "جارٍ التحميل...",
     "All ({0})": "الكل ({0})",
     "Draft ({0})": "مسودة ({0})",
     "Submitted ({0})": "مُقدَّمة ({0})",
@@ -165,7 +171,6 @@ TRANSLATIONS = {
     "Create reports from your draft expenses.":
         "أنشئ تقارير من مصروفاتك المسودة.",
     "({0}) expenses waiting to sync": "({0}) مصروفات في انتظار المزامنة",
-    "Syncing...": "جارٍ المزامنة...",
     "Sync Now": "مزامنة الآن",
     "Connect to the internet to sync expenses.":
         "اتصل بالإنترنت لمزامنة المصروفات.",
@@ -191,28 +196,16 @@ TRANSLATIONS = {
     "Sync failed": "فشلت المزامنة",
     "Workflow actions require an internet connection":
         "إجراءات سير العمل تتطلب اتصالاً بالإنترنت",
-    "{0}: {1}": "{0}: {1}",
     "Failed to apply action": "فشل تطبيق الإجراء",
 
     # ── POSNext: Vue (ExpenseFormDialog.vue) ──
     "Edit Expense": "تعديل المصروف",
     "New Expense": "مصروف جديد",
-    "Description": "الوصف",
     "What is this expense for?": "ما الغرض من هذا المصروف؟",
-    "Category": "الفئة",
     "Select Category": "اختر الفئة",
-    "Amount": "المبلغ",
-    "Paid By": "مدفوع بواسطة",
-    "Date": "التاريخ",
-    "Notes": "ملاحظات",
     "Additional notes...": "ملاحظات إضافية...",
-    "Attachments": "المرفقات",
     "max {0} files, {1}MB each": "الحد الأقصى {0} ملفات، {1} ميجابايت لكل ملف",
-    "Uploading...": "جارٍ الرفع...",
     "Add Receipt / Attachment": "إضافة إيصال / مرفق",
-    "Cancel": "إلغاء",
-    "Saving...": "جارٍ الحفظ...",
-    "Save": "حفظ",
     "Maximum {0} attachments allowed": "الحد الأقصى {0} مرفقات مسموح بها",
     "File type .{0} is not allowed. Allowed: {1}":
         "نوع الملف .{0} غير مسموح. المسموح: {1}",
@@ -221,103 +214,139 @@ TRANSLATIONS = {
         "إجمالي حجم المرفقات يتجاوز حد {0} ميجابايت",
     "Failed to upload {0}: {1}": "فشل رفع {0}: {1}",
 
-    # ── POSNext: Vue (ExpenseCard.vue) ──
-    "Edit": "تعديل",
-    "Delete": "حذف",
-    "Draft": "مسودة",
-    "Submitted": "مُعتمد",
-    "Cancelled": "ملغي",
-
     # ── POSNext: Vue (ExpenseReportCard.vue) ──
-    "Manager": "المدير",
-    "Finance": "المالية",
-    "Approved": "مُعتمد",
-    "Complete": "مكتمل",
-    "Rejected": "مرفوض",
     "Submit to Manager": "تقديم للمدير",
-    "Recall": "استرجاع",
-    "Revise": "مراجعة",
 
-    # ── Common / Shared strings ──
+    # ── DocType names ──
     "Expense": "مصروف",
     "Expense Report": "تقرير المصروفات",
     "Expense Category": "فئة المصروفات",
     "Expense Taxes": "ضرائب المصروفات",
-    "Employee": "موظف",
-    "Company": "شركة",
 
     # ── DocType field labels ──
     "Expense Description": "وصف المصروف",
     "Expense Date": "تاريخ المصروف",
-    "Total": "الإجمالي",
-    "Employee Name": "اسم الموظف",
     "Paid by": "مدفوع بواسطة",
     "Paying Account": "حساب الدفع",
-    "Amended From": "معدّل من",
-    "Invoice Attachments": "مرفقات الفاتورة",
     "Expense Splitting": "تقسيم المصروف",
     "Split Total": "إجمالي التقسيم",
-    "Expenses": "المصروفات",
 
     # ── Select field options ──
     "Employee (to reimburse)": "موظف (للتعويض)",
 }
 
 
-def setup_translations():
-    """Insert or update Arabic translations in Frappe's Translation DocType.
+def get_bundle_path():
+    return frappe.get_app_path("erpnext_expenses", "translations", f"{LANGUAGE}.csv")
+
+
+def compile_translations():
+    """Write TRANSLATIONS into the app's translation bundle, sorted for stable diffs."""
+    os.makedirs(os.path.dirname(get_bundle_path()), exist_ok=True)
+
+    with open(get_bundle_path(), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        for source_text in sorted(TRANSLATIONS):
+            writer.writerow([source_text, TRANSLATIONS[source_text]])
+
 
-    Called via after_migrate hook. Both erpnext_expenses and POSNext
-    read from the same Translation table via get_all_translations("ar").
+def load_bundle():
+    """Return {source text: translated text} from the app's translation bundle."""
+    with open(get_bundle_path(), encoding="utf-8", newline="") as f:
+        return {row[0]: row[1] for row in csv.reader(f) if len(row) >= 2 and row[0]}
 
-    Handles duplicate cleanup: rustic_translator imports from CSV can create
-    duplicate Translation entries for the same source_text. This function
-    deletes all duplicates and ensures exactly one entry per source_text.
+
+def sync_translations(force=False):
+    """Bring the Translation rows in line with the bundle if it changed since the last sync.
+
+    Args:
+        force: Sync even if the bundle's hash is unchanged
     """
-    count_new = 0
-    count_updated = 0
-    count_deduped = 0
+    path = get_bundle_path()
+    if not os.path.exists(path):
+        return
 
-    for source_text, translated_text in TRANSLATIONS.items():
-        # Find ALL matching entries (not just one) to handle duplicates
-        all_entries = frappe.get_all(
-            "Translation",
-            filters={"language": "ar", "source_text": source_text},
-            fields=["name", "translated_text"],
-            order_by="modified desc",
-        )
+    with open(path, "rb") as f:
+        bundle_hash = hashlib.sha256(f.read()).hexdigest()
+
+    if not force and frappe.db.get_global(HASH_KEY) == bundle_hash:
+        return
+
+    translations = load_bundle()
+    count_new, count_updated, count_deduped = upsert_translations(translations)
+
+    frappe.db.set_global(HASH_KEY, bundle_hash)
+    frappe.db.commit()
 
-        if len(all_entries) > 1:
-            # Delete all duplicates, keep none (we'll update or re-insert below)
-            for entry in all_entries[1:]:
-                frappe.delete_doc("Translation", entry.name, force=True)
-                count_deduped += 1
-
-        if all_entries:
-            # Update the remaining entry if translation differs
-            keeper = all_entries[0]
-            if keeper.translated_text != translated_text:
-                frappe.db.set_value(
-                    "Translation", keeper.name, "translated_text", translated_text
-                )
-                count_updated += 1
+    # Drop the stale cache and build it again now, rather than on the first request
+    clear_cache()
+    get_all_translations(LANGUAGE)
+
+    frappe.logger("erpnext_expenses").info(
+        f"Expense translations: {count_new} new, {count_updated} updated, "
+        f"{count_deduped} duplicates removed "
+        f"(total {len(translations)} entries)"
+    )
+
+
+def upsert_translations(translations):
+    """Keep exactly one Translation row per source text, holding the bundle's translation.
+
+    Returns:
+        Tuple of (inserted, updated, duplicates deleted) counts
+    """
+    if not translations:
+        return 0, 0, 0
+
+    existing = frappe.get_all(
+        "Translation",
+        filters={
+            "language": LANGUAGE,
+            "source_text": ("in", list(translations)),
+            "context": ("is", "not set"),
+        },
+        fields=["name", "source_text", "translated_text"],
+        order_by="modified desc",
+    )
+
+    keepers = {}
+    duplicates = []
+    for row in existing:
+        # The database compares case-insensitively; only exact matches are ours
+        if row.source_text not in translations:
+            continue
+
+        if row.source_text in keepers:
+            duplicates.append(row.name)
         else:
-            doc = frappe.get_doc({
-                "doctype": "Translation",
-                "language": "ar",
-                "source_text": source_text,
-                "translated_text": translated_text,
-            })
-            doc.insert(ignore_permissions=True)
-            count_new += 1
-
-    if count_new or count_updated or count_deduped:
-        frappe.db.commit()
-        # Clear translation cache so changes take effect immediately
-        frappe.cache.delete_key("translations")
-        frappe.cache.delete_key("lang_user_translations")
-        print(
-            f"Expense translations: {count_new} new, {count_updated} updated, "
-            f"{count_deduped} duplicates removed "
-            f"(total {len(TRANSLATIONS)} entries)"
+            keepers[row.source_text] = row
+
+    updates = {
+        row.name: {"translated_text": translations[source_text]}
+        for source_text, row in keepers.items()
+        if row.translated_text != translations[source_text]
+    }
+
+    now = now_datetime()
+    inserts = [
+        (frappe.generate_hash(length=10), now, now, frappe.session.user, frappe.session.user,
+            LANGUAGE, source_text, translated_text)
+        for source_text, translated_text in translations.items()
+        if source_text not in keepers
+    ]
+
+    if duplicates:
+        frappe.db.delete("Translation", {"name": ("in", duplicates)})
+
+    if updates:
+        frappe.db.bulk_update("Translation", updates)
+
+    if inserts:
+        frappe.db.bulk_insert(
+            "Translation",
+            fields=["name", "creation", "modified", "owner", "modified_by",
+                "language", "source_text", "translated_text"],
+            values=inserts,
         )
+
+    return len(inserts), len(updates), len(duplicates)
@@ -0,0 +1,122 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+from datetime import date
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses import archive
+from erpnext_expenses.tests.test_journal_golden import bulk_insert
+
+
+class TestGetTable(FrappeTestCase):
+	def get_table(self, archived_until, doctype="Expense", from_date=None):
+		with patch.object(frappe.db, "get_single_value", return_value=archived_until):
+			return archive.get_table(doctype, from_date)
+
+	def test_live_table_until_anything_is_archived(self):
+		self.assertEqual(self.get_table(None), "`tabExpense`")
+		self.assertEqual(self.get_table(None, from_date="2020-01-01"), "`tabExpense`")
+
+	def test_history_view_for_archived_dates(self):
+		self.assertEqual(self.get_table("2026-01-31"), "`__ExpenseHistory`")
+		self.assertEqual(self.get_table("2026-01-31", from_date="2026-01-31"), "`__ExpenseHistory`")
+		self.assertEqual(self.get_table("2026-01-31", from_date="2026-02-01"), "`tabExpense`")
+		self.assertEqual(
+			self.get_table("2026-01-31", doctype="Expense Detail", from_date="2026-01-01"),
+			"`__ExpenseDetailHistory`",
+		)
+
+	def test_other_doctypes_use_live_table(self):
+		self.assertEqual(self.get_table("2026-01-31", doctype="Expense Category"), "`tabExpense Category`")
+
+
+class TestArchiveReports(FrappeTestCase):
+	"""Move stored reports into the archive tables of the test site's database."""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+
+		cls.company = frappe.db.get_value("Company", {}, "name") if frappe.db.db_type == "mariadb" else None
+		if cls.company:
+			# DDL commits, so the tables are created before any test row is inserted
+			archive.ensure_archive_tables()
+
+	def setUp(self):
+		if not self.company:
+			self.skipTest("Archiving needs MariaDB and a Company on the test site")
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def store_report(self, report, workflow_state, expense_date):
+		"""Insert a submitted report holding one expense with an attachment."""
+		expense = f"{report} Expense"
+
+		bulk_insert("Expense", ["docstatus", "company", "total", "expense_date"], [
+			(expense, 1, self.company, 100, expense_date)
+		])
+		bulk_insert("Expense Attachment", ["parent", "parenttype", "parentfield", "idx"], [
+			(frappe.generate_hash(length=12), expense, "Expense", "attachments", 1)
+		])
+		bulk_insert("Expense Report", ["docstatus", "company", "workflow_state"], [
+			(report, 1, self.company, workflow_state)
+		])
+		bulk_insert("Expense Detail", ["parent", "parenttype", "parentfield", "idx", "expense_id", "expense_date"], [
+			(frappe.generate_hash(length=12), report, "Expense Report", "expense", 1, expense, expense_date)
+		])
+
+		return expense
+
+	def count_archived(self, table, name, parent=False):
+		column = "parent" if parent else "name"
+		return frappe.db.sql(
+			f"SELECT COUNT(*) FROM `{archive.ARCHIVE_TABLES[table]}` WHERE {column} = %s", (name,)
+		)[0][0]
+
+	def test_archive_posted_reports(self):
+		posted_expense = self.store_report("_Test Archive Posted", "Journals Created", "2026-01-31")
+		pending_expense = self.store_report("_Test Archive Pending", "Approved", "2026-02-15")
+
+		latest = archive._archive_reports(["_Test Archive Posted", "_Test Archive Pending"])
+
+		self.assertEqual(latest, date(2026, 1, 31))
+
+		self.assertFalse(frappe.db.exists("Expense Report", "_Test Archive Posted"))
+		self.assertFalse(frappe.db.exists("Expense", posted_expense))
+		self.assertEqual(self.count_archived("tabExpense Report", "_Test Archive Posted"), 1)
+		self.assertEqual(self.count_archived("tabExpense Detail", "_Test Archive Posted", parent=True), 1)
+		self.assertEqual(self.count_archived("tabExpense", posted_expense), 1)
+		self.assertEqual(self.count_archived("tabExpense Attachment", posted_expense, parent=True), 1)
+
+		# Not posted yet: left in the live tables
+		self.assertTrue(frappe.db.exists("Expense Report", "_Test Archive Pending"))
+		self.assertTrue(frappe.db.exists("Expense", pending_expense))
+		self.assertEqual(self.count_archived("tabExpense Report", "_Test Archive Pending"), 0)
+
+	def test_read_archived_report(self):
+		expense = self.store_report("_Test Archive Posted", "Journals Created", "2026-01-31")
+		archive._set_archived_until(archive._archive_reports(["_Test Archive Posted"]))
+
+		self.assertTrue(archive.is_archived("Expense Report", "_Test Archive Posted"))
+
+		report = archive.get_report("_Test Archive Posted")
+		self.assertEqual(report.archived, 1)
+		self.assertEqual([line.expense_id for line in report.expense], [expense])
+
+		self.assertEqual(len(archive.get_expense(expense).attachments), 1)
+
+		history = frappe.db.sql(
+			f"SELECT name FROM {archive.get_table('Expense', '2026-01-01')} WHERE name = %s", (expense,)
+		)
+		self.assertEqual(len(history), 1)
+
+	def test_block_cancelling_archived_journal(self):
+		self.store_report("_Test Archive Posted", "Journals Created", "2026-01-31")
+		archive._set_archived_until(archive._archive_reports(["_Test Archive Posted"]))
+
+		journal_entry = frappe._dict(name="ACC-JV-TEST", remark="Expense Report: _Test Archive Posted")
+		self.assertRaises(frappe.ValidationError, archive.validate_journal_entry_cancel, journal_entry)
@@ -0,0 +1,104 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+import random
+import time
+from datetime import date, timedelta
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses.card_matching import build_index, match_lines, parse_statement
+
+SEED = 20261019
+
+# Seconds the in-memory matching of a 50,000 line statement may take
+MAX_MATCH_SECONDS = 5
+
+
+def make_expense(name, employee, total, expense_date, currency="USD"):
+	return frappe._dict(name=name, employee=employee, currency=currency, total=total, expense_date=expense_date)
+
+
+def make_line(name, employee, amount, transaction_date, currency="USD"):
+	return frappe._dict(
+		name=name, employee=employee, currency=currency, amount=amount, transaction_date=transaction_date
+	)
+
+
+class TestCardMatching(FrappeTestCase):
+	def test_parse_statement(self):
+		lines = parse_statement(
+			"Date,Employee,Amount,Merchant,Currency\n"
+			"2026-09-01,EMP-0001,\"1,250.50\",Hotel,EUR\n"
+			",,,,\n"
+			"2026-09-02,EMP-0002,-20,Refund,\n",
+			"USD",
+		)
+
+		self.assertEqual(len(lines), 2)
+		self.assertEqual(lines[0]["transaction_date"], date(2026, 9, 1))
+		self.assertEqual(lines[0]["amount"], 1250.5)
+		self.assertEqual(lines[0]["currency"], "EUR")
+		self.assertEqual(lines[0]["description"], "Hotel")
+		self.assertEqual(lines[1]["currency"], "USD")
+		self.assertEqual(lines[1]["amount"], -20)
+
+	def test_parse_statement_requires_columns(self):
+		self.assertRaises(frappe.ValidationError, parse_statement, "Date,Amount\n2026-09-01,10\n", "USD")
+
+	def test_match_closest_date_within_window(self):
+		index = build_index([
+			make_expense("EXP-1", "EMP-1", 100, date(2026, 9, 1)),
+			make_expense("EXP-2", "EMP-1", 100, date(2026, 9, 9)),
+			make_expense("EXP-3", "EMP-1", 100, date(2026, 9, 20)),
+			make_expense("EXP-4", "EMP-2", 100, date(2026, 9, 10)),
+			make_expense("EXP-5", "EMP-1", 100, date(2026, 9, 10), currency="EUR"),
+		], 2)
+
+		matches = match_lines([
+			make_line("L-1", "EMP-1", 100, date(2026, 9, 10)),
+			make_line("L-2", "EMP-1", 100.004, date(2026, 9, 10)),
+			make_line("L-3", "EMP-1", 100, date(2026, 9, 16)),
+			make_line("L-4", "EMP-1", 99.99, date(2026, 9, 1)),
+		], index, 3, 2)
+
+		# L-2 rounds to the same amount but EXP-2 is taken; EXP-3 is out of L-3's window
+		self.assertEqual(matches, {"L-1": "EXP-2"})
+
+	def test_each_expense_matches_once(self):
+		index = build_index([make_expense("EXP-1", "EMP-1", 50, date(2026, 9, 5))], 2)
+		matches = match_lines([
+			make_line("L-1", "EMP-1", 50, date(2026, 9, 4)),
+			make_line("L-2", "EMP-1", 50, date(2026, 9, 5)),
+		], index, 3, 2)
+
+		self.assertEqual(matches, {"L-1": "EXP-1"})
+
+	def test_match_50k_lines(self):
+		rng = random.Random(SEED)
+		start_date = date(2026, 9, 1)
+		employees = [f"EMP-{index:04d}" for index in range(500)]
+
+		lines = []
+		expenses = []
+		for index in range(50_000):
+			employee = rng.choice(employees)
+			amount = rng.randint(100, 50_000) / 100
+			transaction_date = start_date + timedelta(days=rng.randint(0, 29))
+			lines.append(make_line(f"L-{index:05d}", employee, amount, transaction_date))
+
+			# Nine in ten lines have an expense, entered up to two days off
+			if index % 10:
+				expense_date = transaction_date + timedelta(days=rng.randint(-2, 2))
+				expenses.append(make_expense(f"EXP-{index:05d}", employee, amount, expense_date))
+
+		lines.sort(key=lambda line: (line.transaction_date, line.name))
+
+		started = time.perf_counter()
+		matches = match_lines(lines, build_index(expenses, 2), 3, 2)
+		seconds = time.perf_counter() - started
+
+		self.assertGreaterEqual(len(matches), len(expenses) * 0.99)
+		self.assertEqual(len(set(matches.values())), len(matches))
+		self.assertLess(seconds, MAX_MATCH_SECONDS)
@@ -0,0 +1,76 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+import json
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses import fixture_sync, hooks
+
+FIXTURES_PATH = os.path.join(os.path.dirname(hooks.__file__), "synced_fixtures")
+
+
+class TestFixtureSync(FrappeTestCase):
+	def test_every_hashed_fixture_has_a_file(self):
+		for spec in hooks.hashed_fixtures:
+			doctype = spec if isinstance(spec, str) else spec["dt"]
+			with self.subTest(doctype=doctype):
+				self.assertTrue(os.path.exists(os.path.join(FIXTURES_PATH, f"{frappe.scrub(doctype)}.json")))
+
+	def test_every_fixture_file_is_synced(self):
+		synced = {frappe.scrub(spec if isinstance(spec, str) else spec["dt"]) for spec in hooks.hashed_fixtures}
+		for file_name in os.listdir(FIXTURES_PATH):
+			with self.subTest(file_name=file_name):
+				self.assertIn(file_name.removesuffix(".json"), synced)
+
+	def test_restore_deleted_record(self):
+		fixtures_dir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, fixtures_dir)
+		with open(os.path.join(fixtures_dir, "workflow_state.json"), "w") as f:
+			json.dump([
+				{"doctype": "Workflow State", "name": "_Test Pending", "style": "Warning"},
+				{"doctype": "Workflow State", "name": "_Test Done", "style": "Success"},
+			], f)
+
+		# Records on the site, and the globals holding the hashes
+		site = set()
+		globals_ = {}
+
+		def get_all(doctype, filters, pluck):
+			return [name for name in filters["name"][1] if name in site]
+
+		def import_doc(doc, **kwargs):
+			site.add(doc["name"])
+			imported.append(doc["name"])
+
+		with ExitStack() as stack:
+			stack.enter_context(patch.object(fixture_sync, "get_fixture_specs", return_value=[{"dt": "Workflow State"}]))
+			stack.enter_context(patch.object(
+				fixture_sync, "get_fixtures_path", lambda *parts: os.path.join(fixtures_dir, *parts)
+			))
+			stack.enter_context(patch.object(fixture_sync, "import_doc", import_doc))
+			stack.enter_context(patch.object(frappe, "get_all", get_all))
+			stack.enter_context(patch.object(frappe.db, "get_global", globals_.get))
+			stack.enter_context(patch.object(frappe.db, "set_global", globals_.__setitem__))
+			stack.enter_context(patch.object(frappe.db, "commit"))
+
+			imported = []
+			fixture_sync.sync_fixtures()
+			self.assertEqual(imported, ["_Test Pending", "_Test Done"])
+
+			# Unchanged and all present: nothing is imported
+			imported = []
+			fixture_sync.sync_fixtures()
+			self.assertEqual(imported, [])
+
+			# Deleted from the site: only that record is imported again
+			site.discard("_Test Done")
+			imported = []
+			fixture_sync.sync_fixtures()
+			self.assertEqual(imported, ["_Test Done"])
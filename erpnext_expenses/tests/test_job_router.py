@@ -0,0 +1,130 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses import job_router
+
+
+class Callbacks:
+	"""Stands in for frappe.db.after_commit and after_rollback."""
+
+	def __init__(self):
+		self.functions = []
+
+	def add(self, function):
+		self.functions.append(function)
+
+	def run(self):
+		functions, self.functions = self.functions, []
+		for function in functions:
+			function()
+
+
+class FakeCache:
+	"""The Redis calls the router makes, on dicts."""
+
+	def __init__(self):
+		self.lists = {}
+		self.sets = {}
+		self.hashes = {}
+
+	def rpush(self, key, value):
+		self.lists.setdefault(key, []).append(value)
+
+	def lpush(self, key, value):
+		self.lists.setdefault(key, []).insert(0, value)
+
+	def lpop(self, key):
+		values = self.lists.get(key)
+		return values.pop(0) if values else None
+
+	def sadd(self, key, value):
+		self.sets.setdefault(key, set()).add(value)
+
+	def smembers(self, key):
+		return self.sets.get(key, set())
+
+	def hset(self, key, field, value):
+		self.hashes.setdefault(key, {})[field] = value
+
+	def hdel(self, key, fields):
+		for field in fields if isinstance(fields, list) else [fields]:
+			self.hashes.get(key, {}).pop(field, None)
+
+	def hgetall(self, key):
+		return dict(self.hashes.get(key, {}))
+
+	def get_value(self, key):
+		return None
+
+	def set_value(self, key, value):
+		pass
+
+	def make_key(self, key):
+		return key
+
+	def lock(self, key, **kwargs):
+		return frappe._dict(acquire=lambda: True, release=lambda: None)
+
+
+class TestJobRouter(FrappeTestCase):
+	def setUp(self):
+		self.cache = FakeCache()
+		self.after_commit = Callbacks()
+		self.after_rollback = Callbacks()
+		self.stack = ExitStack()
+
+		self.stack.enter_context(patch.object(frappe, "cache", self.cache))
+		self.stack.enter_context(patch.object(frappe, "flags", frappe._dict()))
+		self.stack.enter_context(patch.object(frappe.db, "after_commit", self.after_commit))
+		self.stack.enter_context(patch.object(frappe.db, "after_rollback", self.after_rollback))
+		self.stack.enter_context(patch.object(job_router, "get_jobs_per_company", return_value=1))
+		self.enqueue = self.stack.enter_context(patch.object(frappe, "enqueue"))
+
+	def tearDown(self):
+		self.stack.close()
+
+	def running(self, company):
+		return self.cache.hgetall(job_router._key(job_router.RUNNING_KEY, company))
+
+	def pending(self, company):
+		return self.cache.lists.get(job_router._key(job_router.PENDING_KEY, company), [])
+
+	def test_jobs_start_after_commit(self):
+		job_id = job_router.enqueue_for_company("_Test Company", "erpnext_expenses.tasks.post", report="R-1")
+		job_router.enqueue_for_company("_Test Company", "erpnext_expenses.tasks.post", report="R-2")
+
+		self.assertEqual(self.pending("_Test Company"), [])
+		self.enqueue.assert_not_called()
+
+		self.after_commit.run()
+
+		# One slot: the first job runs, the second waits
+		self.assertEqual(list(self.running("_Test Company")), [job_id])
+		self.assertEqual(len(self.pending("_Test Company")), 1)
+		self.assertEqual(self.enqueue.call_count, 1)
+
+	def test_rolled_back_jobs_are_not_queued(self):
+		job_router.enqueue_for_company("_Test Company", "erpnext_expenses.tasks.post", report="R-1")
+
+		self.after_commit.functions.clear()
+		self.after_rollback.run()
+
+		self.assertIsNone(frappe.flags.expense_jobs_to_queue)
+		self.assertEqual(self.pending("_Test Company"), [])
+		self.enqueue.assert_not_called()
+
+	def test_failed_enqueue_frees_the_slot(self):
+		self.enqueue.side_effect = ConnectionError
+
+		with patch.object(frappe, "log_error"):
+			job_router.enqueue_for_company("_Test Company", "erpnext_expenses.tasks.post", report="R-1")
+			self.after_commit.run()
+
+		self.assertEqual(self.running("_Test Company"), {})
+		self.assertEqual(len(self.pending("_Test Company")), 1)
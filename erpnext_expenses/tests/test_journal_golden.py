@@ -0,0 +1,358 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+"""Golden-file regression tests for journal building.
+
+Synthetic reports, from one split line to 5,000 expenses with mixed VAT codes,
+are turned into Journal Entry account rows and compared with the files in
+golden/journal/. Any refactor of the journal engine must reproduce them
+exactly. Each case is checked twice:
+
+- in memory, through _assemble_journal_accounts()
+- against the test site's database, through get_journal_accounts(), which
+  reads the stored rows exactly as create_journal_entries() does; its query
+  count must not grow with the size of the report
+
+The cases in POSTED_CASES are also posted through create_journal_entries(),
+and the Journal Entry Account rows it stores are compared with the same
+files. The golden accounts exist only in the files, so ERPNext's own
+Journal Entry validation and ledger posting are skipped there.
+
+Each case must also build within MAX_SECONDS; failures report the measured
+runtime and query count. After an intended change of output, rewrite the
+golden files with:
+
+	UPDATE_GOLDEN=1 bench --site <site> run-tests --module erpnext_expenses.tests.test_journal_golden
+"""
+
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from erpnext_expenses import money
+from erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report import (
+	_assemble_journal_accounts,
+	create_journal_entries,
+	get_journal_accounts,
+)
+
+SEED = 20261019
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden", "journal")
+UPDATE_GOLDEN = bool(os.environ.get("UPDATE_GOLDEN"))
+
+# Case name: number of expenses. The first case is a single expense with one split line.
+CASES = {
+	"single_line": 1,
+	"mixed_vat_10": 10,
+	"mixed_vat_250": 250,
+	"mixed_vat_1000": 1000,
+	"mixed_vat_5000": 5000,
+}
+
+# Cases small enough to post as a Journal Entry on every run
+POSTED_CASES = ("single_line", "mixed_vat_10")
+
+DIMENSIONS = ("cost_center", "project")
+TAXES = {
+	"VAT-16": (16, "Tax Account VAT 16"),
+	"VAT-8": (8, "Tax Account VAT 8"),
+	"Levy-2.5": (Decimal("2.5"), "Tax Account Levy"),
+	"Exempt-0": (0, "Tax Account Exempt"),
+}
+CATEGORIES = {
+	"Travel": "Expense Account Travel",
+	"Meals": "Expense Account Meals",
+	"Fuel": "Expense Account Fuel",
+	"Office Supplies": "Expense Account Office Supplies",
+}
+COST_CENTERS = [None, "Cost Center Sales", "Cost Center Operations"]
+PROJECTS = [None, None, "Project Alpha"]
+EXCHANGE_RATES = [1, 1, 1, 0.0072, 1.0865, 129.37, 3.6725]
+PAYING_ACCOUNT = "Paying Account"
+
+# Stands in for the company's default cost center, which differs between sites
+DEFAULT_COST_CENTER = "<default cost center>"
+
+# Queries get_journal_accounts() may run, whatever the size of the report
+MAX_QUERIES = 10
+
+# Seconds any case may take to build, far above the expected runtime
+MAX_SECONDS = 10
+
+
+def make_case(line_count, precision=2):
+	"""Build the expenses and split lines of a synthetic report, as they are stored."""
+	rng = random.Random(SEED + line_count)
+	expenses = []
+	splits = []
+
+	for index in range(line_count):
+		expense_id = f"GOLDEN-{index:05d}"
+		split_count = 1 if line_count == 1 else rng.choice([0, 1, 1, 2, 3, 4])
+		split_amounts = [Decimal(rng.randint(1, 500_000)).scaleb(-precision) for _ in range(split_count)]
+
+		for idx, amount in enumerate(split_amounts, 1):
+			vat = "VAT-16" if line_count == 1 else rng.choice([None, *TAXES])
+			vat_amount = money.percentage_of(amount, TAXES[vat][0], precision) if vat else 0
+			splits.append(frappe._dict(
+				parent=expense_id,
+				idx=idx,
+				amount=float(amount),
+				vat=vat,
+				vat_amount=money.to_float(vat_amount, precision),
+				cost_center=rng.choice(COST_CENTERS),
+				project=rng.choice(PROJECTS),
+			))
+
+		# Expenses without split lines post their whole total to the defaults
+		total = sum(split_amounts) if split_amounts else Decimal(rng.randint(1, 500_000)).scaleb(-precision)
+
+		expenses.append(frappe._dict(
+			expense_id=expense_id,
+			category=rng.choice(list(CATEGORIES)),
+			subtotal=float(total),
+			exchange_rate=1 if line_count == 1 else rng.choice(EXCHANGE_RATES),
+		))
+
+	return expenses, splits
+
+
+def normalize(accounts, default_cost_center=None):
+	"""Reduce account rows to the fields compared with the golden files, in a stable order."""
+	rows = []
+	for account in accounts:
+		cost_center = account.get("cost_center")
+		if default_cost_center and cost_center == default_cost_center:
+			cost_center = DEFAULT_COST_CENTER
+
+		rows.append({
+			"account": account["account"],
+			"debit": account["debit"],
+			"credit": account["credit"],
+			"cost_center": cost_center,
+			"project": account.get("project"),
+		})
+
+	return sorted(rows, key=lambda row: (
+		row["account"], row["cost_center"] or "", row["project"] or "", row["debit"], row["credit"]
+	))
+
+
+@contextmanager
+def count_queries():
+	"""Count the statements sent to the database inside the block.
+
+	Counted on the connection's cursor, so queries from every db helper are
+	included, however they reach it.
+	"""
+	counter = {"queries": 0}
+	cursor = frappe.db._cursor
+	execute = cursor.execute
+
+	def counting_execute(*args, **kwargs):
+		counter["queries"] += 1
+		return execute(*args, **kwargs)
+
+	with patch.object(cursor, "execute", counting_execute):
+		yield counter
+
+
+class JournalGoldenTestCase(FrappeTestCase):
+	def assertFastEnough(self, case, line_count, split_count, seconds, queries=None):
+		self.assertLess(
+			seconds,
+			MAX_SECONDS,
+			f"{case}: {line_count} expenses, {split_count} split lines took {seconds * 1000:.1f} ms"
+			+ (f" and {queries} queries" if queries is not None else ""),
+		)
+
+	def assertMatchesGolden(self, case, accounts):
+		path = os.path.join(GOLDEN_PATH, f"{case}.json")
+
+		if UPDATE_GOLDEN:
+			os.makedirs(GOLDEN_PATH, exist_ok=True)
+			with open(path, "w") as f:
+				json.dump(accounts, f, indent=1)
+				f.write("\n")
+			return
+
+		if not os.path.exists(path):
+			self.fail(f"Golden file {path} is missing; create it by running with UPDATE_GOLDEN=1")
+
+		with open(path) as f:
+			self.assertEqual(accounts, json.load(f), f"Journal for {case} differs from its golden file")
+
+
+class TestJournalGolden(JournalGoldenTestCase):
+	def test_journal_matches_golden_files(self):
+		tax_accounts = {tax: account for tax, (rate, account) in TAXES.items()}
+
+		for case, line_count in CASES.items():
+			with self.subTest(case=case):
+				expenses, splits = make_case(line_count)
+				expense_lines = [
+					frappe._dict(
+						expense_id=expense.expense_id,
+						subtotal=expense.subtotal,
+						exchange_rate=expense.exchange_rate,
+						expense_account=CATEGORIES[expense.category],
+						dimensions={"cost_center": DEFAULT_COST_CENTER},
+					)
+					for expense in expenses
+				]
+
+				start = time.perf_counter()
+				accounts = _assemble_journal_accounts(
+					expense_lines, splits, tax_accounts, PAYING_ACCOUNT, 2, DIMENSIONS
+				)
+				self.assertFastEnough(case, line_count, len(splits), time.perf_counter() - start)
+
+				self.assertMatchesGolden(case, normalize(accounts))
+
+
+class TestJournalGoldenDatabase(JournalGoldenTestCase):
+	"""Store each case in the database and build its journal as create_journal_entries() does."""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+
+		cls.company = frappe.db.get_value("Company", {}, "name")
+		if not cls.company:
+			return
+
+		cls.default_cost_center = frappe.get_cached_value("Company", cls.company, "cost_center")
+		cls.categories = {category: f"_Test Golden {category}" for category in CATEGORIES}
+		cls.taxes = {tax: f"_Test Golden {tax}" for tax in TAXES}
+
+		bulk_insert("Expense Category", ["category_name", "expense_account"], [
+			(cls.categories[category], cls.categories[category], account)
+			for category, account in CATEGORIES.items()
+		])
+		bulk_insert("Expense Taxes", ["tax_description", "tax_percentage", "tax_account"], [
+			(cls.taxes[tax], cls.taxes[tax], rate, account) for tax, (rate, account) in TAXES.items()
+		])
+
+	def setUp(self):
+		if not self.company:
+			self.skipTest("No Company on the test site")
+
+	def test_stored_reports_match_golden_files(self):
+		query_counts = {}
+
+		for case, line_count in CASES.items():
+			with self.subTest(case=case):
+				expenses, splits = make_case(line_count)
+				report = self.store_case(case, expenses, splits)
+
+				# Warm the caches the first call would fill
+				get_journal_accounts(report, self.company, PAYING_ACCOUNT)
+
+				with count_queries() as counter:
+					start = time.perf_counter()
+					accounts, posting_date = get_journal_accounts(report, self.company, PAYING_ACCOUNT)
+					seconds = time.perf_counter() - start
+
+				query_counts[case] = counter["queries"]
+				self.assertFastEnough(case, line_count, len(splits), seconds, counter["queries"])
+
+				self.assertMatchesGolden(case, normalize(accounts, self.default_cost_center))
+				self.assertLessEqual(
+					counter["queries"], MAX_QUERIES, f"{case}: {counter['queries']} queries, above {MAX_QUERIES}"
+				)
+
+		self.assertEqual(len(set(query_counts.values())), 1, f"Query count grows with the report: {query_counts}")
+
+	def test_posted_journals_match_golden_files(self):
+		for case in POSTED_CASES:
+			with self.subTest(case=case):
+				expenses, splits = make_case(CASES[case])
+				report = self.store_case(f"posted_{case}", expenses, splits)
+
+				with self.posting():
+					journal_entry = create_journal_entries(report)["journal_entry"]
+
+				accounts = frappe.get_all(
+					"Journal Entry Account",
+					filters={"parent": journal_entry},
+					fields=["account", "debit", "credit", "cost_center", "project"],
+				)
+				for account in accounts:
+					account.debit, account.credit = flt(account.debit), flt(account.credit)
+
+				self.assertEqual(frappe.db.get_value("Journal Entry", journal_entry, "docstatus"), 1)
+				self.assertEqual(frappe.db.get_value("Expense Report", report, "workflow_state"), "Journals Created")
+				self.assertMatchesGolden(case, normalize(accounts, self.default_cost_center))
+
+	@contextmanager
+	def posting(self):
+		"""Post journals without ERPNext's account checks and ledger entries, and without committing."""
+		new_doc = frappe.new_doc
+		journal_entry_class = frappe.get_controller("Journal Entry")
+
+		def new_journal_entry(doctype, *args, **kwargs):
+			doc = new_doc(doctype, *args, **kwargs)
+			doc.flags.update(ignore_links=True, ignore_validate=True, ignore_mandatory=True)
+			return doc
+
+		with patch.object(frappe, "new_doc", new_journal_entry), \
+				patch.object(journal_entry_class, "on_submit"), \
+				patch.object(frappe.db, "commit"):
+			yield
+
+	def store_case(self, case, expenses, splits):
+		"""Insert a case's expenses, split lines and a submitted report holding them."""
+		report = f"_Test Golden {case}"
+		names = {expense.expense_id: f"{case}-{expense.expense_id}" for expense in expenses}
+
+		bulk_insert(
+			"Expense",
+			["docstatus", "company", "category", "currency", "exchange_rate", "total", "expense_date"],
+			[
+				(names[expense.expense_id], 1, self.company, self.categories[expense.category], "USD",
+					expense.exchange_rate, expense.subtotal, "2026-01-31")
+				for expense in expenses
+			],
+		)
+		bulk_insert(
+			"Expense Splitting Detail",
+			["parent", "parenttype", "parentfield", "idx", "amount", "vat", "vat_amount", "cost_center", "project"],
+			[
+				(frappe.generate_hash(length=12), names[split.parent], "Expense", "table_jkwj", split.idx,
+					split.amount, self.taxes.get(split.vat), split.vat_amount, split.cost_center, split.project)
+				for split in splits
+			],
+		)
+		bulk_insert("Expense Report", ["docstatus", "company", "paying_account"], [
+			(report, 1, self.company, PAYING_ACCOUNT)
+		])
+		bulk_insert(
+			"Expense Detail",
+			["parent", "parenttype", "parentfield", "idx", "expense_id", "category", "subtotal", "currency",
+				"exchange_rate", "expense_date"],
+			[
+				(frappe.generate_hash(length=12), report, "Expense Report", "expense", idx, names[expense.expense_id],
+					self.categories[expense.category], expense.subtotal, "USD", expense.exchange_rate, "2026-01-31")
+				for idx, expense in enumerate(expenses, 1)
+			],
+		)
+
+		return report
+
+
+def bulk_insert(doctype, fields, values):
+	"""Insert rows without running controllers; names come first in each row."""
+	now = frappe.utils.now()
+	frappe.db.bulk_insert(
+		doctype,
+		["name", "creation", "modified", "owner", "modified_by"] + fields,
+		[(row[0], now, now, "Administrator", "Administrator", *row[1:]) for row in values],
+	)
@@ -0,0 +1,132 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+import random
+from decimal import Decimal
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses import money
+from erpnext_expenses.erpnext_expenses.doctype.expense_report.expense_report import (
+	_assemble_journal_accounts,
+)
+
+# Seeded so every run checks the same "random" reports
+SEED = 20261019
+TAX_ACCOUNTS = {"VAT-16": "VAT 16%", "VAT-8": "VAT 8%", "Levy-2.5": "Levy 2.5%"}
+TAX_RATES = {"VAT-16": 16, "VAT-8": 8, "Levy-2.5": Decimal("2.5")}
+EXPENSE_ACCOUNTS = ["Travel", "Meals", "Fuel", "Office Supplies"]
+
+
+def make_report(rng, line_count, precision=2):
+	"""Build random expense and split lines like the ones read from the database."""
+	expense_lines = []
+	split_lines = []
+
+	for index in range(line_count):
+		expense_id = f"EXP-{index:05d}"
+		split_amounts = [Decimal(rng.randint(1, 500_000)).scaleb(-precision) for _ in range(rng.randint(1, 4))]
+
+		for amount in split_amounts:
+			vat = rng.choice([None, *TAX_RATES])
+			vat_amount = money.percentage_of(amount, TAX_RATES[vat], precision) if vat else 0
+			split_lines.append(frappe._dict(
+				parent=expense_id,
+				amount=float(amount),
+				vat=vat,
+				vat_amount=money.to_float(vat_amount, precision)
+			))
+
+		expense_lines.append(frappe._dict(
+			expense_id=expense_id,
+			subtotal=float(sum(split_amounts)),
+			exchange_rate=rng.choice([1, 1, 1, 0.0072, 1.0865, 129.37, 3.6725]),
+			expense_account=rng.choice(EXPENSE_ACCOUNTS)
+		))
+
+	return expense_lines, split_lines
+
+
+def minor_totals(accounts, precision=2):
+	debit = sum(money.to_minor(row["debit"], precision) for row in accounts)
+	credit = sum(money.to_minor(row["credit"], precision) for row in accounts)
+	return debit, credit
+
+
+class TestMoney(FrappeTestCase):
+	def test_rounding_is_half_up_on_the_stored_value(self):
+		self.assertEqual(money.to_minor(2.675), 268)
+		self.assertEqual(money.to_minor(0.005), 1)
+		self.assertEqual(money.to_minor(-0.005), -1)
+		self.assertEqual(money.to_minor("1.2345", 3), 1235)
+		self.assertEqual(money.to_float(268), 2.68)
+
+	def test_float_sums_drift_but_minor_units_do_not(self):
+		amounts = [0.1] * 1000
+		self.assertNotEqual(sum(amounts), 100.0)
+		self.assertEqual(sum(money.to_minor(amount) for amount in amounts), 10000)
+
+	def test_allocate_always_adds_up(self):
+		rng = random.Random(SEED)
+
+		for _ in range(2000):
+			total = rng.randint(-1_000_000, 1_000_000)
+			weights = [rng.choice([0, rng.randint(1, 10_000)]) for _ in range(rng.randint(1, 30))]
+
+			shares = money.allocate(total, weights)
+
+			self.assertEqual(len(shares), len(weights))
+			self.assertEqual(sum(shares), total)
+
+			if sum(weights):
+				for weight, share in zip(weights, shares):
+					exact = Decimal(total) * weight / sum(weights)
+					self.assertLess(abs(share - exact), 1)
+
+	def test_allocate_is_deterministic(self):
+		self.assertEqual(money.allocate(100, [1, 1, 1]), [34, 33, 33])
+		self.assertEqual(money.allocate(-100, [1, 1, 1]), [-34, -33, -33])
+		self.assertEqual(money.allocate(5, [0, 0]), [5, 0])
+		self.assertEqual(money.allocate(0, []), [])
+
+	def test_journal_balances_on_large_reports(self):
+		rng = random.Random(SEED)
+
+		for line_count in (1, 10, 250, 1000, 5000):
+			expense_lines, split_lines = make_report(rng, line_count)
+
+			accounts = _assemble_journal_accounts(expense_lines, split_lines, TAX_ACCOUNTS, "Bank", 2)
+			debit, credit = minor_totals(accounts)
+
+			self.assertEqual(debit, credit, f"Unbalanced journal for {line_count} lines")
+			self.assertEqual(
+				credit,
+				sum(money.convert(line.subtotal, line.exchange_rate) for line in expense_lines)
+			)
+
+	def test_journal_tax_debits_match_converted_vat(self):
+		rng = random.Random(SEED)
+		expense_lines, split_lines = make_report(rng, 3000)
+		rates = {line.expense_id: line.exchange_rate for line in expense_lines}
+
+		accounts = _assemble_journal_accounts(expense_lines, split_lines, TAX_ACCOUNTS, "Bank", 2)
+		tax_debit = sum(
+			money.to_minor(row["debit"]) for row in accounts if row["account"] in TAX_ACCOUNTS.values()
+		)
+
+		vat_by_expense = {}
+		for split_line in split_lines:
+			vat_by_expense[split_line.parent] = vat_by_expense.get(split_line.parent, 0) + money.to_decimal(
+				split_line.vat_amount
+			)
+
+		expected = sum(money.convert(vat_by_expense.get(expense_id, 0), rate) for expense_id, rate in rates.items())
+
+		self.assertEqual(tax_debit, expected)
+
+	def test_journal_is_deterministic(self):
+		first = _assemble_journal_accounts(*make_report(random.Random(SEED), 500), TAX_ACCOUNTS, "Bank", 2)
+		second = _assemble_journal_accounts(*make_report(random.Random(SEED), 500), TAX_ACCOUNTS, "Bank", 2)
+
+		self.assertEqual(first, second)
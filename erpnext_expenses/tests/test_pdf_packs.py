@@ -0,0 +1,123 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+import os
+import shutil
+import tempfile
+import zipfile
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses import pdf_packs
+
+REPORTS = ["EXP-REP-0001", "EXP-REP-0002"]
+
+
+class InlineExecutor:
+	"""Stands in for the process pool, rendering in the test process."""
+
+	def __init__(self, **kwargs):
+		pass
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		return False
+
+	def map(self, fn, iterable):
+		return map(fn, iterable)
+
+
+def render_report(job):
+	report, print_format, path = job
+	with open(path, "wb") as f:
+		f.write(f"%PDF {report}".encode())
+
+
+def merge_report(print_path, receipts, output_path):
+	shutil.move(print_path, output_path)
+	return []
+
+
+class TestPdfPacks(FrappeTestCase):
+	def setUp(self):
+		self.site_dir = tempfile.mkdtemp()
+		os.makedirs(os.path.join(self.site_dir, "private", "files"))
+
+	def tearDown(self):
+		shutil.rmtree(self.site_dir, ignore_errors=True)
+
+	def build_pack(self, combine):
+		"""Build a pack with rendering and File records faked; return the saved Files and the notification."""
+		files = []
+
+		def get_doc(values):
+			doc = frappe._dict(values)
+			doc.insert = lambda **kwargs: files.append(values)
+			return doc
+
+		with ExitStack() as stack:
+			stack.enter_context(patch.object(pdf_packs, "ProcessPoolExecutor", InlineExecutor))
+			stack.enter_context(patch.object(pdf_packs, "_render_report", render_report))
+			stack.enter_context(patch.object(pdf_packs, "_merge_report", merge_report))
+			stack.enter_context(patch.object(pdf_packs, "_get_receipt_paths", return_value={}))
+			stack.enter_context(patch.object(
+				frappe, "get_site_path", lambda *parts: os.path.join(self.site_dir, *parts)
+			))
+			stack.enter_context(patch.object(frappe, "get_doc", get_doc))
+			stack.enter_context(patch.object(frappe.db, "commit"))
+			stack.enter_context(patch.object(frappe.db, "rollback"))
+			stack.enter_context(patch.object(frappe, "log_error"))
+			publish = stack.enter_context(patch.object(frappe, "publish_realtime"))
+
+			pdf_packs.build_report_pack(REPORTS, combine=combine, user="Administrator")
+
+		return files, publish.call_args.args[1]
+
+	def saved_path(self, file):
+		return os.path.join(self.site_dir, "private", "files", file["file_name"])
+
+	def test_attach_each_report(self):
+		files, message = self.build_pack(combine=0)
+
+		self.assertEqual(message["errors"], [])
+		self.assertIsNone(message["file_url"])
+		self.assertEqual([file["attached_to_name"] for file in files], REPORTS)
+
+		for report, file in zip(REPORTS, files):
+			self.assertEqual(file["attached_to_doctype"], "Expense Report")
+			with open(self.saved_path(file), "rb") as f:
+				self.assertEqual(f.read(), f"%PDF {report}".encode())
+
+	def test_combine_into_archive(self):
+		files, message = self.build_pack(combine=1)
+
+		self.assertEqual(message["errors"], [])
+		self.assertEqual(len(files), 1)
+		self.assertEqual(message["file_url"], files[0]["file_url"])
+
+		with zipfile.ZipFile(self.saved_path(files[0])) as archive:
+			self.assertEqual(archive.namelist(), [f"{report}.pdf" for report in REPORTS])
+
+	def get_local_path(self, file_url, full_path):
+		file = frappe._dict(get_full_path=lambda: full_path)
+		with patch.object(frappe, "get_doc", return_value=file), patch.object(
+			frappe, "get_site_path", lambda *parts: os.path.join(self.site_dir, *parts)
+		):
+			return pdf_packs._get_local_path(file_url)
+
+	def test_receipt_path_inside_site_files(self):
+		path = os.path.join(self.site_dir, "private", "files", "receipt.pdf")
+		self.assertEqual(self.get_local_path("/private/files/receipt.pdf", path), os.path.realpath(path))
+
+	def test_receipt_path_outside_site_files(self):
+		self.assertRaises(
+			frappe.PermissionError,
+			self.get_local_path,
+			"/private/files/../../site_config.json",
+			os.path.join(self.site_dir, "private", "files", "..", "..", "site_config.json"),
+		)
@@ -0,0 +1,72 @@
+# Copyright (c) 2026, Karani Geoffrey and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_expenses import search
+
+
+class TestSearchExpenses(FrappeTestCase):
+	def run_search(self, query, **filters):
+		"""Run a search on MariaDB with the database faked; return the query and values sent."""
+		sent = []
+
+		def sql(query, values=None, **kwargs):
+			sent.append((query, values))
+			return []
+
+		with patch.object(frappe.db, "db_type", "mariadb"), \
+				patch.object(frappe.db, "sql", sql), \
+				patch.object(frappe, "has_permission", return_value=True):
+			search.search_expenses(query, **filters)
+
+		return sent[0]
+
+	def test_fulltext_query_shape(self):
+		query, values = self.run_search("hotel paris", company="_Test Company", from_date="2026-01-01")
+
+		self.assertEqual(values["query"], "+hotel* +paris*")
+
+		# Each MATCH stands alone in the WHERE clause of its own select, so both indexes can drive
+		candidates = query[query.index("FROM (") + len("FROM ("):query.index(") matches")]
+		self.assertEqual(candidates.count("UNION ALL"), 1)
+		self.assertIn("FROM `tabExpense`\n\t\t\t\tWHERE MATCH(expense_description, notes)", candidates)
+		self.assertIn("FROM `tabExpense Detail`\n\t\t\t\tWHERE MATCH(description)", candidates)
+		self.assertNotIn(" OR ", query)
+
+		# Filters only apply to the candidates joined back to Expense
+		self.assertIn("INNER JOIN `tabExpense` ON `tabExpense`.name = matches.expense_id", query)
+		self.assertIn("`tabExpense`.company = %(company)s", query.split(") matches")[1])
+		self.assertIn("`tabExpense`.expense_date >= %(from_date)s", query.split(") matches")[1])
+
+	def test_short_words_fall_back_to_like(self):
+		query, values = self.run_search("ab hotel")
+
+		self.assertNotIn("MATCH", query)
+		self.assertEqual(values["term0"], "%ab%")
+
+	def test_fulltext_indexes_used(self):
+		if frappe.db.db_type != "mariadb":
+			self.skipTest("FULLTEXT search needs MariaDB")
+
+		if not (
+			frappe.db.has_index("tabExpense", search.EXPENSE_INDEX)
+			and frappe.db.has_index("tabExpense Detail", search.EXPENSE_DETAIL_INDEX)
+		):
+			self.skipTest("FULLTEXT indexes missing on the test site")
+
+		plan = frappe.db.sql(
+			"EXPLAIN " + search.get_fulltext_query(["`tabExpense`.docstatus != 2"]),
+			{"query": "+hotel*", "start": 0, "page_length": 20},
+			as_dict=True,
+		)
+
+		fulltext = {(row.table, row.key) for row in plan if row.type == "fulltext"}
+		self.assertIn(("tabExpense", search.EXPENSE_INDEX), fulltext)
+		self.assertIn(("tabExpense Detail", search.EXPENSE_DETAIL_INDEX), fulltext)
+
+		# Nothing reads a whole table
+		self.assertEqual([row.table for row in plan if row.type == "ALL" and row.table.startswith("tab")], [])